@@ -0,0 +1,53 @@
+from earth_pressure import get_pressure_coefficient, lateral_pressure_array, calculate_point_load_effect, SLOPED_BACKFILL_BETA_DEG
+from pressure_diagram import PressureDiagram
+from stratigraphy import layers_from_params, unit_weight_water, pressure_profile
+from surcharge_loads import load_set_from_params, surcharge_resultant
+
+class AnalysisContext:
+    """The loads on one design, computed once and handed to the stability analysis, the stem rebar
+    design and the drawing, so all three see the same pressures.
+
+    Depths are measured from the top of the wall with the water table at D_f +
+    groundwater_level_below_base. The active pressure diagram runs over H_total and the passive one
+    over the embedment on the toe side; the point load and the line and strip surcharge loads are
+    resolved over H_total and over the stem height.
+    """
+
+    def __init__(self, params, geometry, active_soil, passive_soil):
+        H_total = geometry["H_total"]
+        h_wall_stem = geometry["h_wall_stem"]
+        self.groundwater_depth_from_surface = geometry["D_f"] + geometry["groundwater_level_below_base"]
+        self.beta_deg = SLOPED_BACKFILL_BETA_DEG if geometry["active_side_slope_height"] > 0 else 0.0
+        self.Ka = get_pressure_coefficient(active_soil["friction_angle_deg"], self.beta_deg)
+        self.Kp = get_pressure_coefficient(passive_soil["friction_angle_deg"], is_active=False)
+        self.passive_unit_weight = passive_soil["unit_weight_kn_m3"]
+
+        # Earth pressure diagrams
+        layers = layers_from_params(params)
+        if layers:
+            # Layered backfill (params["stratigraphy"])
+            active = pressure_profile(layers, self.groundwater_depth_from_surface, geometry["surcharge_load"], True, self.beta_deg,
+                                      unit_weight_water(params["units"])).diagram(H_total)
+        else:
+            active = PressureDiagram.homogeneous(active_soil["unit_weight_kn_m3"], self.Ka, H_total, self.groundwater_depth_from_surface,
+                                                 geometry["surcharge_load"])
+        # Adjust passive depth if foundation is lower than passive side ground
+        passive_depth = geometry["D_f"] + geometry["foundation_lower_than_passive_side"]
+        passive = PressureDiagram.homogeneous(self.passive_unit_weight, self.Kp, passive_depth, self.groundwater_depth_from_surface)
+        self.pressure_diagrams = {"active": active, "passive": passive}
+        self.stem_diagram = active.truncated(h_wall_stem)
+
+        # Point load and line/strip surcharge loads (params["surcharge_loads"])
+        load_set = load_set_from_params(params)
+        self.point_load_effect = calculate_point_load_effect(geometry["point_load"], geometry["point_load_distance_from_wall"], H_total)
+        self.surcharge_loads_force, self.surcharge_loads_moment, _ = surcharge_resultant(load_set, H_total)
+        self.stem_point_load_effect = calculate_point_load_effect(geometry["point_load"], geometry["point_load_distance_from_wall"], h_wall_stem)
+        _, self.stem_surcharge_loads_moment, _ = surcharge_resultant(load_set, h_wall_stem)
+
+    def passive_pressure(self, depth):
+        """Passive pressure at a depth below the top on the toe side (e.g. along a shear key)."""
+        return float(lateral_pressure_array(self.passive_unit_weight, self.Kp, depth, self.groundwater_depth_from_surface))
+
+    def stem_moment(self):
+        """Unfactored moment at the base of the stem from the earth pressure, point and surcharge loads."""
+        return self.stem_diagram.moment() + self.stem_point_load_effect["moment"] + self.stem_surcharge_loads_moment
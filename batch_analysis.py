@@ -0,0 +1,153 @@
+import numpy as np
+from parameters import default_params, soil_properties, material_properties
+from unit_conversion import M_TO_FT, KN_M3_TO_PCF, KPA_TO_PSF, KN_TO_LB
+from stability_analysis import perform_stability_analysis_batch, apply_shear_key_batch, SHARED_COLUMNS
+from surcharge_loads import normalize_loads
+from stratigraphy import normalize_layers, unit_weight_water
+
+# Soil types in catalog order; integer soil indices in parameter columns refer to this list
+SOIL_TYPES = list(soil_properties.keys())
+
+# Parameter keys holding lengths (converted to feet for imperial batches)
+LENGTH_KEYS = [
+    "wall_height_m", "foundation_depth_m", "toe_length_m", "heel_length_m",
+    "wall_top_width_m", "wall_base_width_m", "groundwater_level_m_below_base",
+    "shear_key_depth_m", "shear_key_width_m", "active_side_ground_elevation_m",
+    "passive_side_ground_elevation_m", "point_load_distance_from_wall_m",
+    "foundation_lower_than_passive_side_m",
+]
+
+# Parameters holding one value for the whole batch rather than a column (a load set or layer table)
+SHARED_PARAMETERS = SHARED_COLUMNS
+
+def columns_from_params(params_list):
+    """Stacks a list of user parameter dicts (merged over default_params) into parameter columns.
+    Shared parameters (see SHARED_PARAMETERS) are passed on as one value, which every design must
+    give alike (or leave out)."""
+    merged = [{**default_params, **p} for p in params_list]
+    columns = {key: np.array([p[key] for p in merged]) for key in default_params}
+    for key in SHARED_PARAMETERS:
+        values = [p.get(key) or None for p in merged]
+        if any(value != values[0] for value in values[1:]):
+            raise ValueError(f"All designs of a batch must share the same '{key}'.")
+        if values and values[0] is not None:
+            columns[key] = values[0]
+    return columns
+
+def _single_units(units):
+    units = np.unique(np.asarray(units))
+    if len(units) != 1:
+        raise ValueError("A batch must use a single unit system.")
+    return str(units[0])
+
+def soil_indices(soil_types):
+    """Maps soil type names (or integer indices into SOIL_TYPES) to an index array."""
+    soil_types = np.asarray(soil_types)
+    if soil_types.dtype.kind in "iu":
+        return soil_types
+    names, inverse = np.unique(soil_types, return_inverse=True)
+    lookup = np.array([SOIL_TYPES.index(str(name)) for name in names], dtype=int)
+    return lookup[inverse].reshape(soil_types.shape)
+
+def _soil_column(key):
+    return np.array([soil_properties[soil][key] for soil in SOIL_TYPES])
+
+def _material_unit_weight(materials):
+    materials = np.asarray(materials)
+    names, inverse = np.unique(materials, return_inverse=True)
+    weights = np.array([0.0 if name == "none" else material_properties[str(name)]["unit_weight_kn_m3"] for name in names])
+    return weights[inverse].reshape(materials.shape)
+
+def conversion_factors(units):
+    """Metric-to-batch unit factors by quantity kind (None for dimensionless or already converted)."""
+    imperial = units == "imperial"
+    return {
+        None: 1.0,
+        "length": M_TO_FT if imperial else 1.0,
+        "unit_weight": KN_M3_TO_PCF if imperial else 1.0,
+        "pressure": KPA_TO_PSF if imperial else 1.0,
+        "force": KN_TO_LB if imperial else 1.0,
+    }
+
+def build_stability_columns(param_columns):
+    """Converts parameter columns into the inputs of perform_stability_analysis_batch.
+
+    `param_columns` uses the keys of default_params; each value is a scalar or a 1-D array.
+    Missing keys fall back to default_params. Soil types may be names or indices into SOIL_TYPES.
+    """
+    p = {**default_params, **param_columns}
+    units = _single_units(p["units"])
+    factors = conversion_factors(units)
+    length = factors["length"]
+    unit_weight = factors["unit_weight"]
+    pressure = factors["pressure"]
+
+    lengths = {key: np.asarray(p[key], dtype=float) * length for key in LENGTH_KEYS}
+    wall_height = lengths["wall_height_m"]
+    active_side_ground_elevation = lengths["active_side_ground_elevation_m"]
+
+    active = soil_indices(p["active_soil_type"])
+    passive = soil_indices(p["passive_soil_type"])
+    soil_gamma = _soil_column("unit_weight_kn_m3")
+    soil_phi = _soil_column("friction_angle_deg")
+    soil_allowable = _soil_column("allowable_bearing_pressure_kpa")
+
+    toe_length = lengths["toe_length_m"]
+    B_base = toe_length + lengths["wall_base_width_m"] + lengths["heel_length_m"]
+    wall_base_offset_from_toe = np.where(np.asarray(p["face_wall_position"]) == "toe_side", toe_length,
+                                         B_base - lengths["heel_length_m"] - lengths["wall_base_width_m"])
+
+    slab_material = np.asarray(p["slab_material"])
+
+    return {
+        "h_wall_stem": wall_height,
+        "D_f": lengths["foundation_depth_m"],
+        "B_toe": toe_length,
+        "B_heel": lengths["heel_length_m"],
+        "t_top": lengths["wall_top_width_m"],
+        "t_base": lengths["wall_base_width_m"],
+        "wall_base_offset_from_toe": wall_base_offset_from_toe,
+        "groundwater_level_below_base": lengths["groundwater_level_m_below_base"],
+        "shear_key_depth": lengths["shear_key_depth_m"],
+        "surcharge_load": np.asarray(p["surcharge_load_kpa"], dtype=float) * pressure,
+        "point_load": np.asarray(p["point_load_kn"], dtype=float) * factors["force"],
+        "point_load_distance_from_wall": lengths["point_load_distance_from_wall_m"],
+        "surcharge_loads": normalize_loads(p.get("surcharge_loads"), units),
+        "stratigraphy": normalize_layers(p.get("stratigraphy"), units),
+        "unit_weight_water": unit_weight_water(units),
+        "active_side_ground_elevation": active_side_ground_elevation,
+        "passive_side_ground_elevation": lengths["passive_side_ground_elevation_m"],
+        "foundation_lower_than_passive_side": lengths["foundation_lower_than_passive_side_m"],
+        "active_side_slope_height": np.where(wall_height < active_side_ground_elevation, active_side_ground_elevation - wall_height, 0.0),
+        "wall_unit_weight": _material_unit_weight(p["wall_material"]) * unit_weight,
+        "slab_unit_weight": _material_unit_weight(slab_material) * unit_weight,
+        "active_unit_weight": soil_gamma[active] * unit_weight,
+        "passive_unit_weight": soil_gamma[passive] * unit_weight,
+        # calculate_earth_pressure reads the kN/m^3 unit weight in both unit systems
+        "active_pressure_unit_weight": soil_gamma[active],
+        "passive_pressure_unit_weight": soil_gamma[passive],
+        "active_friction_angle_deg": soil_phi[active],
+        "passive_friction_angle_deg": soil_phi[passive],
+        "allowable_bearing_pressure": soil_allowable[active] * pressure,
+        "shear_key_used": np.asarray(p["shear_key_used"], dtype=bool),
+        "shear_key_available": (slab_material == "concrete") & (np.asarray(p["shear_key_position"]) != "heel"),
+    }
+
+def analyze_batch(param_columns, auto_shear_key=False, column_overrides=None):
+    """Runs the vectorized stability analysis over parameter columns (see build_stability_columns).
+
+    With auto_shear_key, a shear key is added to designs with FS_sliding < 1.5 and no key, as
+    calculate_retaining_wall does, and a "shear_key_used" column reports the final flag.
+    column_overrides replaces stability columns after conversion (e.g. sampled soil properties).
+    """
+    columns = build_stability_columns(param_columns)
+    columns.update(column_overrides or {})
+    results = perform_stability_analysis_batch(columns)
+    if not auto_shear_key:
+        return results
+
+    requested = columns["shear_key_used"]
+    added = (results["FS_sliding"] < 1.5) & ~requested
+    results = apply_shear_key_batch(results, added)
+    results["shear_key_used"] = np.broadcast_to(requested | added, added.shape)
+    return results
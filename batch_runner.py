@@ -0,0 +1,138 @@
+import argparse
+import csv
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from retaining_wall_calculator import calculate_retaining_wall, save_output_files
+from result_cache import DEFAULT_MAX_BYTES, get_process_cache
+from stage_profiler import StageProfiler
+
+SUMMARY_FIELDS = ["name", "input", "status", "FS_overturning", "FS_sliding", "FS_bearing", "q_max", "shear_key_used", "cache", "error"]
+
+def collect_input_files(sources, manifest=None):
+    """Expands directories (all *.json inside), glob patterns and plain paths, plus the paths listed
+    one per line in an optional manifest file (relative to the manifest's directory)."""
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            paths.extend(sorted(glob.glob(os.path.join(source, "*.json"))))
+        elif glob.has_magic(source):
+            paths.extend(sorted(glob.glob(source)))
+        else:
+            paths.append(source)
+    if manifest:
+        manifest_dir = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    paths.append(os.path.join(manifest_dir, line))
+    return paths
+
+def _output_names(paths):
+    """One output basename per input: the file stem, suffixed with the first free _2, _3, ... where
+    it is already taken (including by another input's suffixed name or stem)."""
+    names, used = [], set()
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name, suffix = stem, 1
+        while name in used:
+            suffix += 1
+            name = f"{stem}_{suffix}"
+        used.add(name)
+        names.append(name)
+    return names
+
+def run_design_file(task):
+    """Worker: calculates one JSON input file and writes its outputs. Never raises.
+    With profiling on, the record carries this design's stage stats under "stage_profile"."""
+    input_path, output_dir, name, cache_path, cache_max_bytes, profile, track_allocations = task
+    if profile:
+        with StageProfiler(track_allocations) as profiler:
+            record = run_design_file((input_path, output_dir, name, cache_path, cache_max_bytes, False, False))
+        record["stage_profile"] = profiler.stages
+        return record
+
+    record = {"name": name, "input": input_path}
+    try:
+        with open(input_path, "r") as f:
+            input_params = json.load(f)
+        if cache_path:
+            results, hit = get_process_cache(cache_path, cache_max_bytes).get_or_calculate(input_params)
+            record["cache"] = "hit" if hit else "miss"
+        else:
+            results = calculate_retaining_wall(input_params, verbose=False)
+        save_output_files(results, output_dir, name, verbose=False)
+        stability = results["stability"]
+        record.update({
+            "status": "ok",
+            "FS_overturning": stability["FS_overturning"],
+            "FS_sliding": stability["FS_sliding"],
+            "FS_bearing": stability["FS_bearing"],
+            "q_max": stability["q_max"],
+            "shear_key_used": results["params"]["shear_key_used"],
+        })
+    except Exception as e:
+        record.update({"status": "error", "error": f"{type(e).__name__}: {e}"})
+    return record
+
+def run_batch(paths, output_dir, workers=None, chunk_size=1, cache_path=None, cache_max_bytes=DEFAULT_MAX_BYTES,
+              profiler=None):
+    """Runs every input file through a process pool and writes batch_summary.csv to output_dir.
+    With cache_path, results are read from / stored in a ResultCache shared by all workers.
+    With a StageProfiler, the workers' per-stage stats are merged into it.
+    Returns the per-design summary records in input order."""
+    os.makedirs(output_dir, exist_ok=True)
+    profile = profiler is not None
+    track_allocations = profile and profiler.track_allocations
+    tasks = [(path, output_dir, name, cache_path, cache_max_bytes, profile, track_allocations)
+             for path, name in zip(paths, _output_names(paths))]
+    if workers == 1:
+        records = [run_design_file(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            records = list(executor.map(run_design_file, tasks, chunksize=chunk_size))
+    if profile:
+        for record in records:
+            profiler.merge(record.pop("stage_profile"))
+
+    with open(os.path.join(output_dir, "batch_summary.csv"), "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(records)
+    return records
+
+def batch_main(argv):
+    """Command line entry point for `retaining_wall_calculator.py batch`."""
+    parser = argparse.ArgumentParser(prog="retaining_wall_calculator.py batch",
+                                     description="Calculate many JSON input files in parallel.")
+    parser.add_argument("sources", nargs="*", help="Input JSON files, directories or glob patterns")
+    parser.add_argument("--manifest", help="Text file listing one input JSON path per line")
+    parser.add_argument("--output-dir", default="retaining_wall_outputs", help="Directory for per-design outputs (default: retaining_wall_outputs)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count; 1 runs serially)")
+    parser.add_argument("--chunk-size", type=int, default=1, help="Input files handed to a worker at a time (default: 1)")
+    parser.add_argument("--cache", help="SQLite result cache file shared across runs")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_MAX_BYTES / 2**20, help="Cache size limit in MiB before LRU eviction")
+    parser.add_argument("--profile-stages", metavar="PATH", help="Write per-stage timings aggregated over the batch to this JSON file")
+    parser.add_argument("--profile-allocations", action="store_true", help="Also record allocations per stage (slower)")
+    args = parser.parse_args(argv)
+
+    paths = collect_input_files(args.sources, args.manifest)
+    if not paths:
+        parser.error("No input files found.")
+
+    profiler = StageProfiler(args.profile_allocations) if args.profile_stages else None
+    records = run_batch(paths, args.output_dir, args.workers, args.chunk_size, args.cache, int(args.cache_max_mb * 2**20), profiler)
+    if profiler:
+        profiler.write(args.profile_stages)
+        print(f"Stage profile saved to {args.profile_stages}")
+    failed = [record for record in records if record["status"] != "ok"]
+    print(f"Calculated {len(records) - len(failed)} of {len(records)} designs; outputs in {args.output_dir}")
+    if args.cache:
+        hits = sum(1 for record in records if record.get("cache") == "hit")
+        misses = sum(1 for record in records if record.get("cache") == "miss")
+        print(f"Cache: {hits} hits, {misses} misses ({args.cache})")
+    for record in failed:
+        print(f"  {record['input']}: {record['error']}")
+    return 1 if failed else 0
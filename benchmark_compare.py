@@ -0,0 +1,117 @@
+import argparse
+import json
+import numpy as np
+from benchmark_suite import BENCHMARKS, run_benchmarks
+
+DEFAULT_THRESHOLD = 0.10 # Relative slowdown of the median that counts as a regression
+DEFAULT_NOISE_MADS = 3.0 # ...provided it also exceeds this many (scaled) MADs of run-to-run noise
+DEFAULT_REPEATS = 7
+MAD_TO_SIGMA = 1.4826 # Scales the MAD to a standard deviation for normally distributed noise
+
+def median_and_mad(entry):
+    """Median of the per-pass medians of one benchmark entry and their median absolute deviation.
+    Entries without per-pass medians fall back to the overall p50 with zero spread."""
+    values = np.asarray(entry.get("repeat_medians_us") or [entry["p50_us"]], dtype=float)
+    median = float(np.median(values))
+    return median, float(np.median(np.abs(values - median)))
+
+def compare_entry(baseline_entry, current_entry, threshold=DEFAULT_THRESHOLD, noise_mads=DEFAULT_NOISE_MADS):
+    """Compares one stage. A stage regresses when its median slowed down by more than `threshold`
+    and the difference is larger than `noise_mads` times the combined noise of both runs."""
+    base_median, base_mad = median_and_mad(baseline_entry)
+    current_median, current_mad = median_and_mad(current_entry)
+    change = current_median / base_median - 1.0 if base_median > 0 else 0.0
+    noise = noise_mads * MAD_TO_SIGMA * float(np.hypot(base_mad, current_mad))
+    difference = current_median - base_median
+    if change > threshold and difference > noise:
+        status = "regression"
+    elif change < -threshold and -difference > noise:
+        status = "improvement"
+    else:
+        status = "unchanged"
+    return {
+        "baseline_median_us": base_median,
+        "current_median_us": current_median,
+        "baseline_mad_us": base_mad,
+        "current_mad_us": current_mad,
+        "change": change,
+        "noise_us": noise,
+        "threshold": threshold,
+        "status": status,
+    }
+
+def compare_reports(baseline, current, threshold=DEFAULT_THRESHOLD, noise_mads=DEFAULT_NOISE_MADS, stage_thresholds=None):
+    """Per-stage comparison of two benchmark_suite reports (stages present in both).
+    stage_thresholds overrides the threshold for individual stages."""
+    stage_thresholds = stage_thresholds or {}
+    comparison = {}
+    for name, baseline_entry in baseline["benchmarks"].items():
+        if name in current["benchmarks"]:
+            comparison[name] = compare_entry(baseline_entry, current["benchmarks"][name],
+                                             stage_thresholds.get(name, threshold), noise_mads)
+    return comparison
+
+def comparability_warnings(baseline, current):
+    """Differences in corpus or environment that make a comparison less meaningful."""
+    warnings = []
+    base_meta, current_meta = baseline["metadata"], current["metadata"]
+    if base_meta.get("corpus_digest") != current_meta.get("corpus_digest"):
+        warnings.append("Benchmark corpora differ; results are not directly comparable.")
+    for key in ("python", "implementation", "numpy", "machine"):
+        if base_meta.get(key) != current_meta.get(key):
+            warnings.append(f"{key} differs: baseline {base_meta.get(key)}, current {current_meta.get(key)}.")
+    return warnings
+
+def format_comparison(comparison):
+    """Plain-text table of a compare_reports result."""
+    lines = [f"{'benchmark':<28} {'baseline us':>12} {'current us':>12} {'change':>8}  status"]
+    for name, entry in comparison.items():
+        lines.append(f"{name:<28} {entry['baseline_median_us']:>12.2f} {entry['current_median_us']:>12.2f} "
+                     f"{entry['change']:>+8.1%}  {entry['status']}")
+    return "\n".join(lines)
+
+def _parse_stage_threshold(spec):
+    name, sep, value = spec.partition("=")
+    if not sep or name not in BENCHMARKS:
+        raise argparse.ArgumentTypeError(f"Expected STAGE=FRACTION with a known stage, got '{spec}'.")
+    return name, float(value)
+
+def compare_main(argv):
+    """Command line entry point for `retaining_wall_calculator.py benchmark-compare`.
+    Exits with 1 when any stage regressed."""
+    parser = argparse.ArgumentParser(prog="retaining_wall_calculator.py benchmark-compare",
+                                     description="Rerun the benchmarks and flag per-stage slowdowns against a stored baseline.")
+    parser.add_argument("baseline", help="Baseline results JSON written by the benchmark command")
+    parser.add_argument("--current", help="Compare against this results JSON instead of rerunning the benchmarks")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help=f"Passes over the corpus per benchmark when rerunning (default: {DEFAULT_REPEATS})")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help=f"Relative slowdown treated as a regression (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--stage-threshold", action="append", type=_parse_stage_threshold, default=[], metavar="STAGE=FRACTION",
+                        help="Per-stage threshold override, e.g. perform_stability_analysis=0.05 (repeatable)")
+    parser.add_argument("--noise-mads", type=float, default=DEFAULT_NOISE_MADS, help=f"Required margin over run-to-run noise in scaled MADs (default: {DEFAULT_NOISE_MADS})")
+    parser.add_argument("--output", help="Also save the rerun results to this JSON file")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    if args.current:
+        with open(args.current, "r") as f:
+            current = json.load(f)
+    else:
+        # Rerun on the baseline's own corpus so both sides time the same designs
+        metadata = baseline["metadata"]
+        names = [name for name in baseline["benchmarks"] if name in BENCHMARKS]
+        current = run_benchmarks(names, metadata["corpus_size"], metadata["seed"], args.repeats)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(current, f, indent=2)
+
+    for warning in comparability_warnings(baseline, current):
+        print(f"Warning: {warning}")
+    comparison = compare_reports(baseline, current, args.threshold, args.noise_mads, dict(args.stage_threshold))
+    print(format_comparison(comparison))
+    regressions = [name for name, entry in comparison.items() if entry["status"] == "regression"]
+    if regressions:
+        print(f"Performance regression in: {', '.join(regressions)}")
+        return 1
+    print("No performance regressions.")
+    return 0
@@ -0,0 +1,231 @@
+import argparse
+import copy
+import datetime
+import functools
+import hashlib
+import json
+import math
+import os
+import platform
+import random
+import time
+import numpy as np
+from parameters import default_params, soil_properties, material_properties
+from unit_conversion import convert_units
+from geometry import calculate_geometry
+from earth_pressure import calculate_ka, calculate_kp, calculate_earth_pressure, SLOPED_BACKFILL_BETA_DEG
+from analysis_context import AnalysisContext
+from stability_analysis import perform_stability_analysis
+from rebar_calculation import calculate_rebar_area
+from svg_drawing import generate_svg_drawing
+from retaining_wall_calculator import calculate_retaining_wall, __version__
+
+DEFAULT_SEED = 20240101
+DEFAULT_CORPUS_SIZE = 200
+# Each latency sample loops a call until at least this long has passed, so sub-microsecond
+# kernels are not dominated by timer resolution
+MIN_SAMPLE_S = 50e-6
+PERCENTILES = (50, 90, 99)
+
+def generate_corpus(size=DEFAULT_CORPUS_SIZE, seed=DEFAULT_SEED):
+    """Deterministic list of user parameter dicts covering both unit systems, every soil and
+    material, groundwater above and below the base, sloped backfill, surcharge and shear keys."""
+    rng = random.Random(seed)
+    soils = sorted(soil_properties)
+    corpus = []
+    for i in range(size):
+        wall_height = round(rng.uniform(2.0, 8.0), 2)
+        top_width = round(rng.uniform(0.25, 0.4), 2)
+        active_soil = rng.choice(soils)
+        # Rankine's sloped-backfill Ka is undefined for phi below the slope angle
+        sloped = rng.random() < 0.25 and soil_properties[active_soil]["friction_angle_deg"] > SLOPED_BACKFILL_BETA_DEG
+        corpus.append({
+            "units": "metric" if i % 2 == 0 else "imperial",
+            "wall_height_m": wall_height,
+            "foundation_depth_m": round(rng.uniform(0.5, 1.5), 2),
+            "toe_length_m": round(rng.uniform(0.5, 2.5), 2),
+            "heel_length_m": round(rng.uniform(1.0, 4.5), 2),
+            "wall_top_width_m": top_width,
+            "wall_base_width_m": round(top_width + rng.uniform(0.0, 0.6), 2),
+            "wall_material": "concrete" if rng.random() < 0.8 else "stone_masonry",
+            "slab_material": rng.choice(["concrete", "concrete", "cement_treated_base", "none"]),
+            "face_wall_position": rng.choice(["toe_side", "heel_side"]),
+            "active_soil_type": active_soil,
+            "passive_soil_type": rng.choice(soils),
+            "groundwater_level_m_below_base": round(rng.uniform(-2.0, 3.0), 2),
+            "shear_key_used": rng.random() < 0.3,
+            "shear_key_position": rng.choice(["toe", "heel", "under_wall"]),
+            "shear_key_depth_m": round(rng.uniform(0.3, 1.0), 2),
+            "shear_key_width_m": round(rng.uniform(0.3, 0.6), 2),
+            "active_side_ground_elevation_m": round(wall_height + (rng.uniform(0.5, 2.0) if sloped else 0.0), 2),
+            "passive_side_ground_elevation_m": 0.0,
+            "surcharge_load_kpa": round(rng.choice([0.0, rng.uniform(5.0, 25.0)]), 2),
+            "foundation_lower_than_passive_side_m": round(rng.uniform(0.0, 0.5), 2),
+        })
+    return corpus
+
+def corpus_digest(corpus):
+    """Short content hash identifying a corpus, so stored results can be checked for comparability."""
+    payload = json.dumps(corpus, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def prepare_case(user_params):
+    """Runs the pipeline up to each stage's inputs for one design (mirrors calculate_retaining_wall)."""
+    params = {**default_params, **user_params}
+    params, soils, materials = convert_units(params, copy.deepcopy(soil_properties), copy.deepcopy(material_properties))
+    geometry = calculate_geometry(params)
+    active_soil = soils[params["active_soil_type"]]
+    passive_soil = soils[params["passive_soil_type"]]
+    wall_material_props = materials[params["wall_material"]]
+    slab_material_props = (materials[params["slab_material"]] if params["slab_material"] != "none"
+                           else {"unit_weight_kn_m3": 0.0, "unit_weight_pcf": 0.0})
+    context = AnalysisContext(params, geometry, active_soil, passive_soil)
+    stability = perform_stability_analysis(params, geometry, active_soil, passive_soil, wall_material_props, slab_material_props, context)
+
+    # Stem design inputs as calculate_rebar_info builds them; the concrete grade is used even for
+    # masonry walls so every design exercises the rebar kernel
+    concrete = materials["concrete"]
+    metric = params["units"] == "metric"
+    cover = 0.075 if metric else 3 / 12
+    rebar_args = (
+        1.2 * context.stem_moment(),
+        1000 if metric else 12,
+        (geometry["t_base"] - cover) * (1000 if metric else 12),
+        concrete["f_c_prime_mpa"] if metric else concrete["f_c_prime_psi"],
+        concrete["f_y_mpa"] if metric else concrete["f_y_psi"],
+    )
+    return {
+        "user_params": user_params,
+        "params": params,
+        "geometry": geometry,
+        "active_soil": active_soil,
+        "passive_soil": passive_soil,
+        "wall_material_props": wall_material_props,
+        "slab_material_props": slab_material_props,
+        "context": context,
+        "stability": stability,
+        "beta_deg": SLOPED_BACKFILL_BETA_DEG if geometry["active_side_slope_height"] > 0 else 0,
+        "rebar_args": rebar_args,
+    }
+
+# name -> builds the zero-argument call to time for one prepared case
+BENCHMARKS = {
+    "calculate_ka": lambda case: functools.partial(calculate_ka, case["active_soil"]["friction_angle_deg"], case["beta_deg"]),
+    "calculate_kp": lambda case: functools.partial(calculate_kp, case["passive_soil"]["friction_angle_deg"]),
+    "calculate_earth_pressure": lambda case: functools.partial(
+        calculate_earth_pressure, case["active_soil"], case["geometry"]["H_total"],
+        case["geometry"]["groundwater_level_below_base"], True, case["geometry"]["surcharge_load"],
+        case["geometry"]["active_side_slope_height"]),
+    "calculate_geometry": lambda case: functools.partial(calculate_geometry, case["params"]),
+    "build_analysis_context": lambda case: functools.partial(
+        AnalysisContext, case["params"], case["geometry"], case["active_soil"], case["passive_soil"]),
+    "perform_stability_analysis": lambda case: functools.partial(
+        perform_stability_analysis, case["params"], case["geometry"], case["active_soil"], case["passive_soil"],
+        case["wall_material_props"], case["slab_material_props"], case["context"]),
+    "calculate_rebar_area": lambda case: functools.partial(calculate_rebar_area, *case["rebar_args"]),
+    "generate_svg_drawing": lambda case: functools.partial(generate_svg_drawing, case["params"], case["geometry"], case["stability"],
+                                                             case["context"]),
+    "calculate_retaining_wall": lambda case: functools.partial(calculate_retaining_wall, case["user_params"], False),
+}
+
+def _calibrate(calls, min_sample_s):
+    """Loop count per sample so that one sample of the average call lasts at least min_sample_s."""
+    start = time.perf_counter()
+    for call in calls:
+        call()
+    mean = (time.perf_counter() - start) / len(calls)
+    return max(1, math.ceil(min_sample_s / mean)) if mean > 0 else 1000
+
+def time_calls(calls, repeats=3, min_sample_s=MIN_SAMPLE_S):
+    """Per-call latencies in seconds as a (repeats, len(calls)) array: one sample per call per pass
+    over the corpus (each averaged over `number` back-to-back invocations), plus that loop count."""
+    number = _calibrate(calls, min_sample_s)
+    samples = np.empty((repeats, len(calls)))
+    perf_counter = time.perf_counter
+    for repeat in range(repeats):
+        for i, call in enumerate(calls):
+            start = perf_counter()
+            for _ in range(number):
+                call()
+            samples[repeat, i] = (perf_counter() - start) / number
+    return samples, number
+
+def summarize(samples, number):
+    """Latency percentiles (microseconds) and throughput for one benchmark. The median of each
+    pass is kept too, so comparisons can estimate run-to-run noise."""
+    repeat_medians = np.median(samples, axis=1)
+    samples = samples.ravel()
+    values = np.percentile(samples, PERCENTILES)
+    summary = {f"p{p}_us": float(value * 1e6) for p, value in zip(PERCENTILES, values)}
+    summary.update({
+        "mean_us": float(samples.mean() * 1e6),
+        "min_us": float(samples.min() * 1e6),
+        "max_us": float(samples.max() * 1e6),
+        "samples": int(samples.size),
+        "loops_per_sample": number,
+        "designs_per_s": float(1.0 / samples.mean()),
+        "repeat_medians_us": [float(value * 1e6) for value in repeat_medians],
+    })
+    return summary
+
+def environment_info():
+    """Interpreter and machine details stored alongside the results."""
+    return {
+        "version": __version__,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def run_benchmarks(names=None, corpus_size=DEFAULT_CORPUS_SIZE, seed=DEFAULT_SEED, repeats=3, min_sample_s=MIN_SAMPLE_S):
+    """Times each benchmark over the seeded corpus and returns the JSON-serializable report."""
+    names = list(names or BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Unknown benchmark(s): {', '.join(unknown)}.")
+    corpus = generate_corpus(corpus_size, seed)
+    cases = [prepare_case(user_params) for user_params in corpus]
+    results = {}
+    for name in names:
+        calls = [BENCHMARKS[name](case) for case in cases]
+        results[name] = summarize(*time_calls(calls, repeats, min_sample_s))
+    return {
+        "metadata": {
+            **environment_info(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "seed": seed,
+            "corpus_size": corpus_size,
+            "corpus_digest": corpus_digest(corpus),
+            "repeats": repeats,
+            "min_sample_s": min_sample_s,
+        },
+        "benchmarks": results,
+    }
+
+def format_report(report):
+    """Plain-text table of a run_benchmarks report."""
+    lines = [f"{'benchmark':<28} {'p50 us':>10} {'p90 us':>10} {'p99 us':>10} {'designs/s':>12}"]
+    for name, entry in report["benchmarks"].items():
+        lines.append(f"{name:<28} {entry['p50_us']:>10.2f} {entry['p90_us']:>10.2f} {entry['p99_us']:>10.2f} {entry['designs_per_s']:>12.0f}")
+    return "\n".join(lines)
+
+def benchmark_main(argv):
+    """Command line entry point for `retaining_wall_calculator.py benchmark`."""
+    parser = argparse.ArgumentParser(prog="retaining_wall_calculator.py benchmark",
+                                     description="Time every calculation stage over a seeded corpus of designs.")
+    parser.add_argument("--only", action="append", choices=list(BENCHMARKS), help="Run only this benchmark (repeatable)")
+    parser.add_argument("--corpus-size", type=int, default=DEFAULT_CORPUS_SIZE, help=f"Designs in the corpus (default: {DEFAULT_CORPUS_SIZE})")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help=f"Corpus seed (default: {DEFAULT_SEED})")
+    parser.add_argument("--repeats", type=int, default=3, help="Passes over the corpus per benchmark (default: 3)")
+    parser.add_argument("--output", default="benchmark_results.json", help="Results JSON path (default: benchmark_results.json)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.only, args.corpus_size, args.seed, args.repeats)
+    print(format_report(report))
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Benchmark results saved to {args.output}")
+    return 0
@@ -0,0 +1,148 @@
+import argparse
+import csv
+import json
+import numpy as np
+from parameters import default_params
+from batch_analysis import analyze_batch
+from design_sweep import SWEEP_RESULT_KEYS, parse_sweep_values
+from section_optimizer import MIN_FACTORS_OF_SAFETY
+from qmc_sampler import SAMPLERS, make_sampler
+
+def parse_explore_axis(key, spec):
+    """Parses an exploration axis: "low:high" is a continuous range of a numeric parameter and
+    returns (low, high); any other sweep spec is a discrete set, sampled uniformly."""
+    parts = spec.split(":")
+    if len(parts) == 2:
+        if key not in default_params:
+            raise ValueError(f"Unknown parameter '{key}'.")
+        default = default_params[key]
+        if isinstance(default, (bool, str)):
+            raise ValueError(f"'{key}' is not numeric, so it cannot take a range.")
+        low, high = (float(part) for part in parts)
+        if not low < high:
+            raise ValueError(f"Invalid range '{spec}' for '{key}'.")
+        return (low, high)
+    return parse_sweep_values(key, spec)
+
+def map_unit_rows(axes, unit_rows):
+    """Parameter columns for rows of the unit hypercube, one column per axis."""
+    columns = {}
+    for i, (key, axis) in enumerate(axes.items()):
+        u = unit_rows[:, i]
+        if isinstance(axis, tuple):
+            low, high = axis
+            columns[key] = low + u * (high - low)
+        else:
+            columns[key] = axis[np.minimum((u * len(axis)).astype(int), len(axis) - 1)]
+    return columns
+
+def passing_counts(results):
+    """Designs meeting each minimum factor of safety, and all of them ("all"). Designs whose
+    sloped-backfill Ka is undefined (phi below the slope angle) pass no check."""
+    defined = ~np.isnan(results["Pa_force"])
+    passing = {key: defined & (results[key] >= limit) for key, limit in MIN_FACTORS_OF_SAFETY.items()}
+    counts = {key: int(np.count_nonzero(mask)) for key, mask in passing.items()}
+    counts["all"] = int(np.count_nonzero(np.logical_and.reduce(list(passing.values()))))
+    return counts
+
+def run_exploration(axes, base_params, output_path, sampler, samples, chunk_size=2**14, tolerance=None, append=False):
+    """Evaluates up to `samples` low-discrepancy designs in chunks and writes one CSV row per design.
+
+    The pass rates (the share of designs meeting each of MIN_FACTORS_OF_SAFETY) are compared at
+    checkpoints where the design count doubles (chunk_size, 2 * chunk_size, 4 * chunk_size, ...);
+    with a tolerance, the run stops once no rate moves by more than it between two checkpoints.
+    Every row carries its sequence index, and next_index resumes the sequence in a later run.
+    """
+    counts = dict.fromkeys(list(MIN_FACTORS_OF_SAFETY) + ["all"], 0)
+    evaluated = 0
+    checkpoint = chunk_size
+    previous_rates = None
+    converged = False
+    checkpoints = []
+    with open(output_path, "a" if append else "w", newline="") as f:
+        writer = csv.writer(f)
+        if not append:
+            writer.writerow(["sample_index"] + list(axes) + SWEEP_RESULT_KEYS)
+        while evaluated < samples:
+            size = min(chunk_size, samples - evaluated)
+            start_index = sampler.index
+            chunk = map_unit_rows(axes, sampler.random(size))
+            results = analyze_batch({**base_params, **chunk}, auto_shear_key=True)
+            for key, count in passing_counts(results).items():
+                counts[key] += count
+            indices = range(start_index, start_index + size)
+            columns = [indices] + [chunk[key].tolist() for key in axes] + [results[key].tolist() for key in SWEEP_RESULT_KEYS]
+            writer.writerows(zip(*columns))
+            evaluated += size
+
+            if evaluated == checkpoint:
+                rates = {key: count / evaluated for key, count in counts.items()}
+                checkpoints.append({"designs": evaluated, "pass_rates": rates})
+                if tolerance is not None and previous_rates is not None:
+                    if max(abs(rates[key] - previous_rates[key]) for key in rates) <= tolerance:
+                        converged = True
+                        break
+                previous_rates = rates
+                checkpoint *= 2
+    return {
+        "designs": evaluated,
+        "next_index": sampler.index,
+        "converged": converged,
+        "pass_rates": {key: count / evaluated if evaluated else 0.0 for key, count in counts.items()},
+        "checkpoints": checkpoints,
+    }
+
+def explore_main(argv):
+    """Command line entry point for `retaining_wall_calculator.py explore`."""
+    parser = argparse.ArgumentParser(prog="retaining_wall_calculator.py explore",
+                                     description="Cover a design space with a fixed budget of quasi-random (Sobol or Halton) designs.")
+    parser.add_argument("axes", nargs="+", metavar="KEY=SPEC",
+                        help="Parameter to vary, e.g. heel_length_m=1.5:4 (continuous range), wall_base_width_m=0.4,0.5,0.6 or active_soil_type=all")
+    parser.add_argument("--sampler", choices=list(SAMPLERS), default="sobol", help="Low-discrepancy sequence (default: sobol)")
+    parser.add_argument("--samples", type=int, default=2**16, help="Maximum number of designs (default: 65536)")
+    parser.add_argument("--chunk-size", type=int, default=2**14, help="Designs per batch; keep a power of two for Sobol (default: 16384)")
+    parser.add_argument("--tolerance", type=float, help="Stop once the pass rates change by at most this much when the design count doubles")
+    parser.add_argument("--seed", type=int, default=0, help="Scrambling seed (default: 0)")
+    parser.add_argument("--no-scramble", action="store_true", help="Use the plain (unrandomized) sequence")
+    parser.add_argument("--start-index", type=int, default=0, help="Resume the sequence at this index, appending to the output")
+    parser.add_argument("--skip", type=int, default=0, help="Halton: leading points to skip (default: 0)")
+    parser.add_argument("--leap", type=int, default=1, help="Halton: take every leap-th point (default: 1)")
+    parser.add_argument("--base", help="JSON file with fixed parameter overrides")
+    parser.add_argument("--output", default="explore_results.csv", help="Results CSV path (default: explore_results.csv)")
+    parser.add_argument("--summary", help="Write the pass rates and checkpoints to this JSON file")
+    args = parser.parse_args(argv)
+
+    base_params = {}
+    if args.base:
+        with open(args.base, "r") as f:
+            base_params = json.load(f)
+
+    axes = {}
+    for item in args.axes:
+        key, sep, spec = item.partition("=")
+        if not sep:
+            parser.error(f"Expected KEY=SPEC, got '{item}'.")
+        try:
+            axes[key] = parse_explore_axis(key, spec)
+        except ValueError as e:
+            parser.error(str(e))
+
+    options = {"skip": args.skip, "leap": args.leap} if args.sampler == "halton" else {}
+    try:
+        sampler = make_sampler(args.sampler, len(axes), scramble=not args.no_scramble, seed=args.seed,
+                               start_index=args.start_index, **options)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(f"Exploring {', '.join(axes)} with up to {args.samples} {args.sampler} designs")
+    summary = run_exploration(axes, base_params, args.output, sampler, args.samples, args.chunk_size,
+                              args.tolerance, append=args.start_index > 0)
+    status = "converged" if summary["converged"] else "budget reached"
+    print(f"Wrote {summary['designs']} results to {args.output} ({status}); resume with --start-index {summary['next_index']}")
+    for key, rate in summary["pass_rates"].items():
+        print(f"  {key:<15} {rate:.2%} pass")
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Summary saved to {args.summary}")
+    return 0
@@ -0,0 +1,113 @@
+import argparse
+import contextlib
+import csv
+import json
+import math
+import numpy as np
+from parameters import default_params
+from batch_analysis import SOIL_TYPES, analyze_batch
+from stage_profiler import StageProfiler, stage
+
+# Result columns written for every design in a sweep
+SWEEP_RESULT_KEYS = [
+    "FS_overturning", "FS_sliding", "FS_bearing", "q_max", "q_min", "e",
+    "total_vertical_force", "Pa_force", "Pp_force", "shear_key_resistance", "shear_key_used",
+]
+
+SOIL_TYPE_KEYS = ("active_soil_type", "passive_soil_type")
+
+def parse_sweep_values(key, spec):
+    """Parses a sweep spec for one default_params key into an array of values.
+
+    Accepted specs: "start:stop:step" (inclusive of stop), a comma separated list, or "all"
+    for the soil type keys.
+    """
+    if key not in default_params:
+        raise ValueError(f"Unknown parameter '{key}'.")
+    default = default_params[key]
+    if spec == "all":
+        if key not in SOIL_TYPE_KEYS:
+            raise ValueError(f"'all' is only valid for {', '.join(SOIL_TYPE_KEYS)}.")
+        return np.array(SOIL_TYPES)
+    if isinstance(default, bool):
+        return np.array([item.strip().lower() in ("true", "t", "1", "yes", "y") for item in spec.split(",")])
+    if isinstance(default, str):
+        return np.array([item.strip() for item in spec.split(",")])
+    if ":" in spec:
+        start, stop, step = (float(item) for item in spec.split(":"))
+        if step <= 0 or stop < start:
+            raise ValueError(f"Invalid range '{spec}' for '{key}'.")
+        count = math.floor((stop - start) / step + 1e-9) + 1
+        # Rounding keeps values such as 0.4 + 3 * 0.05 from printing as 0.5499999999
+        return np.round(start + step * np.arange(count), 10)
+    return np.array([float(item) for item in spec.split(",")])
+
+def sweep_size(axes):
+    """Number of designs in the Cartesian product of the sweep axes."""
+    return math.prod(len(values) for values in axes.values())
+
+def iter_sweep_chunks(axes, chunk_size):
+    """Lazily yields parameter columns for consecutive chunks of the Cartesian product of `axes`.
+
+    Each chunk is built from flat design indices, so the full product is never materialized.
+    """
+    keys = list(axes)
+    shape = tuple(len(axes[key]) for key in keys)
+    total = sweep_size(axes)
+    for start in range(0, total, chunk_size):
+        flat_index = np.arange(start, min(start + chunk_size, total))
+        multi_index = np.unravel_index(flat_index, shape)
+        yield {key: axes[key][idx] for key, idx in zip(keys, multi_index)}
+
+def run_sweep(axes, base_params, output_path, chunk_size=100000):
+    """Streams the sweep through the batched stability analysis and writes one CSV row per design.
+    Returns the number of designs evaluated.
+    """
+    count = 0
+    with open(output_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(list(axes) + SWEEP_RESULT_KEYS)
+        for chunk in iter_sweep_chunks(axes, chunk_size):
+            with stage("analyze_batch"):
+                results = analyze_batch({**base_params, **chunk}, auto_shear_key=True)
+            with stage("file_io"):
+                columns = [chunk[key].tolist() for key in axes] + [results[key].tolist() for key in SWEEP_RESULT_KEYS]
+                writer.writerows(zip(*columns))
+            count += len(columns[0])
+    return count
+
+def sweep_main(argv):
+    """Command line entry point for `retaining_wall_calculator.py sweep`."""
+    parser = argparse.ArgumentParser(prog="retaining_wall_calculator.py sweep",
+                                     description="Evaluate the Cartesian product of parameter ranges.")
+    parser.add_argument("axes", nargs="+", metavar="KEY=SPEC",
+                        help="Parameter to sweep, e.g. heel_length_m=1.5:4:0.1, units=metric or active_soil_type=all")
+    parser.add_argument("--base", help="JSON file with fixed parameter overrides")
+    parser.add_argument("--output", default="sweep_results.csv", help="Results CSV path (default: sweep_results.csv)")
+    parser.add_argument("--chunk-size", type=int, default=100000, help="Designs evaluated per batch (default: 100000)")
+    parser.add_argument("--profile-stages", metavar="PATH", help="Write per-stage timings of the sweep to this JSON file")
+    args = parser.parse_args(argv)
+
+    base_params = {}
+    if args.base:
+        with open(args.base, "r") as f:
+            base_params = json.load(f)
+
+    axes = {}
+    for item in args.axes:
+        key, sep, spec = item.partition("=")
+        if not sep:
+            parser.error(f"Expected KEY=SPEC, got '{item}'.")
+        try:
+            axes[key] = parse_sweep_values(key, spec)
+        except ValueError as e:
+            parser.error(str(e))
+
+    print(f"Sweeping {sweep_size(axes)} designs over {', '.join(axes)}")
+    profiler = StageProfiler()
+    with profiler if args.profile_stages else contextlib.nullcontext():
+        count = run_sweep(axes, base_params, args.output, args.chunk_size)
+    print(f"Wrote {count} results to {args.output}")
+    if args.profile_stages:
+        profiler.write(args.profile_stages)
+        print(f"Stage profile saved to {args.profile_stages}")
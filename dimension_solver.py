@@ -0,0 +1,166 @@
+import argparse
+import csv
+import json
+import numpy as np
+from parameters import default_params
+from batch_analysis import analyze_batch, SHARED_PARAMETERS
+from design_sweep import parse_sweep_values, sweep_size, iter_sweep_chunks
+from section_optimizer import MIN_FACTORS_OF_SAFETY, DEFAULT_SEARCH_SPACE
+
+# Dimensions the solver can size, with their default search brackets in metres
+SIZING_DIMENSIONS = {key: DEFAULT_SEARCH_SPACE[key][:2] for key in
+                     ("heel_length_m", "toe_length_m", "wall_base_width_m", "foundation_depth_m", "shear_key_depth_m")}
+
+def _broadcast_columns(param_columns):
+    """Parameter columns merged over default_params and broadcast to one common length, and the
+    parameters shared by every design."""
+    p = {**default_params, **param_columns}
+    shared = {key: p.pop(key) for key in SHARED_PARAMETERS if key in p}
+    n = max([np.size(value) for value in p.values() if np.ndim(value) > 0] or [1])
+    return {key: np.broadcast_to(np.asarray(value), (n,)) for key, value in p.items()}, n, shared
+
+def _margins(columns, dimension, values, targets, auto_shear_key, shared):
+    """Smallest normalized margin FS / target - 1 over the targets (failing below zero).
+    A sloped-backfill Ka that is undefined counts as FS = 0."""
+    results = analyze_batch({**columns, **shared, dimension: values}, auto_shear_key=auto_shear_key)
+    undefined = np.isnan(results["Pa_force"])
+    margins = [np.where(undefined | np.isnan(results[key]), 0.0, results[key]) / target - 1 for key, target in targets.items()]
+    return np.minimum.reduce(margins)
+
+def solve_minimum_dimension(param_columns, dimension, targets=None, bounds=None, tolerance=1e-3,
+                            max_iterations=100, scan_points=9, auto_shear_key=True):
+    """Smallest value of `dimension` at which every design meets the target factors of safety.
+
+    param_columns holds scalars or equal-length arrays (one entry per design, see
+    analyze_batch). Each design's bracket (bounds, by default from SIZING_DIMENSIONS) is first
+    scanned at scan_points values, and the first passing value brackets the answer from above, so
+    a non-monotone response only hides a smaller solution narrower than one scan interval. The
+    bracket is then narrowed for all designs at once with Illinois regula falsi, falling back to
+    bisection whenever a step is not finite or the bracket failed to halve over the last two steps;
+    designs leave the iteration as their bracket shrinks below `tolerance`.
+
+    Returns value (the passing end of the final bracket, nan where even the upper bound fails),
+    feasible and converged masks, per-design iteration counts and the total evaluation count.
+    """
+    if dimension not in SIZING_DIMENSIONS:
+        raise ValueError(f"Cannot size '{dimension}'. Expected one of: {', '.join(SIZING_DIMENSIONS)}.")
+    targets = dict(targets or MIN_FACTORS_OF_SAFETY)
+    unknown = [key for key in targets if key not in MIN_FACTORS_OF_SAFETY]
+    if unknown:
+        raise ValueError(f"Unknown factor of safety '{unknown[0]}'. Expected one of: {', '.join(MIN_FACTORS_OF_SAFETY)}.")
+    if scan_points < 2:
+        raise ValueError("scan_points must be at least 2.")
+    columns, n, shared = _broadcast_columns(param_columns)
+    if dimension == "shear_key_depth_m":
+        columns["shear_key_used"] = np.ones(n, dtype=bool)
+    low, high = (np.broadcast_to(np.asarray(bound, dtype=float), (n,)) for bound in (bounds or SIZING_DIMENSIONS[dimension]))
+    if np.any(high <= low):
+        raise ValueError("The bounds must satisfy low < high.")
+
+    # Coarse scan of every bracket in one batch
+    fractions = np.linspace(0.0, 1.0, scan_points)
+    grid = low[:, None] + (high - low)[:, None] * fractions
+    repeated = {key: np.repeat(value, scan_points) for key, value in columns.items()}
+    scan = _margins(repeated, dimension, grid.ravel(), targets, auto_shear_key, shared).reshape(n, scan_points)
+    evaluations = grid.size
+    passing = scan >= 0
+    feasible = passing.any(axis=1)
+    first = np.argmax(passing, axis=1)
+    rows = np.arange(n)
+    b, g_b = grid[rows, first], scan[rows, first]
+    a, g_a = grid[rows, np.maximum(first - 1, 0)], scan[rows, np.maximum(first - 1, 0)]
+
+    iterations = np.zeros(n, dtype=int)
+    # Bracket widths before the last step and before the last two steps (unbounded at the start)
+    width_one_back = np.full(n, np.inf)
+    width_two_back = np.full(n, np.inf)
+    retained = np.zeros(n, dtype=int)  # +1 / -1 while the same end is kept, for the Illinois step
+    active = feasible & (first > 0) & (b - a > tolerance)
+    for _ in range(max_iterations):
+        idx = np.flatnonzero(active)
+        if idx.size == 0:
+            break
+        ai, bi, gai, gbi = a[idx], b[idx], g_a[idx], g_b[idx]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            secant = bi - gbi * (bi - ai) / (gbi - gai)
+        bisect = ~np.isfinite(secant) | (secant <= ai) | (secant >= bi) | (bi - ai > 0.5 * width_two_back[idx])
+        # Keeping the step half a tolerance inside the bracket lets a one-sided secant sequence close it
+        x = np.where(bisect, 0.5 * (ai + bi), np.clip(secant, ai + 0.5 * tolerance, bi - 0.5 * tolerance))
+        g = _margins({key: column[idx] for key, column in columns.items()}, dimension, x, targets, auto_shear_key, shared)
+        evaluations += idx.size
+        iterations[idx] += 1
+
+        passes = g >= 0
+        # Illinois: halve the retained end's margin when the same end survives twice in a row
+        keep_a = passes & (retained[idx] == 1)
+        keep_b = ~passes & (retained[idx] == -1)
+        g_a[idx[keep_a]] *= 0.5
+        g_b[idx[keep_b]] *= 0.5
+        retained[idx] = np.where(passes, 1, -1)
+        b[idx[passes]], g_b[idx[passes]] = x[passes], g[passes]
+        a[idx[~passes]], g_a[idx[~passes]] = x[~passes], g[~passes]
+
+        width_two_back[idx] = width_one_back[idx]
+        width_one_back[idx] = bi - ai
+        active[idx] = b[idx] - a[idx] > tolerance
+
+    value = np.where(feasible, b, np.nan)
+    return {
+        "dimension": dimension,
+        "targets": targets,
+        "value": value,
+        "feasible": feasible,
+        "converged": feasible & ~active,
+        "iterations": iterations,
+        "evaluations": evaluations,
+    }
+
+def _parse_target(spec):
+    key, sep, value = spec.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"Expected FS_KEY=VALUE, got '{spec}'.")
+    return key, float(value)
+
+def size_main(argv):
+    """Command line entry point for `retaining_wall_calculator.py size`."""
+    parser = argparse.ArgumentParser(prog="retaining_wall_calculator.py size",
+                                     description="Find the smallest dimension that meets target factors of safety for every design of a sweep.")
+    parser.add_argument("dimension", choices=list(SIZING_DIMENSIONS), help="Dimension to size")
+    parser.add_argument("axes", nargs="*", metavar="KEY=SPEC", help="Designs to size, as for the sweep command, e.g. wall_height_m=2:8:0.5")
+    parser.add_argument("--target", action="append", type=_parse_target, metavar="FS_KEY=VALUE",
+                        help="Target factor of safety, repeatable (default: the minimum factors of safety for all checks)")
+    parser.add_argument("--bounds", nargs=2, type=float, metavar=("LOW", "HIGH"), help="Search bracket (default depends on the dimension)")
+    parser.add_argument("--tolerance", type=float, default=1e-3, help="Bracket width at convergence (default: 0.001)")
+    parser.add_argument("--base", help="JSON file with fixed parameter overrides")
+    parser.add_argument("--output", default="sizing_results.csv", help="Results CSV path (default: sizing_results.csv)")
+    args = parser.parse_args(argv)
+
+    base_params = {}
+    if args.base:
+        with open(args.base, "r") as f:
+            base_params = json.load(f)
+    axes = {}
+    for item in args.axes:
+        key, sep, spec = item.partition("=")
+        if not sep:
+            parser.error(f"Expected KEY=SPEC, got '{item}'.")
+        try:
+            axes[key] = parse_sweep_values(key, spec)
+        except ValueError as e:
+            parser.error(str(e))
+
+    designs = next(iter_sweep_chunks(axes, sweep_size(axes))) if axes else {}
+    try:
+        result = solve_minimum_dimension({**base_params, **designs}, args.dimension, dict(args.target or []) or None,
+                                         args.bounds, args.tolerance)
+    except ValueError as e:
+        parser.error(str(e))
+    with open(args.output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(list(axes) + [args.dimension, "feasible", "converged", "iterations"])
+        writer.writerows(zip(*[designs[key].tolist() for key in axes], result["value"].tolist(), result["feasible"].tolist(),
+                             result["converged"].tolist(), result["iterations"].tolist()))
+    print(f"Sized {len(result['value'])} designs with {result['evaluations']} evaluations "
+          f"({int(np.count_nonzero(~result['feasible']))} infeasible within the bounds)")
+    print(f"Results saved to {args.output}")
+    return 0
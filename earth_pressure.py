@@ -1,5 +1,11 @@
 
 import math
+import numpy as np
+from quadrature import adaptive_simpson
+
+# Backfill slope angle used for a sloped active side (1V:2H, beta = atan(1/2))
+SLOPED_BACKFILL_BETA_DEG = 26.565
+UNIT_WEIGHT_WATER = 9.81 # kN/m^3
 
 def calculate_ka(phi_deg, beta_deg=0):
     """Calculates Rankine's active earth pressure coefficient for horizontal or sloped backfill."""
@@ -19,6 +25,46 @@ def calculate_kp(phi_deg):
     phi_rad = math.radians(phi_deg)
     return math.tan(math.pi/4 + phi_rad/2)**2
 
+# --- Pressure Coefficient Cache ---
+# Ka/Kp keyed by (phi, beta, is_active) for the scalar path (calculate_earth_pressure and
+# get_pressure_coefficient); the array kernels are cheaper than a lookup per element and bypass it.
+# Keys are the angle values rather than soil names, so editing soil_properties can never return a
+# stale coefficient. Once MAX_CACHED_COEFFICIENTS is reached the least recently used entry is
+# evicted; call clear_coefficient_cache() to release entries or reset the counters.
+MAX_CACHED_COEFFICIENTS = 4096
+_coefficient_cache = {}
+_coefficient_cache_stats = {"hits": 0, "misses": 0}
+
+def get_pressure_coefficient(phi_deg, beta_deg=0, is_active=True):
+    """Returns Ka (is_active) or Kp for the given angles, memoized (least recently used evicted)."""
+    key = (float(phi_deg), float(beta_deg) if is_active else 0.0, bool(is_active))
+    K = _coefficient_cache.pop(key, None)
+    if K is not None:
+        _coefficient_cache_stats["hits"] += 1
+    else:
+        _coefficient_cache_stats["misses"] += 1
+        K = calculate_ka(phi_deg, beta_deg) if is_active else calculate_kp(phi_deg)
+        if len(_coefficient_cache) >= MAX_CACHED_COEFFICIENTS:
+            del _coefficient_cache[next(iter(_coefficient_cache))]
+    # Dicts keep insertion order, so re-inserting moves the key to the most recently used end
+    _coefficient_cache[key] = K
+    return K
+
+def clear_coefficient_cache():
+    """Drops all memoized coefficients and resets the counters."""
+    _coefficient_cache.clear()
+    _coefficient_cache_stats["hits"] = 0
+    _coefficient_cache_stats["misses"] = 0
+
+def coefficient_cache_stats():
+    """Hit/miss counters and size of the coefficient cache."""
+    lookups = _coefficient_cache_stats["hits"] + _coefficient_cache_stats["misses"]
+    return {
+        **_coefficient_cache_stats,
+        "entries": len(_coefficient_cache),
+        "hit_rate": _coefficient_cache_stats["hits"] / lookups if lookups else 0.0,
+    }
+
 def calculate_earth_pressure(soil_props, height, groundwater_depth=None, is_active=True, surcharge_load=0.0, active_side_slope_height=0.0):
     """Calculates earth pressure at a given depth, including surcharge effect and slope effect."""
     gamma = soil_props["unit_weight_kn_m3"]
@@ -28,49 +74,142 @@ def calculate_earth_pressure(soil_props, height, groundwater_depth=None, is_acti
     beta_deg = 0 # Angle of backfill with horizontal
     if is_active and active_side_slope_height > 0:
         # Assuming a 1V:2H slope for now, so beta = atan(1/2) = 26.565 degrees
-        beta_deg = 26.565 # This should ideally be derived from geometry
+        beta_deg = SLOPED_BACKFILL_BETA_DEG # This should ideally be derived from geometry
 
-    if is_active:
-        K = calculate_ka(phi, beta_deg)
-    else:
-        K = calculate_kp(phi)
+    K = get_pressure_coefficient(phi, beta_deg, is_active)
 
     pressure = gamma * height * K + surcharge_load * K # Add surcharge effect
 
     # Simplified groundwater effect (assuming submerged unit weight for soil below GWL)
     if groundwater_depth is not None and height > groundwater_depth:
-        gamma_submerged = gamma - 9.81 # Assuming unit weight of water is 9.81 kN/m^3
-        pressure_above_gw = gamma * groundwater_depth * K
-        pressure_below_gw = gamma_submerged * (height - groundwater_depth) * K + 9.81 * (height - groundwater_depth) # Add hydrostatic pressure
+        gamma_submerged = gamma - UNIT_WEIGHT_WATER
+        pressure_above_gw = gamma * groundwater_depth * K + surcharge_load * K # The surcharge acts below the water table too
+        pressure_below_gw = gamma_submerged * (height - groundwater_depth) * K + UNIT_WEIGHT_WATER * (height - groundwater_depth) # Add hydrostatic pressure
         pressure = pressure_above_gw + pressure_below_gw
 
     return pressure
 
-def calculate_point_load_effect(point_load, distance_from_wall, H_total, phi_deg):
-    """Calculates the horizontal pressure due to a point load (simplified).
-    This is a very simplified approach, assuming a triangular distribution from the point of application.
-    More rigorous methods (e.g., Boussinesq) exist for accurate analysis.
+def calculate_ka_array(phi_deg, beta_deg=0):
+    """Array form of calculate_ka; phi_deg and beta_deg broadcast against each other.
+    Where the sloped-backfill Ka is undefined (phi below beta) the result is nan."""
+    phi_rad = np.radians(phi_deg)
+    beta_rad = np.radians(beta_deg)
+    K = np.tan(np.pi/4 - phi_rad/2)**2
+    sloped = np.broadcast_to(np.asarray(beta_deg) != 0, K.shape)
+    if sloped.any():
+        cos_beta = np.cos(np.broadcast_to(beta_rad, K.shape)[sloped])
+        with np.errstate(invalid="ignore"):
+            root = np.sqrt(cos_beta**2 - np.cos(np.broadcast_to(phi_rad, K.shape)[sloped])**2)
+        K = np.array(K, dtype=float)
+        K[sloped] = cos_beta * ((cos_beta - root) / (cos_beta + root))
+    return K
+
+def calculate_kp_array(phi_deg):
+    """Array form of calculate_kp."""
+    phi_rad = np.radians(phi_deg)
+    return np.tan(np.pi/4 + phi_rad/2)**2
+
+def pressure_coefficient_array(phi_deg, beta_deg=0, is_active=True):
+    """Array of Ka (is_active) or Kp values from the array kernels, with the shape of phi_deg and
+    beta_deg broadcast together. Pairs with an undefined sloped-backfill Ka (phi below beta) give
+    nan instead of raising.
+    """
+    phi_deg, beta_deg = np.broadcast_arrays(np.asarray(phi_deg, dtype=float), np.asarray(beta_deg, dtype=float))
+    return calculate_ka_array(phi_deg, beta_deg) if is_active else calculate_kp_array(phi_deg)
+
+def lateral_pressure_array(unit_weight, K, height, groundwater_depth=None, surcharge_load=0.0):
+    """Array form of the pressure expression in calculate_earth_pressure for a known coefficient K.
+    Depths below the groundwater table are selected with a mask rather than a per-call branch.
+    """
+    pressure = np.array(unit_weight * height * K + surcharge_load * K, dtype=float)
+    if groundwater_depth is None:
+        return pressure
+    # The groundwater depth may be the only array argument
+    pressure = np.array(np.broadcast_to(pressure, np.broadcast_shapes(pressure.shape, np.shape(groundwater_depth))))
+    submerged = np.broadcast_to(height > groundwater_depth, pressure.shape)
+    if submerged.any():
+        gamma = np.broadcast_to(unit_weight, pressure.shape)[submerged]
+        K_sub = np.broadcast_to(K, pressure.shape)[submerged]
+        gw = np.broadcast_to(groundwater_depth, pressure.shape)[submerged]
+        depth_below_gw = np.broadcast_to(height, pressure.shape)[submerged] - gw
+        surcharge = np.broadcast_to(surcharge_load, pressure.shape)[submerged]
+        pressure[submerged] = (gamma * gw + surcharge) * K_sub + (gamma - UNIT_WEIGHT_WATER) * depth_below_gw * K_sub + UNIT_WEIGHT_WATER * depth_below_gw
+    return pressure
+
+def calculate_earth_pressure_array(unit_weight, phi_deg, height, groundwater_depth=None, is_active=True, surcharge_load=0.0, beta_deg=0.0):
+    """Array form of calculate_earth_pressure. All numeric arguments broadcast against each other;
+    beta_deg is the backfill slope (use SLOPED_BACKFILL_BETA_DEG where the active side slopes).
+    """
+    K = pressure_coefficient_array(phi_deg, beta_deg, is_active)
+    return lateral_pressure_array(unit_weight, K, height, groundwater_depth, surcharge_load)
+
+# --- Point Load ---
+# Lateral pressure from a surface point load Q at distance x behind the wall, on the wall section
+# opposite the load: Boussinesq's horizontal stress, doubled for a rigid (unyielding) wall as if an
+# image load stood on the other side of it. With m = x/H and n = z/H for a retained height H:
+#   sigma_h = Q / H^2 * s(m, n),  s = (3 m^2 n / rho^5 - (1 - 2 nu) / (rho (rho + n))) / pi,  rho = sqrt(m^2 + n^2)
+# Soil carries no tension, so negative values (near the surface for nu < 0.5) are dropped.
+POINT_LOAD_POISSON_RATIO = 0.5
+POINT_LOAD_TOLERANCE = 1e-6
+# Distinct distance ratios integrated together; small blocks keep the panel arrays in cache
+POINT_LOAD_BLOCK = 1024
+
+def _point_load_shape(m, n, poisson_ratio):
+    """s(m, n) and its derivative with respect to m."""
+    rho2 = m * m + n * n
+    rho = np.sqrt(rho2)
+    inv_rho5 = 1 / (rho2 * rho2 * rho)
+    c = 1 - 2 * poisson_ratio
+    s = (3 * m * m * n * inv_rho5 - c / (rho * (rho + n))) / np.pi
+    ds = (m * n * inv_rho5 * (6 - 15 * m * m / rho2) + c * m * (2 * rho + n) / (rho2 * rho * (rho + n) ** 2)) / np.pi
+    positive = s > 0
+    return np.where(positive, s, 0.0), np.where(positive, ds, 0.0)
+
+def point_load_pressure(point_load, distance_from_wall, height, depth, poisson_ratio=POINT_LOAD_POISSON_RATIO):
+    """Lateral pressure at `depth` below the surface on a wall retaining `height`, elementwise."""
+    height = np.asarray(height, dtype=float)
+    s, _ = _point_load_shape(np.asarray(distance_from_wall, dtype=float) / height, np.asarray(depth, dtype=float) / height, poisson_ratio)
+    return np.asarray(point_load, dtype=float) / height**2 * s
+
+def point_load_factors(m, poisson_ratio=POINT_LOAD_POISSON_RATIO, tolerance=POINT_LOAD_TOLERANCE):
+    """Dimensionless resultants F = integral of s dn and G = integral of s (1 - n) dn over n in [0, 1],
+    with their derivatives dF/dm and dG/dm, for an array of distance ratios m = x/H > 0.
+
+    The force per unit length of wall is Q/H * F and its moment about the base Q * G. The
+    integrals use adaptive_simpson over the depth, once per distinct m, so the mesh follows the
+    pressure peak at n ~ m/2, which sharpens as the load approaches the wall.
     """
-    # For simplicity, assume the point load creates a triangular pressure distribution
-    # that starts at the depth of application and extends to the base of the wall.
-    # The maximum pressure is at the point of application and decreases linearly to zero at the base.
-    # This is a highly simplified model and should be used with caution.
-
-    # Assuming the point load acts at the ground surface for simplicity in this initial implementation.
-    # The horizontal pressure at any depth z due to a point load Q at distance x from the wall
-    # can be approximated by a simplified formula (e.g., based on a 2:1 stress distribution).
-    # For this simplified model, let's assume the point load creates an equivalent horizontal force
-    # that is distributed over the height of the wall below the point of application.
-
-    # This is a placeholder. A more accurate model would involve integrating Boussinesq's equation
-    # or using pressure distribution diagrams for point loads.
-
-    # For now, let's assume the point load contributes to an equivalent horizontal force
-    # that acts at 2/3 of the height from the base, similar to a triangular pressure.
-    # This is a very rough approximation.
-
-    # A very simplified approach: treat point load as an equivalent horizontal force
-    # acting at the height of the wall, and apply it as a concentrated force.
-    # This is not a pressure, but a force.
-    # For now, return 0.0 and add a note in the report that point load is not fully implemented.
-    return 0.0
+    m = np.asarray(m, dtype=float)
+    distinct, inverse = np.unique(m, return_inverse=True)
+    integrals = np.empty((len(distinct), 4))
+    for start in range(0, len(distinct), POINT_LOAD_BLOCK):
+        block = distinct[start:start + POINT_LOAD_BLOCK]
+
+        def integrand(owner, n):
+            s, ds = _point_load_shape(block[owner], n, poisson_ratio)
+            return np.stack([s, s * (1 - n), ds, ds * (1 - n)], axis=1)
+
+        integrals[start:start + len(block)], _, _ = adaptive_simpson(integrand, np.zeros(len(block)), np.ones(len(block)), tolerance)
+    F, G, dF, dG = (integrals[inverse.ravel(), i].reshape(m.shape) for i in range(4))
+    return F, G, dF, dG
+
+def point_load_effect_array(point_load, distance_from_wall, height, poisson_ratio=POINT_LOAD_POISSON_RATIO):
+    """Resultant lateral force per unit length of wall and its moment about the bottom of the
+    retained height, elementwise; zero where there is no load."""
+    Q, x, H = np.broadcast_arrays(*(np.asarray(value, dtype=float) for value in (point_load, distance_from_wall, height)))
+    force, moment = np.zeros(Q.shape), np.zeros(Q.shape)
+    loaded = (Q != 0) & (H > 0)
+    if not loaded.any():
+        return force, moment
+    if np.any(x[loaded] <= 0):
+        raise ValueError("The point load must be at a positive distance from the wall.")
+    F, G, _, _ = point_load_factors(x[loaded] / H[loaded], poisson_ratio)
+    force[loaded] = Q[loaded] / H[loaded] * F
+    moment[loaded] = Q[loaded] * G
+    return force, moment
+
+def calculate_point_load_effect(point_load, distance_from_wall, H_total, poisson_ratio=POINT_LOAD_POISSON_RATIO):
+    """Lateral force per unit length of wall from a surface point load (see point_load_factors),
+    its moment about the base and its line of action (height above the base)."""
+    force, moment = (float(value) for value in point_load_effect_array(point_load, distance_from_wall, H_total, poisson_ratio))
+    return {"force": force, "moment": moment, "line_of_action": moment / force if force else 0.0}
@@ -0,0 +1,204 @@
+import argparse
+import csv
+import itertools
+import json
+import math
+import numpy as np
+from parameters import default_params
+from batch_analysis import analyze_batch
+from design_exploration import parse_explore_axis
+from section_optimizer import MIN_FACTORS_OF_SAFETY
+
+# Mapped dimensions as (low, high) in metres
+DEFAULT_BOUNDARY_AXES = {
+    "heel_length_m": (0.5, 6.0),
+    "wall_base_width_m": (0.3, 1.5),
+    "wall_height_m": (2.0, 8.0),
+}
+
+CHECKS = list(MIN_FACTORS_OF_SAFETY)
+
+# Factors of safety are capped before interpolating margins (an infinite FS has no useful slope)
+FS_CAP = 10.0
+
+def safety_margins(results):
+    """Normalized margins FS / minimum - 1 per check, shape (n, len(CHECKS)); negative fails.
+    Designs whose sloped-backfill Ka is undefined get FS = 0."""
+    undefined = np.isnan(results["Pa_force"])
+    margins = []
+    for key in CHECKS:
+        fs = np.where(undefined | np.isnan(results[key]), 0.0, np.minimum(results[key], FS_CAP))
+        margins.append(fs / MIN_FACTORS_OF_SAFETY[key] - 1)
+    return np.stack(margins, axis=1)
+
+class _LatticeEvaluations:
+    """Results of the lattice vertices evaluated so far, looked up by flat vertex id."""
+
+    def __init__(self, axes, base_params, resolution):
+        self.keys = list(axes)
+        self.low = np.array([axes[key][0] for key in self.keys], dtype=float)
+        self.step = np.array([axes[key][1] - axes[key][0] for key in self.keys], dtype=float) / resolution
+        self.shape = tuple(int(n) + 1 for n in resolution)
+        self.base_params = base_params
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.fs = np.zeros((0, len(CHECKS)))
+        self.margins = np.zeros((0, len(CHECKS)))
+
+    def to_physical(self, vertices):
+        return self.low + vertices * self.step
+
+    def lookup(self, vertices):
+        """Margins of lattice vertices (shape (n, d)), evaluating any not seen before in one batch."""
+        ids = np.ravel_multi_index(tuple(vertices.T), self.shape)
+        missing = np.setdiff1d(ids, self.ids)
+        if missing.size:
+            values = self.to_physical(np.stack(np.unravel_index(missing, self.shape), axis=1))
+            results = analyze_batch({**self.base_params, **dict(zip(self.keys, values.T))}, auto_shear_key=True)
+            order = np.argsort(np.concatenate([self.ids, missing]))
+            self.ids = np.concatenate([self.ids, missing])[order]
+            self.fs = np.concatenate([self.fs, np.stack([results[key] for key in CHECKS], axis=1)])[order]
+            self.margins = np.concatenate([self.margins, safety_margins(results)])[order]
+        return self.margins[np.searchsorted(self.ids, ids)]
+
+def _boundary_points(lattice, cells, size, corners):
+    """Points where the governing (smallest) margin crosses zero on the edges of the given cells,
+    by linear interpolation, with the check governing at each point."""
+    d = cells.shape[1]
+    starts, ends = [], []
+    for axis in range(d):
+        lower = corners[corners[:, axis] == 0]
+        starts.append((cells[:, None, :] + lower[None] * size).reshape(-1, d))
+        upper = lower.copy()
+        upper[:, axis] = 1
+        ends.append((cells[:, None, :] + upper[None] * size).reshape(-1, d))
+    starts, ends = np.concatenate(starts), np.concatenate(ends)
+    # Neighbouring cells share edges
+    _, unique = np.unique(np.concatenate([starts, ends], axis=1), axis=0, return_index=True)
+    starts, ends = starts[unique], ends[unique]
+    m0, m1 = lattice.lookup(starts), lattice.lookup(ends)
+    g0, g1 = m0.min(axis=1), m1.min(axis=1)
+    crossing = (g0 >= 0) != (g1 >= 0)
+    starts, ends, m0, m1, g0, g1 = starts[crossing], ends[crossing], m0[crossing], m1[crossing], g0[crossing], g1[crossing]
+    t = g0 / (g0 - g1)
+    points = lattice.to_physical(starts + t[:, None] * (ends - starts))
+    governing = np.argmin(m0 + t[:, None] * (m1 - m0), axis=1)
+    return points, [CHECKS[i] for i in governing]
+
+def refine_boundary(axes=None, base_params=None, initial_divisions=4, tolerance=0.05):
+    """Maps the feasibility boundary (all of MIN_FACTORS_OF_SAFETY met) over the given axes.
+
+    The box is split into initial_divisions cells along the longest axis (and proportionally fewer
+    along shorter ones, so cells are roughly cubic); each cell whose corners straddle the
+    threshold of any check is split in half along every axis, level by level, until the cell edges
+    are at most `tolerance` (in parameter units). Only the corners of straddling cells are
+    evaluated, one batch per level. Features smaller than the initial cells can be missed, as in
+    any corner-sampled refinement.
+
+    Returns the boundary points (linear interpolation of the governing margin on the edges of the
+    finest straddling cells, with the governing check), every evaluated point with its factors of
+    safety and feasibility, and the evaluation count against a uniform grid of the same resolution.
+    """
+    axes = dict(axes or DEFAULT_BOUNDARY_AXES)
+    if not axes:
+        raise ValueError("At least one axis is required.")
+    if initial_divisions < 1 or tolerance <= 0:
+        raise ValueError("initial_divisions and tolerance must be positive.")
+    d = len(axes)
+    spans = np.array([high - low for low, high in axes.values()], dtype=float)
+    if np.any(spans <= 0):
+        raise ValueError("Every axis needs low < high.")
+    divisions = np.maximum(1, np.ceil(initial_divisions * spans / spans.max() - 1e-9)).astype(int)
+    levels = max(0, math.ceil(math.log2(np.max(spans / divisions) / tolerance)))
+    resolution = divisions * 2**levels
+    lattice = _LatticeEvaluations(axes, {**default_params, **(base_params or {})}, resolution)
+
+    corners = np.array(list(itertools.product((0, 1), repeat=d)))
+    size = 2**levels
+    cells = np.stack(np.meshgrid(*[np.arange(n) * size for n in divisions], indexing="ij"), axis=-1).reshape(-1, d)
+    history = []
+    for level in range(levels + 1):
+        margins = lattice.lookup((cells[:, None, :] + corners[None] * size).reshape(-1, d)).reshape(len(cells), len(corners), -1)
+        straddling = np.any(np.any(margins >= 0, axis=1) & np.any(margins < 0, axis=1), axis=1)
+        history.append({"level": level, "cells": len(cells), "straddling": int(np.count_nonzero(straddling)),
+                        "evaluations": len(lattice.ids)})
+        cells = cells[straddling]
+        if level == levels:
+            break
+        size //= 2
+        cells = (cells[:, None, :] + corners[None] * size).reshape(-1, d)
+
+    boundary, governing = _boundary_points(lattice, cells, size, corners)
+    points = lattice.to_physical(np.stack(np.unravel_index(lattice.ids, lattice.shape), axis=1))
+    return {
+        "axes": {key: list(bounds) for key, bounds in axes.items()},
+        "tolerance": tolerance,
+        "cell_size": (spans / resolution).tolist(),
+        "evaluations": len(lattice.ids),
+        "uniform_grid_evaluations": int(np.prod(resolution + 1)),
+        "levels": history,
+        "boundary_points": boundary,
+        "boundary_governing": governing,
+        "points": points,
+        "points_fs": lattice.fs,
+        "points_feasible": np.all(lattice.margins >= 0, axis=1),
+    }
+
+def write_points_csv(result, path):
+    """Writes the classified point set: axis values, factors of safety and feasibility."""
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(list(result["axes"]) + CHECKS + ["feasible"])
+        writer.writerows(zip(*result["points"].T.tolist(), *result["points_fs"].T.tolist(), result["points_feasible"].tolist()))
+
+def boundary_main(argv):
+    """Command line entry point for `retaining_wall_calculator.py boundary`."""
+    parser = argparse.ArgumentParser(prog="retaining_wall_calculator.py boundary",
+                                     description="Map where designs stop meeting the minimum factors of safety, refining only near the boundary.")
+    parser.add_argument("axes", nargs="*", metavar="KEY=LOW:HIGH",
+                        help="Dimension to map (default: heel_length_m=0.5:6 wall_base_width_m=0.3:1.5 wall_height_m=2:8)")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="Largest cell edge at the boundary, in parameter units (default: 0.05)")
+    parser.add_argument("--initial-divisions", type=int, default=4, help="Coarse cells along the longest axis (default: 4)")
+    parser.add_argument("--base", help="JSON file with fixed parameter overrides")
+    parser.add_argument("--output", default="boundary.json", help="Boundary points JSON path (default: boundary.json)")
+    parser.add_argument("--points", help="Write every evaluated point with its classification to this CSV file")
+    args = parser.parse_args(argv)
+
+    base_params = {}
+    if args.base:
+        with open(args.base, "r") as f:
+            base_params = json.load(f)
+    axes = {}
+    for item in args.axes:
+        key, sep, spec = item.partition("=")
+        if not sep:
+            parser.error(f"Expected KEY=LOW:HIGH, got '{item}'.")
+        try:
+            axes[key] = parse_explore_axis(key, spec)
+        except ValueError as e:
+            parser.error(str(e))
+        if not isinstance(axes[key], tuple):
+            parser.error(f"'{key}' needs a LOW:HIGH range.")
+
+    try:
+        result = refine_boundary(axes, base_params, args.initial_divisions, args.tolerance)
+    except ValueError as e:
+        parser.error(str(e))
+    share = result["evaluations"] / result["uniform_grid_evaluations"]
+    print(f"{result['evaluations']} evaluations ({share:.1%} of a {result['uniform_grid_evaluations']}-point uniform grid), "
+          f"{len(result['boundary_points'])} boundary points")
+    with open(args.output, "w") as f:
+        json.dump({
+            "axes": result["axes"],
+            "tolerance": result["tolerance"],
+            "cell_size": result["cell_size"],
+            "evaluations": result["evaluations"],
+            "uniform_grid_evaluations": result["uniform_grid_evaluations"],
+            "levels": result["levels"],
+            "boundary": [dict(zip(result["axes"], point), governing=check)
+                         for point, check in zip(result["boundary_points"].tolist(), result["boundary_governing"])],
+        }, f, indent=2)
+    print(f"Boundary saved to {args.output}")
+    if args.points:
+        write_points_csv(result, args.points)
+        print(f"Classified points saved to {args.points}")
+    return 0
@@ -0,0 +1,103 @@
+import numpy as np
+
+# Minimal forward-mode automatic differentiation over numpy arrays
+
+class Dual:
+    """Array of values with their gradients with respect to k seed variables.
+
+    value has any shape; grad has shape value.shape + (k,). Arithmetic with plain numbers or
+    arrays treats them as constants. Comparisons are not overloaded: compare `.value` explicitly.
+    """
+    __slots__ = ("value", "grad")
+    # Makes ndarray (op) Dual dispatch to the Dual's reflected operator
+    __array_ufunc__ = None
+
+    def __init__(self, value, grad):
+        self.value = np.asarray(value, dtype=float)
+        self.grad = np.asarray(grad, dtype=float)
+
+    @classmethod
+    def variables(cls, values, grad):
+        """Seeds: values with shape (n, k) and their gradient rows grad with shape (n, k, k)."""
+        return [cls(values[:, i], grad[:, i, :]) for i in range(values.shape[1])]
+
+    def _broadcast_grad(self, shape):
+        return np.broadcast_to(self.grad, tuple(shape) + self.grad.shape[-1:])
+
+    def __add__(self, other):
+        if isinstance(other, Dual):
+            value = self.value + other.value
+            return Dual(value, self._broadcast_grad(value.shape) + other._broadcast_grad(value.shape))
+        value = self.value + other
+        return Dual(value, self._broadcast_grad(np.shape(value)))
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return Dual(-self.value, -self.grad)
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def __rsub__(self, other):
+        return (-self) + other
+
+    def __mul__(self, other):
+        if isinstance(other, Dual):
+            return Dual(self.value * other.value,
+                        self.grad * other.value[..., None] + other.grad * self.value[..., None])
+        other = np.asarray(other, dtype=float)
+        return Dual(self.value * other, self.grad * other[..., None])
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if isinstance(other, Dual):
+            value = self.value / other.value
+            return Dual(value, (self.grad - other.grad * value[..., None]) / other.value[..., None])
+        other = np.asarray(other, dtype=float)
+        return Dual(self.value / other, self.grad / other[..., None])
+
+    def __rtruediv__(self, other):
+        value = np.asarray(other, dtype=float) / self.value
+        return Dual(value, -self.grad * (value / self.value)[..., None])
+
+    def __pow__(self, exponent):
+        return Dual(self.value ** exponent, self.grad * (exponent * self.value ** (exponent - 1))[..., None])
+
+def value_of(x):
+    """The value of a Dual, or x itself."""
+    return x.value if isinstance(x, Dual) else x
+
+def _apply(x, function, derivative):
+    if isinstance(x, Dual):
+        return Dual(function(x.value), x.grad * derivative(x.value)[..., None])
+    return function(x)
+
+def chain(x, value, derivative):
+    """f(x) for a function evaluated elsewhere: its value and derivative at value_of(x)."""
+    if isinstance(x, Dual):
+        return Dual(value, x.grad * np.asarray(derivative, dtype=float)[..., None])
+    return value
+
+def tan(x):
+    return _apply(x, np.tan, lambda v: 1 / np.cos(v) ** 2)
+
+def cos(x):
+    return _apply(x, np.cos, lambda v: -np.sin(v))
+
+def sqrt(x):
+    return _apply(x, np.sqrt, lambda v: 0.5 / np.sqrt(v))
+
+def exp(x):
+    return _apply(x, np.exp, np.exp)
+
+def where(condition, a, b):
+    """np.where for values and gradients alike."""
+    if not isinstance(a, Dual) and not isinstance(b, Dual):
+        return np.where(condition, a, b)
+    k = (a if isinstance(a, Dual) else b).grad.shape[-1]
+    value = np.where(condition, value_of(a), value_of(b))
+    grad_a = a.grad if isinstance(a, Dual) else np.zeros(np.shape(a) + (k,))
+    grad_b = b.grad if isinstance(b, Dual) else np.zeros(np.shape(b) + (k,))
+    return Dual(value, np.where(np.asarray(condition)[..., None], grad_a, grad_b))
@@ -0,0 +1,132 @@
+import argparse
+import functools
+import json
+import math
+import sys
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from retaining_wall_calculator import calculate_retaining_wall
+from result_cache import DEFAULT_MAX_BYTES, get_process_cache
+from stage_profiler import StageProfiler
+
+def _finite_or_none(value):
+    """Replaces non-finite floats (e.g. FS = inf) with None so every line is strict JSON."""
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _finite_or_none(item) for key, item in value.items()}
+    return value
+
+def parse_record(line, line_number):
+    """Splits one input line into (id, params). A line is either a flat parameter object with an
+    optional "id" key or {"id": ..., "params": {...}}; the id defaults to the line number."""
+    data = json.loads(line)
+    if not isinstance(data, dict):
+        raise ValueError("Each line must be a JSON object.")
+    record_id = data.get("id", line_number)
+    if "params" in data:
+        return record_id, data["params"]
+    return record_id, {key: value for key, value in data.items() if key != "id"}
+
+def evaluate_record(record_id, params, include_svg=False, include_summary=False, cache_path=None, cache_max_bytes=DEFAULT_MAX_BYTES):
+    """Calculates one design and returns the compact result object (errors are reported, not raised)."""
+    cached = None
+    try:
+        if cache_path:
+            results, cached = get_process_cache(cache_path, cache_max_bytes).get_or_calculate(params)
+        else:
+            results = calculate_retaining_wall(params, verbose=False)
+    except Exception as e:
+        return {"id": record_id, "error": f"{type(e).__name__}: {e}"}
+    output = {
+        "id": record_id,
+        "shear_key_used": results["params"]["shear_key_used"],
+        "stability": _finite_or_none(results["stability"]),
+        "rebar": results["rebar"],
+    }
+    if include_summary:
+        output["summary"] = results["summary"]
+    if include_svg:
+        output["svg_drawing"] = results["svg_drawing"]
+    if cached is not None:
+        output["cached"] = cached
+    return output
+
+def profile_record(record_id, params, *options, track_allocations=False):
+    """evaluate_record under a StageProfiler; returns (output, stage stats)."""
+    with StageProfiler(track_allocations) as profiler:
+        output = evaluate_record(record_id, params, *options)
+    return output, profiler.stages
+
+def _write(output, stream):
+    stream.write(json.dumps(output, separators=(",", ":")) + "\n")
+    stream.flush()
+
+def _read_records(input_stream, output_stream):
+    """Yields (id, params) per non-blank line; malformed lines are answered with an error line."""
+    for line_number, line in enumerate(input_stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield parse_record(line, line_number)
+        except ValueError as e:
+            _write({"id": line_number, "error": f"{type(e).__name__}: {e}"}, output_stream)
+
+def run_stream(input_stream, output_stream, workers=1, max_in_flight=None, include_svg=False, include_summary=False,
+               cache_path=None, cache_max_bytes=DEFAULT_MAX_BYTES, profiler=None):
+    """Streams designs from input_stream to results on output_stream, one JSON object per line.
+
+    With workers > 1, designs are evaluated in a process pool and written as they complete, so the
+    output order may differ from the input order (match on "id"). At most max_in_flight designs
+    (default 4 per worker) are pending at once, which bounds memory for arbitrarily long streams.
+    With a StageProfiler, per-stage stats of every design are merged into it.
+    """
+    records = _read_records(input_stream, output_stream)
+    options = (include_svg, include_summary, cache_path, cache_max_bytes)
+    track_allocations = profiler is not None and profiler.track_allocations
+
+    def emit(result):
+        if profiler is not None:
+            result, stages = result
+            profiler.merge(stages)
+        _write(result, output_stream)
+
+    evaluate = evaluate_record
+    if profiler is not None:
+        evaluate = functools.partial(profile_record, track_allocations=track_allocations)
+
+    if workers == 1:
+        for record_id, params in records:
+            emit(evaluate(record_id, params, *options))
+        return
+
+    max_in_flight = max_in_flight or 4 * workers
+    pending = set()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for record_id, params in records:
+            pending.add(executor.submit(evaluate, record_id, params, *options))
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    emit(future.result())
+        for future in wait(pending).done:
+            emit(future.result())
+
+def stream_main(argv):
+    """Command line entry point for `retaining_wall_calculator.py stream` (NDJSON on stdin/stdout)."""
+    parser = argparse.ArgumentParser(prog="retaining_wall_calculator.py stream",
+                                     description="Read one parameter object per line from stdin and write one result per line to stdout.")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes; results may arrive out of order when > 1 (default: 1)")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="Maximum pending designs (default: 4 per worker)")
+    parser.add_argument("--include-svg", action="store_true", help="Include the SVG drawing in each result")
+    parser.add_argument("--include-summary", action="store_true", help="Include the text summary in each result")
+    parser.add_argument("--cache", help="SQLite result cache file; results then carry a \"cached\" flag")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_MAX_BYTES / 2**20, help="Cache size limit in MiB before LRU eviction")
+    parser.add_argument("--profile-stages", metavar="PATH", help="Write per-stage timings aggregated over the stream to this JSON file")
+    parser.add_argument("--profile-allocations", action="store_true", help="Also record allocations per stage (slower)")
+    args = parser.parse_args(argv)
+    profiler = StageProfiler(args.profile_allocations) if args.profile_stages else None
+    run_stream(sys.stdin, sys.stdout, args.workers, args.max_in_flight, args.include_svg, args.include_summary,
+               args.cache, int(args.cache_max_mb * 2**20), profiler)
+    if profiler:
+        profiler.write(args.profile_stages)
+    return 0
@@ -23,6 +23,8 @@ default_params = {
     "point_load_kn": 0.0, # New parameter: point load on active side
     "point_load_distance_from_wall_m": 1.0, # New parameter: distance of point load from wall face
     "surcharge_load_kpa": 0.0, # New parameter: surcharge load on active side
+    # Optional "surcharge_loads": list of line/strip loads behind the wall (see surcharge_loads.normalize_loads)
+    # Optional "stratigraphy": list of active-side soil layers from the surface down (see stratigraphy.normalize_layers)
     "foundation_lower_than_passive_side_m": 0.0, # New parameter: foundation depth below passive side ground
 }
 
@@ -0,0 +1,114 @@
+import numpy as np
+import forward_mode as fm
+from forward_mode import value_of
+from earth_pressure import UNIT_WEIGHT_WATER
+
+class PressureDiagram:
+    """Piecewise-linear lateral pressure against depth below the top of the diagram.
+
+    Segment i runs from depth z_top[i] to z_bottom[i] with pressure varying linearly from p_top[i]
+    to p_bottom[i]; segments are contiguous and sorted, and a jump between neighbours (e.g. at a
+    layer boundary) is kept. Force and first moment are integrated exactly per segment.
+    """
+
+    def __init__(self, z_top, z_bottom, p_top, p_bottom):
+        self.z_top = np.asarray(z_top, dtype=float)
+        self.z_bottom = np.asarray(z_bottom, dtype=float)
+        self.p_top = np.asarray(p_top, dtype=float)
+        self.p_bottom = np.asarray(p_bottom, dtype=float)
+
+    @classmethod
+    def homogeneous(cls, unit_weight, K, height, groundwater_depth=None, surcharge_load=0.0, unit_weight_water=UNIT_WEIGHT_WATER):
+        """One soil with coefficient K over `height`: K (q + gamma z) above the water table and
+        K (q + gamma z_w + gamma' (z - z_w)) + gamma_w (z - z_w) below it. A water table above the
+        surface is taken at the surface."""
+        height = float(height)
+        surface = K * surcharge_load
+        if groundwater_depth is None or groundwater_depth >= height:
+            return cls([0.0], [height], [surface], [surface + K * unit_weight * height])
+        z_w = max(float(groundwater_depth), 0.0)
+        at_water_table = surface + K * unit_weight * z_w
+        at_base = at_water_table + (K * (unit_weight - unit_weight_water) + unit_weight_water) * (height - z_w)
+        if z_w == 0:
+            return cls([0.0], [height], [surface], [at_base])
+        return cls([0.0, z_w], [z_w, height], [surface, at_water_table], [at_water_table, at_base])
+
+    @property
+    def height(self):
+        return float(self.z_bottom[-1]) if len(self.z_bottom) else 0.0
+
+    def base_pressure(self):
+        """Pressure at the bottom of the diagram."""
+        return float(self.p_bottom[-1]) if len(self.p_bottom) else 0.0
+
+    def pressure(self, depths):
+        """Pressure at an array of depths (the value just below a jump at segment boundaries)."""
+        depths = np.asarray(depths, dtype=float)
+        i = np.clip(np.searchsorted(self.z_top, depths, side="right") - 1, 0, len(self.z_top) - 1)
+        length = self.z_bottom[i] - self.z_top[i]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = np.where(length > 0, (depths - self.z_top[i]) / length, 0.0)
+        return self.p_top[i] + t * (self.p_bottom[i] - self.p_top[i])
+
+    def truncated(self, depth):
+        """The diagram over [0, depth] (depth at most the diagram's height)."""
+        keep = self.z_top < depth
+        z_bottom = np.minimum(self.z_bottom[keep], depth)
+        p_bottom = np.where(self.z_bottom[keep] > depth, self.pressure(depth), self.p_bottom[keep])
+        return PressureDiagram(self.z_top[keep], z_bottom, self.p_top[keep], p_bottom)
+
+    def force(self):
+        """Resultant force per unit length of wall."""
+        return float(np.sum(0.5 * (self.p_top + self.p_bottom) * (self.z_bottom - self.z_top)))
+
+    def moment(self, about=None):
+        """First moment of the pressure about the depth `about` (default: the bottom), positive
+        for pressure above it."""
+        about = self.height if about is None else about
+        length = self.z_bottom - self.z_top
+        arm_top, arm_bottom = about - self.z_top, about - self.z_bottom
+        return float(np.sum(length / 6 * (self.p_top * (2 * arm_top + arm_bottom) + self.p_bottom * (arm_top + 2 * arm_bottom))))
+
+    def resultants(self, depths):
+        """Force over [0, depth], its moment about the depth and the pressure there, for an array
+        of depths within the diagram: prefix sums over the whole segments above each depth plus the
+        partial segment it falls in. The moment is depth * force minus the first moment about the top."""
+        depths = np.asarray(depths, dtype=float)
+        length = self.z_bottom - self.z_top
+        force = 0.5 * (self.p_top + self.p_bottom) * length
+        first_moment = length / 6 * (self.p_top * (2 * self.z_top + self.z_bottom) + self.p_bottom * (self.z_top + 2 * self.z_bottom))
+        force_above = np.concatenate([[0.0], np.cumsum(force)[:-1]])
+        first_moment_above = np.concatenate([[0.0], np.cumsum(first_moment)[:-1]])
+        i = np.clip(np.searchsorted(self.z_top, depths, side="right") - 1, 0, len(self.z_top) - 1)
+        pressure = self.pressure(depths)
+        top, partial = self.z_top[i], depths - self.z_top[i]
+        total_force = force_above[i] + 0.5 * (self.p_top[i] + pressure) * partial
+        total_first_moment = first_moment_above[i] + partial / 6 * (self.p_top[i] * (2 * top + depths) + pressure * (top + 2 * depths))
+        return total_force, depths * total_force - total_first_moment, pressure
+
+    def line_of_action(self):
+        """Height of the resultant above the bottom of the diagram."""
+        force = self.force()
+        return self.moment() / force if force else self.height / 3
+
+    def polygon(self):
+        """(depth, pressure) vertices outlining the diagram from the top, for drawing."""
+        depths = np.stack([self.z_top, self.z_bottom], axis=1).ravel()
+        pressures = np.stack([self.p_top, self.p_bottom], axis=1).ravel()
+        return list(zip(depths.tolist(), pressures.tolist()))
+
+def homogeneous_resultant_array(unit_weight, K, height, groundwater_depth, surcharge_load=0.0, unit_weight_water=UNIT_WEIGHT_WATER):
+    """Force, moment about the bottom and bottom pressure of PressureDiagram.homogeneous for
+    arrays (or forward_mode.Dual values) broadcasting against each other."""
+    z_w = fm.where(value_of(groundwater_depth) > 0, groundwater_depth, 0.0)
+    submerged = value_of(height) > value_of(z_w)
+    # Depth of the dry part and of the submerged part below it
+    dry = fm.where(submerged, z_w, height)
+    wet = height - dry
+    submerged_slope = K * (unit_weight - unit_weight_water) + unit_weight_water
+    surface = K * surcharge_load
+    at_water_table = surface + K * unit_weight * dry
+    force = surface * dry + 0.5 * K * unit_weight * dry * dry + at_water_table * wet + 0.5 * submerged_slope * wet * wet
+    moment = (surface * dry * (wet + 0.5 * dry) + 0.5 * K * unit_weight * dry * dry * (wet + dry / 3)
+              + 0.5 * at_water_table * wet * wet + submerged_slope * wet * wet * wet / 6)
+    return force, moment, at_water_table + submerged_slope * wet
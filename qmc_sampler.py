@@ -0,0 +1,204 @@
+import math
+import numpy as np
+
+# Low-discrepancy point sets on the unit hypercube for design-space exploration
+
+SOBOL_BITS = 32
+SOBOL_MAX_POINTS = 2**SOBOL_BITS
+
+# Joe & Kuo (2008) direction numbers (new-joe-kuo-6.21201) for Sobol dimensions 2 to 64:
+# (degree s, inner coefficients a of the primitive polynomial, initial m_1 .. m_s)
+SOBOL_DIRECTION_NUMBERS = (
+    (1, 0, (1,)), (2, 1, (1, 3)), (3, 1, (1, 3, 1)), (3, 2, (1, 1, 1)), (4, 1, (1, 1, 3, 3)),
+    (4, 4, (1, 3, 5, 13)), (5, 2, (1, 1, 5, 5, 17)), (5, 4, (1, 1, 5, 5, 5)), (5, 7, (1, 1, 7, 11, 19)),
+    (5, 11, (1, 1, 5, 1, 1)), (5, 13, (1, 1, 1, 3, 11)), (5, 14, (1, 3, 5, 5, 31)),
+    (6, 1, (1, 3, 3, 9, 7, 49)), (6, 13, (1, 1, 1, 15, 21, 21)), (6, 16, (1, 3, 1, 13, 27, 49)),
+    (6, 19, (1, 1, 1, 15, 7, 5)), (6, 22, (1, 3, 1, 15, 13, 25)), (6, 25, (1, 1, 5, 5, 19, 61)),
+    (7, 1, (1, 3, 7, 11, 23, 15, 103)), (7, 4, (1, 3, 7, 13, 13, 15, 69)), (7, 7, (1, 1, 3, 13, 7, 35, 63)),
+    (7, 8, (1, 3, 5, 9, 1, 25, 53)), (7, 14, (1, 3, 1, 13, 9, 35, 107)), (7, 19, (1, 3, 1, 5, 27, 61, 31)),
+    (7, 21, (1, 1, 5, 11, 19, 41, 61)), (7, 28, (1, 3, 5, 3, 3, 13, 69)), (7, 31, (1, 1, 7, 13, 1, 19, 1)),
+    (7, 32, (1, 3, 7, 5, 13, 19, 59)), (7, 37, (1, 1, 3, 9, 25, 29, 41)), (7, 41, (1, 3, 5, 13, 23, 1, 55)),
+    (7, 42, (1, 3, 7, 3, 13, 59, 17)), (7, 50, (1, 3, 1, 3, 5, 53, 69)), (7, 55, (1, 1, 5, 5, 23, 33, 13)),
+    (7, 56, (1, 1, 7, 7, 1, 61, 123)), (7, 59, (1, 1, 7, 9, 13, 61, 49)), (7, 62, (1, 3, 3, 5, 3, 55, 33)),
+    (8, 14, (1, 3, 1, 15, 31, 13, 49, 245)), (8, 21, (1, 3, 5, 15, 31, 59, 63, 97)),
+    (8, 22, (1, 3, 1, 11, 11, 11, 77, 249)), (8, 38, (1, 3, 1, 11, 27, 43, 71, 9)),
+    (8, 47, (1, 1, 7, 15, 21, 11, 81, 45)), (8, 49, (1, 3, 7, 3, 25, 31, 65, 79)),
+    (8, 50, (1, 3, 1, 1, 19, 11, 3, 205)), (8, 52, (1, 1, 5, 9, 19, 21, 29, 157)),
+    (8, 56, (1, 3, 7, 11, 1, 33, 89, 185)), (8, 67, (1, 3, 3, 3, 15, 9, 79, 71)),
+    (8, 70, (1, 3, 7, 11, 15, 39, 119, 27)), (8, 84, (1, 1, 3, 1, 11, 31, 97, 225)),
+    (8, 97, (1, 1, 1, 3, 23, 43, 57, 177)), (8, 103, (1, 3, 7, 7, 17, 17, 37, 71)),
+    (8, 115, (1, 3, 1, 5, 27, 63, 123, 213)), (8, 122, (1, 1, 3, 5, 11, 43, 53, 133)),
+    (9, 8, (1, 3, 5, 5, 29, 17, 47, 173, 479)), (9, 13, (1, 3, 3, 11, 3, 1, 109, 9, 69)),
+    (9, 16, (1, 1, 1, 5, 17, 39, 23, 5, 343)), (9, 22, (1, 3, 1, 5, 25, 15, 31, 103, 499)),
+    (9, 25, (1, 1, 1, 11, 11, 17, 63, 105, 183)), (9, 44, (1, 1, 5, 11, 9, 29, 97, 231, 363)),
+    (9, 47, (1, 1, 5, 15, 19, 45, 41, 7, 383)), (9, 52, (1, 3, 7, 7, 31, 19, 83, 137, 221)),
+    (9, 55, (1, 1, 1, 3, 23, 15, 111, 223, 83)), (9, 59, (1, 1, 5, 13, 31, 15, 55, 25, 161)),
+    (9, 62, (1, 1, 3, 13, 25, 47, 39, 87, 257)),
+)
+SOBOL_MAX_DIMENSION = len(SOBOL_DIRECTION_NUMBERS) + 1
+
+def _sobol_direction_matrix(dimension):
+    """Direction numbers v_1 .. v_BITS (as SOBOL_BITS-bit integers) per dimension."""
+    v = np.zeros((dimension, SOBOL_BITS), dtype=np.uint64)
+    v[0] = [1 << (SOBOL_BITS - i) for i in range(1, SOBOL_BITS + 1)]
+    for j in range(1, dimension):
+        s, a, m = SOBOL_DIRECTION_NUMBERS[j - 1]
+        row = [m[i] << (SOBOL_BITS - 1 - i) for i in range(s)]
+        for i in range(s, SOBOL_BITS):
+            value = row[i - s] ^ (row[i - s] >> s)
+            for k in range(1, s):
+                if (a >> (s - 1 - k)) & 1:
+                    value ^= row[i - k]
+            row.append(value)
+        v[j] = row
+    return v
+
+def _bits(values):
+    """Bits of SOBOL_BITS-bit integers, most significant first (a trailing axis of length SOBOL_BITS)."""
+    shifts = np.arange(SOBOL_BITS - 1, -1, -1, dtype=np.uint64)
+    return ((values[..., None] >> shifts) & np.uint64(1)).astype(np.uint8)
+
+def _from_bits(bits):
+    weights = np.uint64(1) << np.arange(SOBOL_BITS - 1, -1, -1, dtype=np.uint64)
+    return (bits.astype(np.uint64) * weights).sum(axis=-1, dtype=np.uint64)
+
+def _trailing_zeros(values):
+    lowest = values & -values
+    return np.log2(lowest.astype(float)).astype(np.intp)
+
+def _primes(count):
+    primes = []
+    candidate = 2
+    while len(primes) < count:
+        if all(candidate % p for p in primes if p * p <= candidate):
+            primes.append(candidate)
+        candidate += 1
+    return primes
+
+class SobolSampler:
+    """Sobol sequence, optionally randomized with a linear matrix scramble and a digital shift.
+
+    Points are generated in Gray-code order, so a chunk starting at any index costs one direct
+    construction of its first point plus one XOR per point; `index` is the next point to draw and a
+    run can be resumed by passing it back as start_index (with the same seed when scrambled).
+    The first 2^k points of the sequence, and every aligned block of 2^k points, are balanced, so
+    sample counts are best kept to powers of two.
+    """
+
+    def __init__(self, dimension, scramble=True, seed=None, start_index=0):
+        if not 1 <= dimension <= SOBOL_MAX_DIMENSION:
+            raise ValueError(f"The Sobol sampler supports 1 to {SOBOL_MAX_DIMENSION} dimensions; use the Halton sampler for more.")
+        self.dimension = dimension
+        self.scramble = scramble
+        self.seed = seed
+        self._directions = _sobol_direction_matrix(dimension)
+        self._shift = np.zeros(dimension, dtype=np.uint64)
+        if scramble:
+            rng = np.random.default_rng(seed)
+            # Random lower-triangular binary matrices with a unit diagonal, one per dimension
+            lower = np.tril(rng.integers(0, 2, (dimension, SOBOL_BITS, SOBOL_BITS), dtype=np.uint8), -1)
+            lower += np.eye(SOBOL_BITS, dtype=np.uint8)
+            scrambled = np.einsum("drc,dic->dir", lower.astype(np.int64), _bits(self._directions).astype(np.int64)) & 1
+            self._directions = _from_bits(scrambled)
+            self._shift = rng.integers(0, SOBOL_MAX_POINTS, dimension, dtype=np.uint64)
+        self.index = 0
+        self.fast_forward(start_index)
+
+    def _point(self, index):
+        gray = index ^ (index >> 1)
+        point = self._shift.copy()
+        for bit in range(SOBOL_BITS):
+            if (gray >> bit) & 1:
+                point ^= self._directions[:, bit]
+        return point
+
+    def fast_forward(self, n):
+        """Skips the next n points."""
+        if n < 0 or self.index + n > SOBOL_MAX_POINTS:
+            raise ValueError(f"Sobol indices run from 0 to {SOBOL_MAX_POINTS}.")
+        self.index += n
+
+    def integers(self, n):
+        """The next n points as SOBOL_BITS-bit integers, shape (n, dimension)."""
+        if self.index + n > SOBOL_MAX_POINTS:
+            raise ValueError(f"The Sobol sequence has only {SOBOL_MAX_POINTS} points.")
+        if n <= 0:
+            return np.zeros((0, self.dimension), dtype=np.uint64)
+        points = np.empty((n, self.dimension), dtype=np.uint64)
+        points[0] = self._point(self.index)
+        if n > 1:
+            # gray(k) ^ gray(k - 1) is the lowest set bit of k
+            steps = self._directions[:, _trailing_zeros(np.arange(self.index + 1, self.index + n, dtype=np.int64))].T
+            points[1:] = np.bitwise_xor.accumulate(steps, axis=0) ^ points[0]
+        self.index += n
+        return points
+
+    def random(self, n):
+        """The next n points on [0, 1)^dimension."""
+        return self.integers(n) * 2.0**-SOBOL_BITS
+
+class HaltonSampler:
+    """Halton sequence with skip and leap, optionally scrambled with random digit permutations.
+
+    Point j is the radical inverse of skip + j * leap in the first `dimension` prime bases; a leap
+    that is a prime larger than those bases decorrelates the higher dimensions. Scrambling draws
+    one permutation of the digits per base and digit position (the permutations also apply to the
+    trailing zero digits, down to double precision). Resume with start_index as for SobolSampler.
+    """
+
+    def __init__(self, dimension, scramble=True, seed=None, start_index=0, skip=0, leap=1):
+        if dimension < 1:
+            raise ValueError("The dimension must be at least 1.")
+        if skip < 0 or leap < 1:
+            raise ValueError("skip must be non-negative and leap positive.")
+        self.dimension = dimension
+        self.scramble = scramble
+        self.seed = seed
+        self.skip = skip
+        self.leap = leap
+        self.bases = _primes(dimension)
+        self._permutations = None
+        if scramble:
+            rng = np.random.default_rng(seed)
+            self._permutations = [np.array([rng.permutation(base) for _ in range(math.ceil(53 / math.log2(base)))])
+                                  for base in self.bases]
+        self.index = 0
+        self.fast_forward(start_index)
+
+    def fast_forward(self, n):
+        """Skips the next n points."""
+        if n < 0:
+            raise ValueError("Cannot fast-forward by a negative count.")
+        self.index += n
+
+    def _radical_inverse(self, indices, dimension):
+        base = self.bases[dimension]
+        remaining = indices.copy()
+        result = np.zeros(len(indices))
+        scale = 1.0 / base
+        if self._permutations is None:
+            while np.any(remaining):
+                result += (remaining % base) * scale
+                remaining //= base
+                scale /= base
+            return result
+        for permutation in self._permutations[dimension]:
+            result += permutation[remaining % base] * scale
+            remaining //= base
+            scale /= base
+        return result
+
+    def random(self, n):
+        """The next n points on [0, 1)^dimension."""
+        indices = self.skip + (self.index + np.arange(max(n, 0), dtype=np.int64)) * self.leap
+        self.index += max(n, 0)
+        points = np.column_stack([self._radical_inverse(indices, d) for d in range(self.dimension)]) if n > 0 else np.zeros((0, self.dimension))
+        return np.minimum(points, np.nextafter(1.0, 0.0))
+
+SAMPLERS = {"sobol": SobolSampler, "halton": HaltonSampler}
+
+def make_sampler(kind, dimension, scramble=True, seed=None, start_index=0, **options):
+    """Builds a sampler by name; options (skip, leap) only apply to Halton."""
+    if kind not in SAMPLERS:
+        raise ValueError(f"Unknown sampler '{kind}'. Expected one of: {', '.join(SAMPLERS)}.")
+    return SAMPLERS[kind](dimension, scramble=scramble, seed=seed, start_index=start_index, **options)
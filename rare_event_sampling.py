@@ -0,0 +1,157 @@
+import math
+import numpy as np
+from normal_distribution import reliability_index
+from form_analysis import form
+
+def design_point(model, mode):
+    """Design point of one limit state from FORM (see form_analysis.form): u, signed beta,
+    whether the search converged and the number of limit state evaluations."""
+    result = form(model, mode)
+    return {"u": np.array(result["design_point_u"]), "beta": result["beta"],
+            "converged": result["converged"], "evaluations": result["evaluations"]}
+
+def _estimate(method, mode, pf, cov, samples, evaluations, **extra):
+    std_error = pf * cov if math.isfinite(cov) else math.inf
+    return {"method": method, "mode": mode, "pf": pf, "beta": reliability_index(pf), "cov": cov,
+            "std_error": std_error, "samples": samples, "evaluations": evaluations, **extra}
+
+def importance_sampling(model, mode, target_cov=0.05, max_samples=1_000_000, block_size=10_000, seed=0, point=None):
+    """Importance sampling estimate of the probability of failure of one limit state.
+
+    Samples come from a unit normal centered at the design point (found with design_point unless
+    given) and are weighted by the ratio of the standard normal densities. Blocks of block_size
+    are added until the estimate's coefficient of variation reaches target_cov or max_samples
+    have been drawn. Without a usable design point the sampling density stays at the origin,
+    which is crude Monte Carlo.
+    """
+    if point is None:
+        point = design_point(model, mode)
+    center = point["u"] if point["converged"] else np.zeros(model.dimension)
+    rng = np.random.default_rng(seed)
+    total = total_sq = 0.0
+    samples = 0
+    evaluations = point["evaluations"]
+    cov = math.inf
+    shift = 0.5 * center @ center
+    while samples < max_samples:
+        size = min(block_size, max_samples - samples)
+        u = center + rng.standard_normal((size, model.dimension))
+        failed = model.limit_states(u)[mode] < 0
+        weights = np.exp(shift - u[failed] @ center)
+        total += weights.sum()
+        total_sq += (weights**2).sum()
+        samples += size
+        evaluations += size
+        pf = total / samples
+        if pf > 0:
+            variance = max(total_sq / samples - pf**2, 0.0) / samples
+            cov = math.sqrt(variance) / pf
+            if cov <= target_cov:
+                break
+    pf = total / samples
+    return _estimate("importance_sampling", mode, pf, cov, samples, evaluations,
+                     design_point=center.tolist(), design_point_beta=point["beta"], design_point_converged=point["converged"])
+
+def _chain_correlation_factor(indicators, p):
+    """Au & Beck (2001) gamma factor for the correlation of failure indicators along Markov chains.
+    indicators has one row per chain and one column per chain state."""
+    chains, length = indicators.shape
+    n = chains * length
+    variance = p * (1 - p)
+    if length < 2 or variance <= 0:
+        return 0.0
+    gamma = 0.0
+    for lag in range(1, length):
+        covariance = np.mean(indicators[:, :-lag] * indicators[:, lag:]) - p**2
+        gamma += 2 * (1 - lag * chains / n) * covariance / variance
+    return max(gamma, 0.0)
+
+def subset_run(model, mode, samples_per_level, p0, rng, correlation=0.8, max_levels=20):
+    """One subset simulation run: returns (pf, squared CoV estimate, evaluations).
+
+    Intermediate thresholds are the p0-quantiles of g. Each level grows Markov chains from the
+    samples below the threshold with conditional sampling in standard normal space
+    (candidate = rho * u + sqrt(1 - rho^2) * xi, accepted when it stays below the threshold); all
+    chains advance together, so each chain step is one batched evaluation.
+    """
+    seeds_per_level = max(1, int(round(samples_per_level * p0)))
+    chain_length = math.ceil(samples_per_level / seeds_per_level)
+    u = rng.standard_normal((samples_per_level, model.dimension))
+    g = model.limit_states(u)[mode]
+    evaluations = samples_per_level
+    pf, cov_sq = 1.0, 0.0
+    chains = None
+    for _ in range(max_levels):
+        order = np.argsort(g)
+        threshold = g[order[seeds_per_level - 1]]
+        if threshold <= 0:
+            break
+        p = seeds_per_level / g.size
+        gamma = 0.0 if chains is None else _chain_correlation_factor(chains < threshold, p)
+        pf *= p
+        cov_sq += (1 - p) / (g.size * p) * (1 + gamma)
+
+        current_u = u[order[:seeds_per_level]]
+        current_g = g[order[:seeds_per_level]]
+        states_u, states_g = [current_u], [current_g]
+        scale = math.sqrt(1 - correlation**2)
+        for _ in range(chain_length - 1):
+            candidate = correlation * current_u + scale * rng.standard_normal(current_u.shape)
+            candidate_g = model.limit_states(candidate)[mode]
+            evaluations += len(candidate)
+            accept = candidate_g < threshold
+            current_u = np.where(accept[:, None], candidate, current_u)
+            current_g = np.where(accept, candidate_g, current_g)
+            states_u.append(current_u)
+            states_g.append(current_g)
+        u = np.concatenate(states_u)
+        g = np.concatenate(states_g)
+        chains = np.stack(states_g, axis=1)
+    failed = g < 0
+    p = failed.mean()
+    gamma = 0.0 if chains is None else _chain_correlation_factor(chains < 0, p)
+    pf *= p
+    if p > 0:
+        cov_sq += (1 - p) / (g.size * p) * (1 + gamma)
+    else:
+        cov_sq = math.inf
+    return pf, cov_sq, evaluations
+
+def subset_simulation(model, mode, target_cov=0.1, samples_per_level=2000, p0=0.1, max_evaluations=1_000_000, seed=0):
+    """Subset simulation estimate of the probability of failure of one limit state (or "system").
+
+    Independent runs are averaged until the combined coefficient of variation reaches target_cov
+    or max_evaluations have been spent.
+    """
+    seed_sequence = np.random.SeedSequence(seed)
+    estimates, cov_squares = [], []
+    evaluations = 0
+    cov = math.inf
+    while evaluations < max_evaluations:
+        pf, cov_sq, count = subset_run(model, mode, samples_per_level, p0, np.random.default_rng(seed_sequence.spawn(1)[0]))
+        estimates.append(pf)
+        cov_squares.append(cov_sq)
+        evaluations += count
+        if pf == 0:
+            # No failure within max_levels: pf is below p0 ** max_levels, more runs will not resolve it
+            break
+        if all(math.isfinite(value) for value in cov_squares):
+            cov = math.sqrt(np.mean(cov_squares) / len(estimates))
+            if cov <= target_cov:
+                break
+    pf = float(np.mean(estimates))
+    if pf == 0:
+        cov = math.inf
+    return _estimate("subset_simulation", mode, pf, cov, samples_per_level * len(estimates), evaluations, runs=len(estimates))
+
+def rare_event_analysis(model, method, target_cov=0.05, seed=0, max_evaluations=1_000_000):
+    """Runs importance_sampling (per failure mode) or subset_simulation (per mode and the system)
+    and returns a result shaped like reliability.monte_carlo's."""
+    if method == "importance_sampling":
+        modes = {mode: importance_sampling(model, mode, target_cov, max_evaluations, seed=seed) for mode in model.failure_fs}
+    elif method == "subset_simulation":
+        modes = {mode: subset_simulation(model, mode, target_cov, max_evaluations=max_evaluations, seed=seed)
+                 for mode in list(model.failure_fs) + ["system"]}
+    else:
+        raise ValueError(f"Unknown method '{method}'.")
+    return {"method": method, "seed": seed, "target_cov": target_cov, "variables": model.names, "modes": modes}
@@ -1,5 +1,9 @@
 import math
-from earth_pressure import calculate_earth_pressure
+import numpy as np
+from earth_pressure import pressure_coefficient_array, point_load_effect_array, UNIT_WEIGHT_WATER
+from surcharge_loads import surcharge_resultant_array
+from stratigraphy import layered_resultant_array
+from pressure_diagram import homogeneous_resultant_array
 
 def calculate_rebar_area(Mu_knm, b_mm, d_mm, fc_mpa, fy_mpa):
     """Calculates required steel area (As) for a rectangular section based on ACI 318.
@@ -31,7 +35,37 @@ def calculate_rebar_area(Mu_knm, b_mm, d_mm, fc_mpa, fy_mpa):
 
     return As_mm2
 
-def calculate_rebar_info(params, geometry, wall_material_props, active_soil, groundwater_level_below_base):
+def calculate_rebar_area_array(Mu_knm, b_mm, d_mm, fc_mpa, fy_mpa):
+    """Array form of calculate_rebar_area. Also returns a mask that is False where the section
+    would need more than the concrete can carry (the square-root term is clamped to zero there).
+    """
+    Mu_nmm = np.asarray(Mu_knm, dtype=float) * 1e6
+    phi = 0.9
+    with np.errstate(divide="ignore", invalid="ignore"):
+        Rn = Mu_nmm / (phi * b_mm * d_mm**2)
+    sqrt_term = 1 - (2 * Rn) / (0.85 * fc_mpa)
+    rho = (0.85 * fc_mpa / fy_mpa) * (1 - np.sqrt(np.maximum(sqrt_term, 0)))
+    return rho * b_mm * d_mm, sqrt_term >= 0
+
+def calculate_stem_moment_array(unit_weight, phi_deg, h_wall_stem, groundwater_depth, surcharge_load,
+                                point_load=0.0, point_load_distance_from_wall=1.0, surcharge_loads=(), beta_deg=0.0,
+                                layers=(), unit_weight_water=UNIT_WEIGHT_WATER):
+    """Array form of the factored stem base moment of AnalysisContext.stem_moment (1.2 load factor,
+    earth pressure plus the point load's and surcharge loads' moments over the stem height).
+    groundwater_depth is measured from the top of the wall (D_f + groundwater_level_below_base);
+    a layer table (see stratigraphy.normalize_layers) replaces unit_weight and phi_deg."""
+    if layers:
+        _, earth_pressure_moment, _ = layered_resultant_array(layers, h_wall_stem, groundwater_depth, surcharge_load, beta_deg, unit_weight_water)
+    else:
+        K = pressure_coefficient_array(phi_deg, beta_deg)
+        _, earth_pressure_moment, _ = homogeneous_resultant_array(unit_weight, K, h_wall_stem, groundwater_depth, surcharge_load)
+    _, point_load_moment = point_load_effect_array(point_load, point_load_distance_from_wall, h_wall_stem)
+    _, surcharge_loads_moment, _ = surcharge_resultant_array(surcharge_loads, h_wall_stem)
+    return 1.2 * (earth_pressure_moment + point_load_moment + surcharge_loads_moment)
+
+def calculate_rebar_info(params, geometry, wall_material_props, context):
+    """Stem and base slab rebar summary. The stem moment comes from the design's AnalysisContext,
+    so it sees the same pressures as the stability analysis."""
     rebar_info = "N/A (Stone Masonry)"
     if params["wall_material"] == "concrete":
         if params["units"] == "metric":
@@ -49,10 +83,8 @@ def calculate_rebar_info(params, geometry, wall_material_props, active_soil, gro
 
         # Stem Wall Rebar (Main Reinforcement)
         # Assuming cantilever action, max moment at base of stem
-        # Pressure at base of stem (excluding foundation depth)
-        Pa_at_stem_base = calculate_earth_pressure(active_soil, geometry["h_wall_stem"], groundwater_level_below_base, is_active=True, surcharge_load=geometry["surcharge_load"])
-        # Moment at base of stem (triangular pressure distribution)
-        Mu_stem = (1.2 * 0.5 * Pa_at_stem_base * geometry["h_wall_stem"]) * (geometry["h_wall_stem"] / 3) # Factored moment (1.2 for earth pressure)
+        # Moment at base of stem from the earth pressure over the stem plus the point and surcharge loads' moments
+        Mu_stem = 1.2 * context.stem_moment() # Factored moment (1.2 for earth pressure)
 
         # Effective depth 'd' for stem (assuming 75mm cover or 3 inches)
         cover = 0.075 if params["units"] == "metric" else (3/12) # 3 inches in feet
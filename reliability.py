@@ -0,0 +1,327 @@
+import argparse
+import json
+import math
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from parameters import default_params, soil_properties
+from batch_analysis import build_stability_columns, analyze_batch, conversion_factors
+from stability_analysis import perform_stability_analysis_batch, stability_factors_dual
+from normal_distribution import norm_cdf, norm_pdf, norm_ppf, reliability_index
+from forward_mode import Dual
+import forward_mode as fm
+from rare_event_sampling import rare_event_analysis
+from form_analysis import form_analysis
+
+DISTRIBUTIONS = ("normal", "lognormal", "truncated_normal")
+# Active soil variables whose role in the earth pressure a layered stratigraphy takes over
+STRATIGRAPHY_REPLACED_VARIABLES = ("active_unit_weight_kn_m3", "active_friction_angle_deg")
+FAILURE_MODES = ("overturning", "sliding", "bearing")
+FS_KEYS = {"overturning": "FS_overturning", "sliding": "FS_sliding", "bearing": "FS_bearing"}
+
+# Uncertain quantities (always given in metric units) -> (stability column, unit conversion) pairs
+RANDOM_VARIABLES = {
+    # calculate_earth_pressure reads the kN/m^3 unit weight in both unit systems
+    "active_unit_weight_kn_m3": (("active_unit_weight", "unit_weight"), ("active_pressure_unit_weight", None)),
+    "passive_unit_weight_kn_m3": (("passive_unit_weight", "unit_weight"), ("passive_pressure_unit_weight", None)),
+    "active_friction_angle_deg": (("active_friction_angle_deg", None),),
+    "passive_friction_angle_deg": (("passive_friction_angle_deg", None),),
+    "allowable_bearing_pressure_kpa": (("allowable_bearing_pressure", "pressure"),),
+    "groundwater_level_m_below_base": (("groundwater_level_below_base", "length"),),
+    "surcharge_load_kpa": (("surcharge_load", "pressure"),),
+    "heel_length_m": (("B_heel", "length"),),
+    # The stem's offset from the toe equals the toe length for either face position
+    "toe_length_m": (("B_toe", "length"), ("wall_base_offset_from_toe", "length")),
+    "wall_base_width_m": (("t_base", "length"),),
+    "foundation_depth_m": (("D_f", "length"),),
+}
+
+# Where each variable's deterministic (catalog or parameter) value comes from
+NOMINAL_SOURCES = {
+    "active_unit_weight_kn_m3": ("active_soil_type", "unit_weight_kn_m3"),
+    "passive_unit_weight_kn_m3": ("passive_soil_type", "unit_weight_kn_m3"),
+    "active_friction_angle_deg": ("active_soil_type", "friction_angle_deg"),
+    "passive_friction_angle_deg": ("passive_soil_type", "friction_angle_deg"),
+    "allowable_bearing_pressure_kpa": ("active_soil_type", "allowable_bearing_pressure_kpa"),
+    "groundwater_level_m_below_base": (None, "groundwater_level_m_below_base"),
+    "surcharge_load_kpa": (None, "surcharge_load_kpa"),
+    "heel_length_m": (None, "heel_length_m"),
+    "toe_length_m": (None, "toe_length_m"),
+    "wall_base_width_m": (None, "wall_base_width_m"),
+    "foundation_depth_m": (None, "foundation_depth_m"),
+}
+
+# Samples are drawn in fixed-size blocks, each from its own child seed, so a run is reproducible
+# from its seed alone regardless of how the blocks are spread over workers
+SAMPLE_BLOCK = 2**16
+
+def nominal_value(name, params):
+    """Deterministic value of a random variable for the design described by params."""
+    soil_key, key = NOMINAL_SOURCES[name]
+    return soil_properties[params[soil_key]][key] if soil_key else params[key]
+
+def _normalize_variable(name, spec, params):
+    """Validates one variable spec and fills in the mean (nominal value) and standard deviation."""
+    if name not in RANDOM_VARIABLES:
+        if name.endswith("cohesion_kpa"):
+            raise ValueError(f"'{name}' does not enter the stability equations, so it cannot be treated as uncertain.")
+        raise ValueError(f"Unknown random variable '{name}'. Expected one of: {', '.join(RANDOM_VARIABLES)}.")
+    distribution = spec.get("distribution", "normal")
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution '{distribution}' for '{name}'.")
+    mean = float(spec.get("mean", nominal_value(name, params)))
+    if "std" in spec:
+        std = float(spec["std"])
+    elif "cov" in spec:
+        std = abs(mean) * float(spec["cov"])
+    else:
+        raise ValueError(f"'{name}' needs a 'std' or 'cov'.")
+    if std <= 0:
+        raise ValueError(f"The standard deviation of '{name}' must be positive.")
+    variable = {"distribution": distribution, "mean": mean, "std": std}
+    if distribution == "lognormal":
+        if mean <= 0:
+            raise ValueError(f"A lognormal '{name}' needs a positive mean.")
+        variable["sigma_ln"] = math.sqrt(math.log1p((std / mean) ** 2))
+        variable["mu_ln"] = math.log(mean) - 0.5 * variable["sigma_ln"] ** 2
+    elif distribution == "truncated_normal":
+        lower = float(spec.get("lower", -math.inf))
+        upper = float(spec.get("upper", math.inf))
+        if not lower < upper:
+            raise ValueError(f"'{name}' needs lower < upper.")
+        # mean and std describe the parent normal distribution
+        variable["cdf_lower"] = float(norm_cdf((lower - mean) / std))
+        variable["cdf_upper"] = float(norm_cdf((upper - mean) / std))
+        variable["lower"], variable["upper"] = lower, upper
+        if variable["cdf_upper"] - variable["cdf_lower"] <= 0:
+            raise ValueError(f"The truncation range of '{name}' has no probability mass.")
+    return variable
+
+def correlation_matrix(names, correlations):
+    """Correlation matrix of the underlying standard normals from [name_a, name_b, rho] triples."""
+    matrix = np.eye(len(names))
+    for name_a, name_b, rho in correlations:
+        if name_a not in names or name_b not in names or name_a == name_b:
+            raise ValueError(f"Correlation between '{name_a}' and '{name_b}' needs two distinct random variables.")
+        if not -1 < rho < 1:
+            raise ValueError(f"Correlation coefficient {rho} must lie strictly between -1 and 1.")
+        i, j = names.index(name_a), names.index(name_b)
+        matrix[i, j] = matrix[j, i] = rho
+    return matrix
+
+def from_standard_normal(variable, z):
+    """Maps standard normal values to the variable's distribution (elementwise)."""
+    if variable["distribution"] == "normal":
+        return variable["mean"] + variable["std"] * z
+    if variable["distribution"] == "lognormal":
+        return np.exp(variable["mu_ln"] + variable["sigma_ln"] * z)
+    cdf_lower, cdf_upper = variable["cdf_lower"], variable["cdf_upper"]
+    x = variable["mean"] + variable["std"] * norm_ppf(cdf_lower + norm_cdf(z) * (cdf_upper - cdf_lower))
+    return np.clip(x, variable["lower"], variable["upper"])
+
+def from_standard_normal_derivative(variable, z):
+    """d x / d z of from_standard_normal (elementwise)."""
+    if variable["distribution"] == "normal":
+        return np.full(np.shape(z), variable["std"])
+    if variable["distribution"] == "lognormal":
+        return variable["sigma_ln"] * from_standard_normal(variable, z)
+    cdf_lower, cdf_upper = variable["cdf_lower"], variable["cdf_upper"]
+    standardized = norm_ppf(cdf_lower + norm_cdf(z) * (cdf_upper - cdf_lower))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        derivative = variable["std"] * norm_pdf(z) * (cdf_upper - cdf_lower) / norm_pdf(standardized)
+    return np.where(np.isfinite(derivative), derivative, 0.0)
+
+class ReliabilityModel:
+    """Wall stability as a function of independent standard normal variables.
+
+    Each row of `u` (shape (n, dimension)) is one realization. Correlation is introduced with a
+    Gaussian copula (the correlations apply to the underlying standard normals), then every
+    variable is mapped to its marginal distribution and written into the columns of the batch
+    stability analysis. The shear key is fixed as calculate_retaining_wall would deliver the
+    nominal design: requested, or added because the nominal FS_sliding is below 1.5.
+
+    A failure mode fails where its factor of safety drops below failure_fs (1.0 by default; a
+    dict gives per-mode values). Realizations where the sloped-backfill Ka is undefined (phi below
+    the slope angle) count as FS = 0.
+    """
+
+    def __init__(self, design=None, variables=None, correlations=None, failure_fs=1.0):
+        self.params = {**default_params, **(design or {})}
+        if not variables:
+            raise ValueError("At least one random variable is required.")
+        self.variables = {name: _normalize_variable(name, spec, self.params) for name, spec in variables.items()}
+        if self.params.get("stratigraphy"):
+            replaced = [name for name in self.variables if name in STRATIGRAPHY_REPLACED_VARIABLES]
+            if replaced:
+                raise ValueError(f"'{replaced[0]}' cannot be uncertain for a design with a stratigraphy: "
+                                 "the layer table replaces the active soil in the earth pressure.")
+        self.names = list(self.variables)
+        self.dimension = len(self.names)
+        self.correlation = correlation_matrix(self.names, correlations or [])
+        try:
+            self._cholesky = np.linalg.cholesky(self.correlation)
+        except np.linalg.LinAlgError:
+            raise ValueError("The correlation matrix is not positive definite.") from None
+        if isinstance(failure_fs, dict):
+            self.failure_fs = {mode: float(failure_fs.get(mode, 1.0)) for mode in FAILURE_MODES}
+        else:
+            self.failure_fs = dict.fromkeys(FAILURE_MODES, float(failure_fs))
+
+        nominal = analyze_batch(self.params, auto_shear_key=True)
+        self.params["shear_key_used"] = bool(nominal["shear_key_used"])
+        self._columns = build_stability_columns(self.params)
+        self._factors = conversion_factors(self.params["units"])
+        # Forward-mode derivatives (FORM, design points) are not available for a layered stratigraphy
+        self.has_gradients = not self._columns.get("stratigraphy")
+
+    @classmethod
+    def from_spec(cls, spec):
+        """Builds a model from a spec dict with keys design, variables, correlations and failure_fs."""
+        return cls(spec.get("design"), spec.get("variables"), spec.get("correlations"), spec.get("failure_fs", 1.0))
+
+    def to_physical(self, u):
+        """Random variable values (metric units) for standard normal rows u."""
+        z = np.atleast_2d(np.asarray(u, dtype=float)) @ self._cholesky.T
+        return {name: from_standard_normal(self.variables[name], z[:, i]) for i, name in enumerate(self.names)}
+
+    def stability(self, u):
+        """Batch stability results for standard normal rows u."""
+        columns = dict(self._columns)
+        for name, values in self.to_physical(u).items():
+            for column, conversion in RANDOM_VARIABLES[name]:
+                columns[column] = values * self._factors[conversion]
+        return perform_stability_analysis_batch(columns)
+
+    def limit_states(self, u):
+        """g = FS - failure_fs per failure mode (failure where g < 0), plus "system" (the minimum)."""
+        results = self.stability(u)
+        undefined = np.isnan(results["Pa_force"])
+        g = {}
+        for mode in FAILURE_MODES:
+            fs = results[FS_KEYS[mode]]
+            g[mode] = np.where(undefined | np.isnan(fs), 0.0, fs) - self.failure_fs[mode]
+        g["system"] = np.minimum.reduce([g[mode] for mode in FAILURE_MODES])
+        return g
+
+    def limit_states_with_gradients(self, u):
+        """limit_states as forward_mode.Dual values whose gradients are d g / d u (shape (n, dimension)).
+        The system gradient is that of the governing (smallest) mode."""
+        if not self.has_gradients:
+            raise ValueError("Limit state gradients are not available for a design with a stratigraphy.")
+        u = np.atleast_2d(np.asarray(u, dtype=float))
+        z = u @ self._cholesky.T
+        columns = dict(self._columns)
+        for i, name in enumerate(self.names):
+            variable = self.variables[name]
+            # x_i depends on u through z_i = L[i] @ u
+            derivative = from_standard_normal_derivative(variable, z[:, i])
+            value = Dual(from_standard_normal(variable, z[:, i]), derivative[:, None] * self._cholesky[i])
+            for column, conversion in RANDOM_VARIABLES[name]:
+                columns[column] = value * self._factors[conversion]
+        results = stability_factors_dual(columns)
+        undefined = np.isnan(fm.value_of(results["Pa_force"]))
+        g = {}
+        for mode in FAILURE_MODES:
+            fs = results[FS_KEYS[mode]]
+            if not isinstance(fs, Dual):
+                fs = Dual(fs, np.zeros(np.shape(fs) + (self.dimension,)))
+            fs = Dual(np.broadcast_to(fs.value, (u.shape[0],)), np.broadcast_to(fs.grad, (u.shape[0], self.dimension)))
+            g[mode] = fm.where(undefined | np.isnan(fs.value), 0.0, fs) - self.failure_fs[mode]
+        system = g[FAILURE_MODES[0]]
+        for mode in FAILURE_MODES[1:]:
+            system = fm.where(g[mode].value < system.value, g[mode], system)
+        g["system"] = system
+        return g
+
+def failure_summary(failures, samples):
+    """Probability of failure, reliability index and the sampling error of a plain Monte Carlo count."""
+    pf = failures / samples
+    std_error = math.sqrt(pf * (1 - pf) / samples)
+    return {
+        "failures": int(failures),
+        "pf": pf,
+        "beta": reliability_index(pf),
+        "std_error": std_error,
+        "cov": std_error / pf if pf > 0 else math.inf,
+    }
+
+def sample_block(dimension, seed, block, samples):
+    """Standard normal rows of sample block `block` for a run of `samples` realizations."""
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(block,)))
+    size = min(SAMPLE_BLOCK, samples - block * SAMPLE_BLOCK)
+    return rng.standard_normal((size, dimension))
+
+def count_failures(model, seed, blocks, samples):
+    """Failure counts per mode over the given sample blocks (one pool task)."""
+    counts = dict.fromkeys(FAILURE_MODES + ("system",), 0)
+    for block in blocks:
+        g = model.limit_states(sample_block(model.dimension, seed, block, samples))
+        for mode in counts:
+            counts[mode] += int(np.count_nonzero(g[mode] < 0))
+    return counts
+
+def monte_carlo(model, samples, seed=0, workers=1, blocks_per_task=4):
+    """Crude Monte Carlo estimate of the probability of failure per mode.
+
+    Realizations are evaluated in blocks of SAMPLE_BLOCK, so memory stays bounded for any sample
+    count, and only failure counts are kept. Results depend only on the seed and sample count.
+    """
+    block_count = math.ceil(samples / SAMPLE_BLOCK)
+    tasks = [range(start, min(start + blocks_per_task, block_count)) for start in range(0, block_count, blocks_per_task)]
+    if workers == 1:
+        partial_counts = [count_failures(model, seed, blocks, samples) for blocks in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            partial_counts = list(executor.map(count_failures, [model] * len(tasks), [seed] * len(tasks), tasks, [samples] * len(tasks)))
+    modes = {}
+    for mode in FAILURE_MODES + ("system",):
+        modes[mode] = failure_summary(sum(counts[mode] for counts in partial_counts), samples)
+    return {"method": "monte_carlo", "samples": samples, "seed": seed, "variables": model.names, "modes": modes}
+
+def format_reliability(result):
+    """Plain-text table of per-mode reliability results."""
+    lines = [f"{'mode':<12} {'pf':>12} {'beta':>8} {'CoV(pf)':>9} {'evaluations':>12}"]
+    for mode, entry in result["modes"].items():
+        evaluations = entry.get("evaluations", result.get("samples"))
+        lines.append(f"{mode:<12} {entry['pf']:>12.4e} {entry['beta']:>8.3f} {entry.get('cov', math.nan):>9.3f} {evaluations:>12}")
+    return "\n".join(lines)
+
+def reliability_main(argv):
+    """Command line entry point for `retaining_wall_calculator.py reliability`."""
+    parser = argparse.ArgumentParser(prog="retaining_wall_calculator.py reliability",
+                                     description="Estimate the probability of failure of a wall design with uncertain soil and load parameters.")
+    parser.add_argument("spec", help="JSON file with design (or a designs list), variables, correlations and failure_fs")
+    parser.add_argument("--method", choices=["monte_carlo", "importance_sampling", "subset_simulation", "form"], default="monte_carlo",
+                        help="Estimator; the variance-reduction methods suit rare failures and FORM is the cheapest (default: monte_carlo)")
+    parser.add_argument("--samples", type=int, default=1_000_000, help="Monte Carlo realizations, or the evaluation budget per mode for the other methods (default: 1000000)")
+    parser.add_argument("--target-cov", type=float, default=0.05, help="Stop importance/subset sampling at this coefficient of variation (default: 0.05)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (default: 1)")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    with open(args.spec, "r") as f:
+        spec = json.load(f)
+    # A "designs" list (e.g. every section along a corridor) is analyzed design by design
+    designs = spec.get("designs") or [spec.get("design") or {}]
+    results = []
+    for index, design in enumerate(designs):
+        try:
+            model = ReliabilityModel.from_spec({**spec, "design": design})
+        except ValueError as e:
+            parser.error(f"Design {index + 1}: {e}" if len(designs) > 1 else str(e))
+        if args.method == "monte_carlo":
+            result = monte_carlo(model, args.samples, args.seed, args.workers)
+        elif args.method == "form":
+            result = form_analysis(model)
+        else:
+            result = rare_event_analysis(model, args.method, args.target_cov, args.seed, args.samples)
+        if len(designs) > 1:
+            result["design"] = design
+            print(f"\nDesign {index + 1} of {len(designs)}")
+        print(format_reliability(result))
+        results.append(result)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results if len(designs) > 1 else results[0], f, indent=2)
+        print(f"Reliability results saved to {args.output}")
+    return 0
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import sqlite3
+import time
+import zlib
+from parameters import default_params, soil_properties, material_properties
+from retaining_wall_calculator import calculate_retaining_wall, __version__
+from stage_profiler import stage
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+EVICTION_BATCH = 64 # Least recently used entries read per eviction query
+
+def _canonical(value):
+    """Normalizes values so equal designs serialize identically (e.g. 5 and 5.0)."""
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    return str(value)
+
+def result_cache_key(user_params, version=__version__):
+    """Content hash of a design: merged parameters, the catalog entries it uses and the code version."""
+    params = {**default_params, **user_params}
+    catalog = {
+        "active_soil": soil_properties.get(params["active_soil_type"]),
+        "passive_soil": soil_properties.get(params["passive_soil_type"]),
+        "wall_material": material_properties.get(params["wall_material"]),
+        "slab_material": material_properties.get(params["slab_material"]),
+    }
+    payload = json.dumps(_canonical({"params": params, "catalog": catalog, "version": version}),
+                         sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResultCache:
+    """Persistent SQLite cache of calculate_retaining_wall results with size-bounded LRU eviction.
+
+    Entries are keyed by result_cache_key and stored as compressed JSON. When the stored size
+    exceeds max_bytes, the least recently used entries are evicted. Several processes may share
+    one cache file: the stored size is kept in a one-row table (cache_size) that every write
+    updates in the same transaction, so the bound holds for the file, not per connection.
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, version=__version__):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, last_used INTEGER NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cache_size (id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER NOT NULL)")
+        # Files written before the counter existed start from the sum of their entries
+        self._conn.execute("INSERT OR IGNORE INTO cache_size (id, bytes) SELECT 0, COALESCE(SUM(size), 0) FROM results")
+        self._conn.commit()
+
+    def _stored_bytes(self):
+        return self._conn.execute("SELECT bytes FROM cache_size WHERE id = 0").fetchone()[0]
+
+    def get(self, key):
+        """Returns the cached results for key, or None."""
+        row = self._conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        with self._conn:
+            self._conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time_ns(), key))
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key, results):
+        """Stores results under key and evicts least recently used entries beyond max_bytes."""
+        value = zlib.compress(json.dumps(results).encode("utf-8"))
+        with self._conn:
+            # Take the write lock up front so the size counter cannot change under this transaction
+            self._conn.execute("BEGIN IMMEDIATE")
+            # A replaced entry's size no longer counts
+            old = self._conn.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+            self._conn.execute("INSERT OR REPLACE INTO results (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                               (key, value, len(value), time.time_ns()))
+            total = self._stored_bytes() + len(value) - (old[0] if old else 0)
+            total = self._evict(total)
+            self._conn.execute("UPDATE cache_size SET bytes = ? WHERE id = 0", (total,))
+
+    def _evict(self, total):
+        """Deletes least recently used entries, a batch at a time, until total fits max_bytes.
+        Returns the remaining total."""
+        while total > self.max_bytes:
+            rows = self._conn.execute("SELECT key, size FROM results ORDER BY last_used LIMIT ?", (EVICTION_BATCH,)).fetchall()
+            if not rows:
+                return 0
+            evicted = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                evicted.append((key,))
+                total -= size
+            self._conn.executemany("DELETE FROM results WHERE key = ?", evicted)
+            self.evictions += len(evicted)
+        return total
+
+    def get_or_calculate(self, user_params, verbose=False):
+        """Returns (results, hit) for a design, calculating and storing it on a miss."""
+        with stage("cache_lookup"):
+            key = result_cache_key(user_params, self.version)
+            results = self.get(key)
+        if results is not None:
+            return results, True
+        results = calculate_retaining_wall(user_params, verbose=verbose)
+        with stage("cache_store"):
+            self.put(key, results)
+        return results, False
+
+    def stats(self):
+        """Hit/miss counters for this connection plus the current size of the cache file."""
+        entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+    def clear(self):
+        with self._conn:
+            self._conn.execute("DELETE FROM results")
+            self._conn.execute("UPDATE cache_size SET bytes = 0 WHERE id = 0")
+
+    def close(self):
+        self._conn.close()
+
+_process_caches = {}
+
+def get_process_cache(path, max_bytes=DEFAULT_MAX_BYTES):
+    """Returns this process's ResultCache for path, opening it on first use (for pool workers)."""
+    if path not in _process_caches:
+        _process_caches[path] = ResultCache(path, max_bytes)
+    return _process_caches[path]
@@ -1,4 +1,8 @@
+import contextlib
+import copy
+import importlib
 import json
+import os
 import sys
 from typing import Dict, Any, Tuple
 
@@ -7,11 +11,29 @@ from parameters import default_params, soil_properties, material_properties
 from unit_conversion import convert_units
 from geometry import calculate_geometry
 from earth_pressure import calculate_earth_pressure
-from stability_analysis import perform_stability_analysis
+from analysis_context import AnalysisContext
+from stability_analysis import perform_stability_analysis, apply_shear_key
 from rebar_calculation import calculate_rebar_info
 from svg_drawing import generate_svg_drawing
+from stage_profiler import StageProfiler, stage
 
-__version__ = "0.2.0" # Version updated to reflect changes
+__version__ = "0.3.0" # Version updated to reflect changes
+
+# Sub-commands: name -> (module, entry point taking the remaining argv)
+COMMANDS = {
+    "sweep": ("design_sweep", "sweep_main"),
+    "optimize": ("section_optimizer", "optimize_main"),
+    "batch": ("batch_runner", "batch_main"),
+    "stream": ("ndjson_stream", "stream_main"),
+    "benchmark": ("benchmark_suite", "benchmark_main"),
+    "benchmark-compare": ("benchmark_compare", "compare_main"),
+    "scaling": ("scaling_benchmark", "scaling_main"),
+    "reliability": ("reliability", "reliability_main"),
+    "sensitivity": ("sensitivity_analysis", "sensitivity_main"),
+    "explore": ("design_exploration", "explore_main"),
+    "boundary": ("feasibility_boundary", "boundary_main"),
+    "size": ("dimension_solver", "size_main"),
+}
 
 def _prompt_user(prompt: str, default: Any) -> str:
     """Helper function to prompt the user for input."""
@@ -91,12 +113,13 @@ def get_interactive_params() -> Dict[str, Any]:
 
     return params
 
-def calculate_retaining_wall(user_params: Dict[str, Any]) -> Dict[str, Any]:
+def calculate_retaining_wall(user_params: Dict[str, Any], verbose: bool = True) -> Dict[str, Any]:
     """
     Performs a complete stability and design analysis for a retaining wall.
 
     Args:
         user_params: A dictionary of parameters to override the defaults.
+        verbose: Print notes about automatic design changes (e.g. an added shear key).
 
     Returns:
         A dictionary containing the summary, detailed report, SVG drawing, and key results.
@@ -104,8 +127,9 @@ def calculate_retaining_wall(user_params: Dict[str, Any]) -> Dict[str, Any]:
     params = default_params.copy()
     params.update(user_params)
 
-    # Unit conversion and property setup
-    params, soil_props_conv, mat_props_conv = convert_units(params, soil_properties.copy(), material_properties.copy())
+    # Unit conversion and property setup (deep copies: convert_units adds imperial keys to each entry)
+    with stage("convert_units"):
+        params, soil_props_conv, mat_props_conv = convert_units(params, copy.deepcopy(soil_properties), copy.deepcopy(material_properties))
     
     active_soil = soil_props_conv[params["active_soil_type"]]
     passive_soil = soil_props_conv[params["passive_soil_type"]]
@@ -116,20 +140,29 @@ def calculate_retaining_wall(user_params: Dict[str, Any]) -> Dict[str, Any]:
                            else {"unit_weight_kn_m3": 0.0, "unit_weight_pcf": 0.0})
 
     # Core Calculations
-    geometry = calculate_geometry(params)
-    stability_results = perform_stability_analysis(params, geometry, active_soil, passive_soil, wall_material_props, slab_material_props)
+    with stage("calculate_geometry"):
+        geometry = calculate_geometry(params)
+    with stage("build_analysis_context"):
+        context = AnalysisContext(params, geometry, active_soil, passive_soil)
+    with stage("perform_stability_analysis"):
+        stability_results = perform_stability_analysis(params, geometry, active_soil, passive_soil, wall_material_props, slab_material_props,
+                                                       context)
 
-    # Automatic Shear Key Addition
-    if stability_results["FS_sliding"] < 1.5 and not params.get("shear_key_used", False):
-        print("\nNote: Factor of safety for sliding is low. Adding a shear key and re-calculating.")
-        params["shear_key_used"] = True
-        stability_results = perform_stability_analysis(params, geometry, active_soil, passive_soil, wall_material_props, slab_material_props)
+        # Automatic Shear Key Addition
+        if stability_results["FS_sliding"] < 1.5 and not params.get("shear_key_used", False):
+            if verbose:
+                print("\nNote: Factor of safety for sliding is low. Adding a shear key.")
+            params["shear_key_used"] = True
+            stability_results = apply_shear_key(stability_results)
 
-    rebar_info = calculate_rebar_info(params, geometry, wall_material_props, active_soil, 0)
-    svg_drawing = generate_svg_drawing(params, geometry, stability_results)
+    with stage("calculate_rebar_info"):
+        rebar_info = calculate_rebar_info(params, geometry, wall_material_props, context)
+    with stage("generate_svg_drawing"):
+        svg_drawing = generate_svg_drawing(params, geometry, stability_results, context)
 
     # Generate Reports
-    summary_text = f"""
+    with stage("report"):
+        summary_text = f"""
 Retaining Wall Calculation Summary:
 - Stability (Overturning): FS = {stability_results["FS_overturning"]:.2f} (Min: 1.5)
 - Stability (Sliding):     FS = {stability_results["FS_sliding"]:.2f} (Min: 1.5)
@@ -150,18 +183,31 @@ Retaining Wall Calculation Summary:
     }
     return results
 
-def save_output_files(results: Dict[str, Any]):
-    """Saves the calculation results to Markdown, SVG, and optional HTML files."""
-    
+def save_output_files(results: Dict[str, Any], output_dir: str = ".", basename: str = "retaining_wall",
+                      verbose: bool = True) -> list[str]:
+    """
+    Saves the calculation results to Markdown, SVG, and optional HTML files.
+
+    Files are named <basename>_report.md, <basename>_drawing.svg and <basename>_report.html
+    inside output_dir (created if missing). Returns the paths written.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    report_path = os.path.join(output_dir, f"{basename}_report.md")
+    drawing_path = os.path.join(output_dir, f"{basename}_drawing.svg")
+    html_path = os.path.join(output_dir, f"{basename}_report.html")
+    written = [report_path, drawing_path]
+
     # Save markdown report
-    with open("retaining_wall_report.md", "w") as f:
+    with stage("file_io"), open(report_path, "w") as f:
         f.write(results["detailed_report_md"])
-    print("Detailed report saved to retaining_wall_report.md")
+    if verbose:
+        print(f"Detailed report saved to {report_path}")
 
     # Save SVG drawing
-    with open("retaining_wall_drawing.svg", "w") as f:
+    with stage("file_io"), open(drawing_path, "w") as f:
         f.write(results["svg_drawing"])
-    print("Drawing saved to retaining_wall_drawing.svg")
+    if verbose:
+        print(f"Drawing saved to {drawing_path}")
 
     # Optional HTML output
     if results["params"].get("output_html", False):
@@ -194,19 +240,39 @@ def save_output_files(results: Dict[str, Any]):
 </body>
 </html>
 """
-        with open("retaining_wall_report.html", "w") as f:
+        with stage("file_io"), open(html_path, "w") as f:
             f.write(html_content)
-        print("HTML report saved to retaining_wall_report.html")
+        written.append(html_path)
+        if verbose:
+            print(f"HTML report saved to {html_path}")
+
+    return written
 
 
 def main():
     """Main execution function for the retaining wall calculator."""
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        module_name, entry_point = COMMANDS[sys.argv[1]]
+        exit_code = getattr(importlib.import_module(module_name), entry_point)(sys.argv[2:])
+        sys.exit(exit_code or 0)
+
     print(f"Retaining Wall Calculator v{__version__}")
-    print("Usage: python3 retaining_wall_calculator.py [path/to/input.json]")
-    
+    print("Usage: python3 retaining_wall_calculator.py [path/to/input.json] [--profile-stages profile.json]")
+    print(f"       python3 retaining_wall_calculator.py {{{'|'.join(COMMANDS)}}} --help")
+
+    args = sys.argv[1:]
+    profile_path = None
+    if "--profile-stages" in args:
+        i = args.index("--profile-stages")
+        if i + 1 >= len(args):
+            print("\nError: --profile-stages requires an output path.")
+            sys.exit(1)
+        profile_path = args[i + 1]
+        del args[i:i + 2]
+
     input_params = {}
-    if len(sys.argv) > 1:
-        json_filepath = sys.argv[1]
+    if args:
+        json_filepath = args[0]
         try:
             with open(json_filepath, 'r') as f:
                 input_params = json.load(f)
@@ -223,14 +289,19 @@ def main():
     print("\n--- Calculating with Final Parameters ---")
     print(json.dumps(input_params, indent=2))
     
-    try:
-        results = calculate_retaining_wall(input_params)
-        print("\n--- Summary ---")
-        print(results["summary"])
-        save_output_files(results)
-    except Exception as e:
-        print(f"\nAn unexpected error occurred during calculation: {e}")
-        print("Please check your input parameters and dependent module implementations.")
+    profiler = StageProfiler(track_allocations=True)
+    with profiler if profile_path else contextlib.nullcontext():
+        try:
+            results = calculate_retaining_wall(input_params)
+            print("\n--- Summary ---")
+            print(results["summary"])
+            save_output_files(results)
+        except Exception as e:
+            print(f"\nAn unexpected error occurred during calculation: {e}")
+            print("Please check your input parameters and dependent module implementations.")
+    if profile_path:
+        profiler.write(profile_path)
+        print(f"Stage profile saved to {profile_path}")
 
     print("\nCalculation complete.")
 
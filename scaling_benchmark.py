@@ -0,0 +1,123 @@
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from benchmark_suite import DEFAULT_SEED, environment_info, generate_corpus
+from batch_analysis import columns_from_params, analyze_batch
+from retaining_wall_calculator import calculate_retaining_wall
+
+# serial: plain loop (the baseline for speedups); process/thread: calculate_retaining_wall in a pool;
+# vectorized: analyze_batch in-process (stability only, so not the same work as the other modes)
+MODES = ("serial", "process", "thread", "vectorized")
+POOL_MODES = ("process", "thread")
+DEFAULT_BATCH_SIZE = 2000
+
+def worker_counts(max_workers):
+    """1, 2, 4, ... up to and including max_workers."""
+    counts, n = [], 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    return counts + [max_workers]
+
+def _calculate(user_params):
+    return calculate_retaining_wall(user_params, verbose=False)["stability"]["FS_sliding"]
+
+def _peak_rss_mb(who):
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+def run_configuration(mode, workers, batch_size, seed):
+    """Evaluates the batch once in this process and returns throughput and peak RSS.
+
+    Meant to run in a fresh process, so the peak RSS belongs to this configuration alone;
+    worker_peak_rss_mb is the largest single pool worker (process mode only).
+    """
+    corpus = generate_corpus(batch_size, seed)
+    chunk_size = max(1, batch_size // (16 * workers))
+    start = time.perf_counter()
+    if mode == "serial":
+        for user_params in corpus:
+            _calculate(user_params)
+    elif mode == "process":
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(_calculate, corpus, chunksize=chunk_size))
+    elif mode == "thread":
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(_calculate, corpus))
+    elif mode == "vectorized":
+        # A batch must use one unit system
+        for units in ("metric", "imperial"):
+            designs = [user_params for user_params in corpus if user_params["units"] == units]
+            if designs:
+                analyze_batch(columns_from_params(designs), auto_shear_key=True)
+    else:
+        raise ValueError(f"Unknown mode '{mode}'.")
+    elapsed = time.perf_counter() - start
+    return {
+        "mode": mode,
+        "workers": workers,
+        "designs": batch_size,
+        "elapsed_s": elapsed,
+        "designs_per_s": batch_size / elapsed,
+        "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF),
+        "worker_peak_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN) if mode == "process" else None,
+    }
+
+def run_scaling(max_workers=None, batch_size=DEFAULT_BATCH_SIZE, seed=DEFAULT_SEED, modes=MODES):
+    """Runs every mode (pools at 1, 2, 4, ... max_workers) in its own spawned process and adds
+    speedup over serial and parallel efficiency (speedup over the same mode with one worker,
+    divided by the worker count)."""
+    max_workers = max_workers or os.cpu_count() or 1
+    configurations = [(mode, workers) for mode in modes
+                      for workers in (worker_counts(max_workers) if mode in POOL_MODES else [1])]
+    runs = []
+    context = multiprocessing.get_context("spawn")
+    for mode, workers in configurations:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            runs.append(executor.submit(run_configuration, mode, workers, batch_size, seed).result())
+
+    serial = next((run["designs_per_s"] for run in runs if run["mode"] == "serial"), None)
+    single = {run["mode"]: run["designs_per_s"] for run in runs if run["workers"] == 1}
+    for run in runs:
+        run["speedup_vs_serial"] = run["designs_per_s"] / serial if serial else None
+        run["parallel_efficiency"] = (run["designs_per_s"] / (single[run["mode"]] * run["workers"])
+                                      if run["mode"] in POOL_MODES else None)
+    return {
+        "metadata": {**environment_info(), "batch_size": batch_size, "seed": seed, "max_workers": max_workers},
+        "runs": runs,
+    }
+
+def format_scaling(report):
+    """Plain-text table of a run_scaling report."""
+    lines = [f"{'mode':<11} {'workers':>7} {'designs/s':>11} {'speedup':>8} {'efficiency':>10} {'peak RSS MB':>12}"]
+    for run in report["runs"]:
+        efficiency = f"{run['parallel_efficiency']:.0%}" if run["parallel_efficiency"] is not None else "-"
+        lines.append(f"{run['mode']:<11} {run['workers']:>7} {run['designs_per_s']:>11.0f} "
+                     f"{run['speedup_vs_serial']:>7.2f}x {efficiency:>10} {run['peak_rss_mb']:>12.1f}")
+    return "\n".join(lines)
+
+def scaling_main(argv):
+    """Command line entry point for `retaining_wall_calculator.py scaling`."""
+    parser = argparse.ArgumentParser(prog="retaining_wall_calculator.py scaling",
+                                     description="Measure batch throughput across worker counts and execution modes.")
+    parser.add_argument("--max-workers", type=int, default=None, help="Largest worker count (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help=f"Designs per run (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help=f"Corpus seed (default: {DEFAULT_SEED})")
+    parser.add_argument("--mode", action="append", choices=MODES, help="Run only this mode (repeatable; serial is always included)")
+    parser.add_argument("--output", default="scaling_results.json", help="Results JSON path (default: scaling_results.json)")
+    args = parser.parse_args(argv)
+
+    modes = ["serial"] + [mode for mode in (args.mode or MODES) if mode != "serial"]
+    report = run_scaling(args.max_workers, args.batch_size, args.seed, modes)
+    print(format_scaling(report))
+    print("Note: vectorized mode covers the stability analysis only (no rebar, drawing or report).")
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Scaling results saved to {args.output}")
+    return 0
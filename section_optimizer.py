@@ -0,0 +1,190 @@
+import argparse
+import json
+import math
+import numpy as np
+from parameters import default_params, soil_properties, material_properties
+from batch_analysis import analyze_batch
+from design_sweep import iter_sweep_chunks
+from rebar_calculation import calculate_rebar_area_array, calculate_stem_moment_array
+from surcharge_loads import normalize_loads
+from stratigraphy import normalize_layers
+from earth_pressure import SLOPED_BACKFILL_BETA_DEG
+
+# Minimum factors of safety a section must reach (same limits as the calculation summary)
+MIN_FACTORS_OF_SAFETY = {"FS_overturning": 1.5, "FS_sliding": 1.5, "FS_bearing": 2.0}
+
+COVER_M = 0.075 # Concrete cover used by calculate_rebar_info (metric)
+BASE_SLAB_NOMINAL_MOMENT_KNM = 10.0 # Nominal base slab moment used by calculate_rebar_info
+
+# Searched dimensions as (min, max, step) in metres. A shear key depth of 0 means no key.
+DEFAULT_SEARCH_SPACE = {
+    "toe_length_m": (0.3, 3.0, 0.1),
+    "heel_length_m": (0.5, 6.0, 0.1),
+    "wall_top_width_m": (0.2, 0.6, 0.05),
+    "wall_base_width_m": (0.3, 1.5, 0.05),
+    "foundation_depth_m": (0.4, 1.5, 0.1),
+    "shear_key_depth_m": (0.0, 1.0, 0.1),
+    "shear_key_width_m": (0.3, 0.8, 0.1),
+}
+
+def section_quantities(param_columns):
+    """Material quantities per metre of wall for parameter columns.
+
+    Returns concrete volume (stem, base slab and shear key) and steel volume in m^3/m, together with
+    a mask of sections whose stem and base slab have a positive effective depth and do not need more
+    flexural capacity than the concrete can provide. Steel follows calculate_rebar_info.
+    """
+    p = {**default_params, **param_columns}
+    h = np.asarray(p["wall_height_m"], dtype=float)
+    t_top = np.asarray(p["wall_top_width_m"], dtype=float)
+    t_base = np.asarray(p["wall_base_width_m"], dtype=float)
+    D_f = np.asarray(p["foundation_depth_m"], dtype=float)
+    B_base = np.asarray(p["toe_length_m"], dtype=float) + t_base + np.asarray(p["heel_length_m"], dtype=float)
+    key_used = np.asarray(p["shear_key_used"], dtype=bool)
+    key_area = np.where(key_used, np.asarray(p["shear_key_depth_m"], dtype=float) * np.asarray(p["shear_key_width_m"], dtype=float), 0.0)
+    concrete_volume = 0.5 * (t_top + t_base) * h + B_base * D_f + key_area
+
+    d_stem_mm = (t_base - COVER_M) * 1000
+    d_slab_mm = (D_f - COVER_M) * 1000
+    sections_ok = (d_stem_mm > 0) & (d_slab_mm > 0) & (t_top <= t_base)
+    if p["wall_material"] != "concrete":
+        return concrete_volume, np.zeros_like(concrete_volume), sections_ok
+
+    concrete = material_properties["concrete"]
+    active_soil = soil_properties[p["active_soil_type"]]
+    # Groundwater depth and backfill slope as AnalysisContext sees them
+    groundwater_depth = D_f + np.asarray(p["groundwater_level_m_below_base"], dtype=float)
+    beta_deg = np.where(h < np.asarray(p["active_side_ground_elevation_m"], dtype=float), SLOPED_BACKFILL_BETA_DEG, 0.0)
+    Mu_stem = calculate_stem_moment_array(active_soil["unit_weight_kn_m3"], active_soil["friction_angle_deg"], h, groundwater_depth,
+                                          p["surcharge_load_kpa"], p["point_load_kn"], p["point_load_distance_from_wall_m"],
+                                          normalize_loads(p.get("surcharge_loads")), beta_deg, normalize_layers(p.get("stratigraphy")))
+    As_stem, stem_ok = calculate_rebar_area_array(Mu_stem, 1000, d_stem_mm, concrete["f_c_prime_mpa"], concrete["f_y_mpa"])
+    As_slab, slab_ok = calculate_rebar_area_array(BASE_SLAB_NOMINAL_MOMENT_KNM, 1000, d_slab_mm, concrete["f_c_prime_mpa"], concrete["f_y_mpa"])
+    steel_volume = (As_stem * h + As_slab * B_base) * 1e-6
+    return concrete_volume, steel_volume, sections_ok & stem_ok & slab_ok
+
+def _snap(values, low, high, step):
+    values = low + np.round((np.clip(values, low, high) - low) / step) * step
+    return np.unique(np.round(values, 10))
+
+def _coarse_axis(low, high, step, points):
+    native_count = math.floor((high - low) / step + 1e-9) + 1
+    if native_count <= points:
+        return _snap(low + step * np.arange(native_count), low, high, step), step
+    coarse_step = math.ceil((native_count - 1) / (points - 1)) * step
+    return _snap(np.append(np.arange(low, high, coarse_step), high), low, high, step), coarse_step
+
+def _search(axes, base_params, concrete_cost, steel_cost, best, stats, chunk_size):
+    """Evaluates the Cartesian product of `axes`, skipping candidates that cannot beat `best`."""
+    for chunk in iter_sweep_chunks(axes, chunk_size):
+        if "shear_key_depth_m" in chunk:
+            chunk["shear_key_used"] = chunk["shear_key_depth_m"] > 0
+        candidates = {**base_params, **chunk}
+        concrete_volume, steel_volume, sections_ok = section_quantities(candidates)
+        cost = concrete_cost * concrete_volume + steel_cost * steel_volume
+        keep = sections_ok & (cost < best["cost"])
+        stats["evaluated"] += int(keep.sum())
+        stats["pruned"] += int(keep.size - keep.sum())
+        if not keep.any():
+            continue
+
+        subset = {key: value[keep] for key, value in chunk.items()}
+        results = analyze_batch({**base_params, **subset})
+        feasible = np.ones(int(keep.sum()), dtype=bool)
+        for key, minimum in MIN_FACTORS_OF_SAFETY.items():
+            feasible &= results[key] >= minimum
+        if not feasible.any():
+            continue
+
+        i = np.flatnonzero(feasible)[np.argmin(cost[keep][feasible])]
+        best.update({
+            "cost": float(cost[keep][i]),
+            "concrete_volume_m3": float(concrete_volume[keep][i]),
+            "steel_volume_m3": float(steel_volume[keep][i]),
+            "params": {key: value[i].item() for key, value in subset.items()},
+            **{key: float(results[key][i]) for key in MIN_FACTORS_OF_SAFETY},
+        })
+
+def optimize_section(base_params=None, search_space=None, concrete_cost=1.0, steel_cost=0.0,
+                     coarse_points=6, chunk_size=50000):
+    """Finds the minimum-cost section meeting MIN_FACTORS_OF_SAFETY.
+
+    Cost is concrete_cost * concrete volume + steel_cost * steel volume (both m^3 per metre of wall),
+    so the defaults minimize concrete volume. The search first scans a coarse grid of each
+    (min, max, step) range in `search_space`, then repeatedly halves the spacing of a local grid
+    around the incumbent down to the native step. Candidates whose cost cannot beat the incumbent
+    are pruned before the stability analysis is run.
+    """
+    base_params = {**default_params, **(base_params or {})}
+    search_space = search_space or DEFAULT_SEARCH_SPACE
+    best = {"cost": math.inf, "params": None}
+    stats = {"evaluated": 0, "pruned": 0}
+
+    axes, spacing = {}, {}
+    for key, (low, high, step) in search_space.items():
+        axes[key], spacing[key] = _coarse_axis(low, high, step, coarse_points)
+    _search(axes, base_params, concrete_cost, steel_cost, best, stats, chunk_size)
+    if best["params"] is None:
+        raise ValueError("No section in the search space satisfies the stability requirements.")
+
+    while True:
+        refined = False
+        for key, (low, high, step) in search_space.items():
+            if spacing[key] > step:
+                spacing[key] = max(step, round(spacing[key] / 2 / step) * step)
+                refined = True
+            center = best["params"][key]
+            axes[key] = _snap(center + spacing[key] * np.arange(-2, 3), low, high, step)
+        _search(axes, base_params, concrete_cost, steel_cost, best, stats, chunk_size)
+        if not refined:
+            break
+
+    best.update(stats)
+    return best
+
+def _parse_range(spec):
+    low, high, step = (float(item) for item in spec.split(":"))
+    return low, high, step
+
+def optimize_main(argv):
+    """Command line entry point for `retaining_wall_calculator.py optimize`."""
+    parser = argparse.ArgumentParser(prog="retaining_wall_calculator.py optimize",
+                                     description="Search for the minimum-cost section that satisfies the stability checks.")
+    parser.add_argument("--base", help="JSON file with fixed parameter overrides (wall height, soils, loads, ...)")
+    parser.add_argument("--range", action="append", default=[], metavar="KEY=MIN:MAX:STEP",
+                        help=f"Override a search range; searched keys: {', '.join(DEFAULT_SEARCH_SPACE)}")
+    parser.add_argument("--concrete-cost", type=float, default=1.0, help="Cost per m^3 of concrete (default: 1)")
+    parser.add_argument("--steel-cost", type=float, default=0.0, help="Cost per m^3 of reinforcing steel (default: 0)")
+    parser.add_argument("--output", help="Write the optimized parameters to this JSON file")
+    args = parser.parse_args(argv)
+
+    base_params = {}
+    if args.base:
+        with open(args.base, "r") as f:
+            base_params = json.load(f)
+    search_space = dict(DEFAULT_SEARCH_SPACE)
+    for item in args.range:
+        key, sep, spec = item.partition("=")
+        if not sep or key not in DEFAULT_SEARCH_SPACE:
+            parser.error(f"Invalid --range '{item}'.")
+        search_space[key] = _parse_range(spec)
+
+    try:
+        best = optimize_section(base_params, search_space, args.concrete_cost, args.steel_cost)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+
+    print(f"Evaluated {best['evaluated']} candidates ({best['pruned']} pruned)")
+    print(f"Concrete volume: {best['concrete_volume_m3']:.3f} m^3/m, steel volume: {best['steel_volume_m3'] * 1e6:.0f} cm^3/m")
+    print(json.dumps(best["params"], indent=2))
+
+    from retaining_wall_calculator import calculate_retaining_wall
+    results = calculate_retaining_wall({**base_params, **best["params"]})
+    print(results["summary"])
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({**base_params, **best["params"]}, f, indent=2)
+        print(f"Optimized parameters saved to {args.output}")
+    return 0
@@ -0,0 +1,236 @@
+import argparse
+import json
+import math
+import numpy as np
+from parameters import default_params
+from batch_analysis import analyze_batch, conversion_factors
+from reliability import RANDOM_VARIABLES, NOMINAL_SOURCES, nominal_value
+from qmc_sampler import SOBOL_MAX_DIMENSION, make_sampler
+
+SENSITIVITY_OUTPUTS = ("FS_overturning", "FS_sliding", "FS_bearing", "q_max")
+FS_OUTPUTS = ("FS_overturning", "FS_sliding", "FS_bearing")
+
+# Numeric design parameters (all of default_params except strings and flags)
+PARAMETER_INPUTS = [key for key, value in default_params.items()
+                    if isinstance(value, (int, float)) and not isinstance(value, bool)]
+# Soil properties that enter the stability equations (the catalog values of the design's soils)
+SOIL_INPUTS = [name for name, (soil_key, _) in NOMINAL_SOURCES.items() if soil_key is not None]
+
+# Unbounded outputs (e.g. FS_sliding with no net driving force) would dominate the variance, so
+# factors of safety are capped at FS_CAP and q_max at QMAX_CAP_FACTOR times the allowable bearing
+# pressure (FS_bearing = 1 / QMAX_CAP_FACTOR). An undefined sloped-backfill Ka counts as FS = 0 and
+# q_max at the cap, as in reliability.ReliabilityModel.
+FS_CAP = 10.0
+QMAX_CAP_FACTOR = 10.0
+
+# Realizations are evaluated in row blocks of this size to bound memory
+EVALUATION_BLOCK = 2**16
+
+def default_inputs(params, relative_range=0.1):
+    """Uniform ranges of +/- relative_range around the nominal value of every design parameter
+    and soil property; inputs whose nominal value is zero need explicit bounds and are left out."""
+    inputs = {}
+    for name in PARAMETER_INPUTS + SOIL_INPUTS:
+        nominal = float(params[name]) if name in PARAMETER_INPUTS else nominal_value(name, params)
+        if nominal != 0:
+            spread = abs(nominal) * relative_range
+            inputs[name] = (nominal - spread, nominal + spread)
+    return inputs
+
+def _normalize_inputs(inputs, params, relative_range):
+    """Validates an inputs spec (name -> [low, high], or None for the default range)."""
+    defaults = default_inputs(params, relative_range)
+    if not inputs:
+        return defaults
+    normalized = {}
+    for name, bounds in inputs.items():
+        if name not in PARAMETER_INPUTS and name not in SOIL_INPUTS:
+            raise ValueError(f"Unknown input '{name}'. Expected one of: {', '.join(PARAMETER_INPUTS + SOIL_INPUTS)}.")
+        if bounds is None:
+            if name not in defaults:
+                raise ValueError(f"'{name}' is zero in the design, so it needs explicit [low, high] bounds.")
+            bounds = defaults[name]
+        low, high = (float(value) for value in bounds)
+        if not low < high:
+            raise ValueError(f"The bounds of '{name}' must satisfy low < high.")
+        normalized[name] = (low, high)
+    return normalized
+
+class SensitivityModel:
+    """Maps rows of input values to capped stability outputs for one wall design.
+
+    Design parameters are varied through the batch parameter columns (so derived quantities such
+    as the base width follow them); soil properties override the catalog values of the design's
+    soils. As in the reliability model, the shear key is fixed by the nominal design.
+    """
+
+    def __init__(self, design=None, inputs=None, relative_range=0.1):
+        self.params = {**default_params, **(design or {})}
+        self.inputs = _normalize_inputs(inputs, self.params, relative_range)
+        if not self.inputs:
+            raise ValueError("At least one input is required.")
+        self.names = list(self.inputs)
+        self.dimension = len(self.names)
+        self._low = np.array([self.inputs[name][0] for name in self.names])
+        self._width = np.array([self.inputs[name][1] - self.inputs[name][0] for name in self.names])
+        nominal = analyze_batch(self.params, auto_shear_key=True)
+        self.params["shear_key_used"] = bool(nominal["shear_key_used"])
+        self._factors = conversion_factors(self.params["units"])
+
+    @classmethod
+    def from_spec(cls, spec):
+        """Builds a model from a spec dict with keys design, inputs and relative_range."""
+        return cls(spec.get("design"), spec.get("inputs"), spec.get("relative_range", 0.1))
+
+    def to_physical(self, unit_rows):
+        """Input values for rows of the unit hypercube."""
+        return self._low + np.atleast_2d(unit_rows) * self._width
+
+    def evaluate(self, x):
+        """Capped outputs for rows of input values x, and per output a mask of the rows that were
+        capped or undefined."""
+        param_columns = dict(self.params)
+        overrides = {}
+        for i, name in enumerate(self.names):
+            if name in PARAMETER_INPUTS:
+                param_columns[name] = x[:, i]
+            else:
+                for column, conversion in RANDOM_VARIABLES[name]:
+                    overrides[column] = x[:, i] * self._factors[conversion]
+        results = analyze_batch(param_columns, column_overrides=overrides)
+        undefined = np.isnan(results["Pa_force"])
+        outputs, capped = {}, {}
+        for key in FS_OUTPUTS:
+            fs = results[key]
+            capped[key] = undefined | np.isnan(fs) | (fs > FS_CAP)
+            outputs[key] = np.minimum(np.where(undefined | np.isnan(fs), 0.0, fs), FS_CAP)
+        allowable = overrides.get("allowable_bearing_pressure",
+                                  nominal_value("allowable_bearing_pressure_kpa", self.params) * self._factors["pressure"])
+        q_cap = QMAX_CAP_FACTOR * np.broadcast_to(allowable, undefined.shape)
+        q_max = results["q_max"]
+        capped["q_max"] = undefined | ~(q_max <= q_cap)
+        outputs["q_max"] = np.where(capped["q_max"], q_cap, q_max)
+        return outputs, capped
+
+def base_samples(samples, dimension, seed):
+    """The base matrices A and B of Saltelli's scheme: the two halves of a scrambled Sobol
+    sequence of twice the input dimension (Halton beyond the Sobol table)."""
+    kind = "sobol" if 2 * dimension <= SOBOL_MAX_DIMENSION else "halton"
+    rows = make_sampler(kind, 2 * dimension, seed=seed).random(samples)
+    return rows[:, :dimension], rows[:, dimension:]
+
+def saltelli_evaluations(model, a, b):
+    """Model outputs on A, B and every AB_i (A with column i taken from B).
+
+    Returns (outputs, capped) where outputs[key] has shape (dimension + 2, samples): row 0 is f(A),
+    row 1 is f(B) and row 2 + i is f(AB_i). Each matrix is evaluated in EVALUATION_BLOCK rows.
+    """
+    samples = len(a)
+    outputs = {key: np.empty((model.dimension + 2, samples)) for key in SENSITIVITY_OUTPUTS}
+    capped = dict.fromkeys(SENSITIVITY_OUTPUTS, 0)
+    for start in range(0, samples, EVALUATION_BLOCK):
+        rows = slice(start, start + EVALUATION_BLOCK)
+        matrices = [a[rows], b[rows]]
+        for i in range(model.dimension):
+            ab = a[rows].copy()
+            ab[:, i] = b[rows, i]
+            matrices.append(ab)
+        values, masks = model.evaluate(model.to_physical(np.concatenate(matrices)))
+        for key in SENSITIVITY_OUTPUTS:
+            outputs[key][:, rows] = values[key].reshape(len(matrices), -1)
+            capped[key] += int(np.count_nonzero(masks[key]))
+    return outputs, capped
+
+def sobol_estimates(f_a, f_b, f_ab):
+    """First-order (Saltelli 2010) and total (Jansen 1999) indices for every input.
+
+    f_a and f_b have shape (..., samples) and f_ab shape (..., dimension, samples); leading axes
+    (e.g. bootstrap replicates) are kept.
+    """
+    variance = np.var(np.concatenate([f_a, f_b], axis=-1), axis=-1)[..., None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        first = np.mean(f_b[..., None, :] * (f_ab - f_a[..., None, :]), axis=-1) / variance
+        total = 0.5 * np.mean((f_a[..., None, :] - f_ab) ** 2, axis=-1) / variance
+    return first, total
+
+def sobol_indices(model, samples=4096, seed=0, bootstrap=100):
+    """Sobol indices of every output with respect to every input of a SensitivityModel.
+
+    Costs samples * (dimension + 2) evaluations. The confidence half-widths are 1.96 bootstrap
+    standard deviations, resampling the rows of A, B and AB_i together.
+    """
+    if samples < 2:
+        raise ValueError("At least two samples are needed.")
+    a, b = base_samples(samples, model.dimension, seed)
+    outputs, capped = saltelli_evaluations(model, a, b)
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(1,)))
+    result_outputs = {}
+    for key in SENSITIVITY_OUTPUTS:
+        values = outputs[key]
+        first, total = sobol_estimates(values[0], values[1], values[2:])
+        first_reps, total_reps = [], []
+        for _ in range(bootstrap):
+            rows = rng.integers(0, samples, samples)
+            s1, st = sobol_estimates(values[0, rows], values[1, rows], values[2:, rows])
+            first_reps.append(s1)
+            total_reps.append(st)
+        first_conf = 1.96 * np.std(first_reps, axis=0) if bootstrap > 1 else np.full(model.dimension, math.nan)
+        total_conf = 1.96 * np.std(total_reps, axis=0) if bootstrap > 1 else np.full(model.dimension, math.nan)
+        result_outputs[key] = {
+            "mean": float(values[:2].mean()),
+            "variance": float(values[:2].var()),
+            "capped_fraction": capped[key] / values.size,
+            "indices": {name: {"S1": float(first[i]), "S1_conf": float(first_conf[i]),
+                               "ST": float(total[i]), "ST_conf": float(total_conf[i])}
+                        for i, name in enumerate(model.names)},
+        }
+    return {
+        "method": "saltelli",
+        "samples": samples,
+        "evaluations": samples * (model.dimension + 2),
+        "seed": seed,
+        "inputs": {name: list(bounds) for name, bounds in model.inputs.items()},
+        "outputs": result_outputs,
+    }
+
+def format_sensitivity(result):
+    """Plain-text tables of the indices per output, most influential (by total index) first."""
+    lines = []
+    for key, entry in result["outputs"].items():
+        lines.append(f"{key} (mean {entry['mean']:.4g}, variance {entry['variance']:.4g}, capped {entry['capped_fraction']:.1%})")
+        lines.append(f"  {'input':<40} {'S1':>7} {'+/-':>6} {'ST':>7} {'+/-':>6}")
+        ranked = sorted(entry["indices"].items(), key=lambda item: -item[1]["ST"] if math.isfinite(item[1]["ST"]) else 0.0)
+        for name, indices in ranked:
+            lines.append(f"  {name:<40} {indices['S1']:>7.3f} {indices['S1_conf']:>6.3f} {indices['ST']:>7.3f} {indices['ST_conf']:>6.3f}")
+    return "\n".join(lines)
+
+def sensitivity_main(argv):
+    """Command line entry point for `retaining_wall_calculator.py sensitivity`."""
+    parser = argparse.ArgumentParser(prog="retaining_wall_calculator.py sensitivity",
+                                     description="Rank the design parameters and soil properties by their Sobol indices on the stability results.")
+    parser.add_argument("spec", nargs="?", help="JSON file with design, inputs (name -> [low, high] or null) and relative_range; "
+                                                "without it the default design is analyzed over all inputs")
+    parser.add_argument("--samples", type=int, default=4096, help="Base samples N, best a power of two; the analysis costs N * (inputs + 2) evaluations (default: 4096)")
+    parser.add_argument("--relative-range", type=float, help="Default +/- range around nominal values as a fraction (default: 0.1)")
+    parser.add_argument("--bootstrap", type=int, default=100, help="Bootstrap replicates for the confidence intervals (default: 100)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    spec = {}
+    if args.spec:
+        with open(args.spec, "r") as f:
+            spec = json.load(f)
+    if args.relative_range is not None:
+        spec["relative_range"] = args.relative_range
+    try:
+        model = SensitivityModel.from_spec(spec)
+        result = sobol_indices(model, args.samples, args.seed, args.bootstrap)
+    except ValueError as e:
+        parser.error(str(e))
+    print(format_sensitivity(result))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Sensitivity results saved to {args.output}")
+    return 0
@@ -1,7 +1,19 @@
 import math
-from earth_pressure import calculate_earth_pressure
+import numpy as np
+from earth_pressure import (pressure_coefficient_array, lateral_pressure_array, point_load_effect_array, point_load_factors,
+                            SLOPED_BACKFILL_BETA_DEG, UNIT_WEIGHT_WATER)
+from surcharge_loads import surcharge_resultant_array
+from stratigraphy import layered_resultant_array
+from pressure_diagram import homogeneous_resultant_array
+from analysis_context import AnalysisContext
+import forward_mode as fm
+from forward_mode import value_of
 
-def perform_stability_analysis(params, geometry, active_soil, passive_soil, wall_material_props, slab_material_props):
+# Batch columns holding one value (a load set or layer table) shared by every design
+SHARED_COLUMNS = ("surcharge_loads", "stratigraphy")
+
+def perform_stability_analysis(params, geometry, active_soil, passive_soil, wall_material_props, slab_material_props,
+                               context=None):
     H_total = geometry["H_total"]
     h_wall_stem = geometry["h_wall_stem"]
     D_f = geometry["D_f"]
@@ -11,12 +23,9 @@ def perform_stability_analysis(params, geometry, active_soil, passive_soil, wall
     t_base = geometry["t_base"]
     B_base = geometry["B_base"]
     wall_base_offset_from_toe = geometry["wall_base_offset_from_toe"]
-    groundwater_level_below_base = geometry["groundwater_level_below_base"]
     shear_key_depth = geometry["shear_key_depth"]
     shear_key_width = geometry["shear_key_width"]
     surcharge_load = geometry["surcharge_load"] # Surcharge load
-    point_load = geometry["point_load"] # Point load
-    point_load_distance_from_wall = geometry["point_load_distance_from_wall"] # Point load distance
     active_side_ground_elevation = geometry["active_side_ground_elevation"]
     passive_side_ground_elevation = geometry["passive_side_ground_elevation"]
     foundation_lower_than_passive_side = geometry["foundation_lower_than_passive_side"]
@@ -55,50 +64,60 @@ def perform_stability_analysis(params, geometry, active_soil, passive_soil, wall
                                  (weight_soil_toe * x_soil_toe)
 
     # --- Earth Pressure Calculations ---
-    # Groundwater depth from ground surface
-    groundwater_depth_from_surface = D_f + groundwater_level_below_base
+    # Pressure diagrams and loads of the design (see AnalysisContext), integrated exactly
+    if context is None:
+        context = AnalysisContext(params, geometry, active_soil, passive_soil)
+    active_diagram = context.pressure_diagrams["active"]
+    Pa_at_base = active_diagram.base_pressure()
+    Pa_force = active_diagram.force()
+    y_Pa = active_diagram.line_of_action() # Lever arm for active force from base
+
+    # Point load on the active side (Boussinesq lateral pressure over the full height)
+    point_load_effect = context.point_load_effect
+    point_load_force = point_load_effect["force"]
+    y_point_load = point_load_effect["line_of_action"]
 
-    # Active Pressure
-    Pa_at_base = calculate_earth_pressure(active_soil, H_total, groundwater_depth_from_surface, is_active=True, surcharge_load=surcharge_load, active_side_slope_height=geometry["active_side_slope_height"])
-    Pa_force = 0.5 * Pa_at_base * H_total # Triangular distribution
-    y_Pa = H_total / 3 # Lever arm for active force from base
+    # Line and strip surcharge loads (params["surcharge_loads"], see surcharge_loads.py)
+    surcharge_loads_force, surcharge_loads_moment = context.surcharge_loads_force, context.surcharge_loads_moment
+    y_surcharge_loads = surcharge_loads_moment / surcharge_loads_force if surcharge_loads_force else 0.0
 
     # Passive Pressure (at toe side, up to foundation depth)
-    # Adjust passive depth if foundation is lower than passive side ground
-    passive_depth_for_pressure = D_f + foundation_lower_than_passive_side
-    Pp_at_base = calculate_earth_pressure(passive_soil, passive_depth_for_pressure, groundwater_depth_from_surface, is_active=False)
-    Pp_force = 0.5 * Pp_at_base * passive_depth_for_pressure # Triangular distribution
-    y_Pp = passive_depth_for_pressure / 3 # Lever arm for passive force from base
+    passive_diagram = context.pressure_diagrams["passive"]
+    Pp_at_base = passive_diagram.base_pressure()
+    Pp_force = passive_diagram.force()
+    y_Pp = passive_diagram.line_of_action() # Lever arm for passive force from base
 
     # Shear Key Resistance
-    shear_key_resistance = 0.0
-    if params["shear_key_used"] and params["slab_material"] == "concrete":
+    # The resistance a key would provide is evaluated even when no key is used, so that a key can be
+    # added afterwards with apply_shear_key instead of re-running the whole analysis.
+    shear_key_resistance_available = 0.0
+    if params["slab_material"] == "concrete":
         if params["shear_key_position"] == "heel":
             # Shear key at heel is on the active side, so it does not contribute to passive resistance
-            shear_key_resistance = 0.0
+            shear_key_resistance_available = 0.0
         else: # "toe" or "under_wall"
             # Depth of soil in front of the shear key
             shear_key_soil_depth_start = D_f
             shear_key_soil_depth_end = D_f + shear_key_depth
 
             # Passive pressure at the top of the shear key (at depth D_f)
-            Pp_at_top_of_key = calculate_earth_pressure(passive_soil, shear_key_soil_depth_start, groundwater_depth_from_surface, is_active=False)
+            Pp_at_top_of_key = context.passive_pressure(shear_key_soil_depth_start)
             # Passive pressure at the bottom of the shear key (at depth D_f + shear_key_depth)
-            Pp_at_bottom_of_key = calculate_earth_pressure(passive_soil, shear_key_soil_depth_end, groundwater_depth_from_surface, is_active=False)
+            Pp_at_bottom_of_key = context.passive_pressure(shear_key_soil_depth_end)
 
             # The force is the area of the trapezoid formed by the pressure diagram over the shear key depth
-            shear_key_resistance = 0.5 * (Pp_at_top_of_key + Pp_at_bottom_of_key) * shear_key_depth
-
+            shear_key_resistance_available = 0.5 * (Pp_at_top_of_key + Pp_at_bottom_of_key) * shear_key_depth
+    shear_key_resistance = shear_key_resistance_available if params["shear_key_used"] else 0.0
 
     # Overturning Moment about Toe
-    overturning_moment = Pa_force * y_Pa
+    overturning_moment = Pa_force * y_Pa + point_load_effect["moment"] + surcharge_loads_moment
 
     # --- Stability Analysis ---
     # Factor of Safety Against Overturning
     FS_overturning = resisting_moment_about_toe / overturning_moment if overturning_moment > 0 else float('inf')
 
     # Sliding Force
-    sliding_force = Pa_force - Pp_force # Net horizontal force
+    sliding_force = Pa_force + point_load_force + surcharge_loads_force - Pp_force # Net horizontal force
 
     # Resisting Force against Sliding (friction + passive resistance + shear key resistance)
     # Assuming friction angle between concrete and soil is 2/3 * phi_active
@@ -133,13 +152,19 @@ def perform_stability_analysis(params, geometry, active_soil, passive_soil, wall
         "Pa_at_base": Pa_at_base,
         "Pa_force": Pa_force,
         "y_Pa": y_Pa,
+        "point_load_force": point_load_force,
+        "y_point_load": y_point_load,
+        "surcharge_loads_force": surcharge_loads_force,
+        "y_surcharge_loads": y_surcharge_loads,
         "Pp_at_base": Pp_at_base,
         "Pp_force": Pp_force,
         "y_Pp": y_Pp,
         "shear_key_resistance": shear_key_resistance,
+        "shear_key_resistance_available": shear_key_resistance_available,
         "overturning_moment": overturning_moment,
         "FS_overturning": FS_overturning,
         "sliding_force": sliding_force,
+        "friction_resisting_force": friction_resisting_force,
         "total_resisting_sliding_force": total_resisting_sliding_force,
         "FS_sliding": FS_sliding,
         "x_bar": x_bar,
@@ -151,4 +176,294 @@ def perform_stability_analysis(params, geometry, active_soil, passive_soil, wall
         "weight_base_slab": weight_base_slab, # Added for testing
         "weight_soil_heel": weight_soil_heel, # Added for testing
         "weight_soil_toe": weight_soil_toe, # Added for testing
-    }
\ No newline at end of file
+    }
+
+def apply_shear_key(stability_results):
+    """Returns a copy of perform_stability_analysis results with the shear key included.
+    Only the sliding terms depend on the key, so nothing else is recomputed."""
+    results = dict(stability_results)
+    results["shear_key_resistance"] = results["shear_key_resistance_available"]
+    results["total_resisting_sliding_force"] = results["friction_resisting_force"] + results["Pp_force"] + results["shear_key_resistance"]
+    sliding_force = results["sliding_force"]
+    results["FS_sliding"] = results["total_resisting_sliding_force"] / sliding_force if sliding_force > 0 else float('inf')
+    return results
+
+def apply_shear_key_batch(stability_results, mask):
+    """Array form of apply_shear_key: adds the shear key for designs where mask is True."""
+    results = dict(stability_results)
+    results["shear_key_resistance"] = np.where(mask, results["shear_key_resistance_available"], results["shear_key_resistance"])
+    results["total_resisting_sliding_force"] = results["friction_resisting_force"] + results["Pp_force"] + results["shear_key_resistance"]
+    sliding_force = results["sliding_force"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        results["FS_sliding"] = np.where(sliding_force > 0, results["total_resisting_sliding_force"] / sliding_force, np.inf)
+    return results
+
+def perform_stability_analysis_batch(columns):
+    """Vectorized perform_stability_analysis over column arrays of wall designs.
+
+    `columns` maps names to scalars or 1-D arrays (scalars are broadcast):
+      geometry:  h_wall_stem, D_f, B_toe, B_heel, t_top, t_base, groundwater_level_below_base,
+                 shear_key_depth, surcharge_load, active_side_ground_elevation,
+                 passive_side_ground_elevation, foundation_lower_than_passive_side,
+                 active_side_slope_height, and optionally wall_base_offset_from_toe (defaults to B_toe),
+                 point_load and point_load_distance_from_wall (no point load by default)
+      shared:    optionally surcharge_loads, one load set shared by all designs (see
+                 surcharge_loads.normalize_loads), and stratigraphy, a layer table (see
+                 stratigraphy.normalize_layers) that replaces the active soil's pressure
+                 parameters, with unit_weight_water in the same units
+      materials: wall_unit_weight, slab_unit_weight
+      soils:     active_unit_weight, active_friction_angle_deg, passive_unit_weight,
+                 passive_friction_angle_deg, allowable_bearing_pressure, and optionally
+                 active_pressure_unit_weight / passive_pressure_unit_weight when the unit weight
+                 used for earth pressure differs from the one used for soil self-weight
+      flags:     shear_key_used (True where a shear key is used) and optionally
+                 shear_key_available (True where a key would resist sliding, i.e. the slab is
+                 concrete and the key is not at the heel; defaults to True)
+
+    All values must be in one consistent unit system. Returns a dict with the same keys as
+    perform_stability_analysis, each holding an array with one entry per design.
+    """
+    c = {key: np.asarray(value, dtype=float) for key, value in columns.items() if key not in SHARED_COLUMNS}
+    h_wall_stem = c["h_wall_stem"]
+    D_f = c["D_f"]
+    B_toe = c["B_toe"]
+    B_heel = c["B_heel"]
+    t_top = c["t_top"]
+    t_base = c["t_base"]
+    groundwater_level_below_base = c["groundwater_level_below_base"]
+    shear_key_depth = c["shear_key_depth"]
+    surcharge_load = c["surcharge_load"]
+    active_side_ground_elevation = c["active_side_ground_elevation"]
+    passive_side_ground_elevation = c["passive_side_ground_elevation"]
+    foundation_lower_than_passive_side = c["foundation_lower_than_passive_side"]
+    active_side_slope_height = c["active_side_slope_height"]
+    shear_key_used = c["shear_key_used"].astype(bool)
+    shear_key_available = c.get("shear_key_available", np.array(True)).astype(bool)
+    gamma_active = c["active_unit_weight"]
+    gamma_passive = c["passive_unit_weight"]
+    gamma_active_pressure = c.get("active_pressure_unit_weight", gamma_active)
+    gamma_passive_pressure = c.get("passive_pressure_unit_weight", gamma_passive)
+    phi_active = c["active_friction_angle_deg"]
+    phi_passive = c["passive_friction_angle_deg"]
+
+    H_total = h_wall_stem + D_f
+    B_base = B_toe + t_base + B_heel
+    wall_base_offset_from_toe = c.get("wall_base_offset_from_toe", B_toe)
+
+    # --- Weights of Wall Components (per unit length) ---
+    weight_stem = 0.5 * (t_top + t_base) * h_wall_stem * c["wall_unit_weight"]
+    x_stem = wall_base_offset_from_toe + (t_base / 3) * ((2 * t_top + t_base) / (t_top + t_base))
+    weight_base_slab = B_base * D_f * c["slab_unit_weight"]
+    x_base_slab = B_base / 2
+    weight_soil_heel = B_heel * (h_wall_stem + active_side_ground_elevation) * gamma_active
+    x_soil_heel = B_base - B_heel / 2
+    weight_soil_toe = B_toe * passive_side_ground_elevation * gamma_passive
+    x_soil_toe = B_toe / 2
+
+    total_vertical_force = weight_stem + weight_base_slab + weight_soil_heel + weight_soil_toe
+    resisting_moment_about_toe = (weight_stem * x_stem) + \
+                                 (weight_base_slab * x_base_slab) + \
+                                 (weight_soil_heel * x_soil_heel) + \
+                                 (weight_soil_toe * x_soil_toe)
+
+    # --- Earth Pressure Calculations ---
+    groundwater_depth_from_surface = D_f + groundwater_level_below_base
+
+    Ka = pressure_coefficient_array(phi_active, np.where(active_side_slope_height > 0, SLOPED_BACKFILL_BETA_DEG, 0.0))
+    Kp = pressure_coefficient_array(phi_passive, is_active=False)
+
+    layers = columns.get("stratigraphy", ())
+    if layers:
+        Pa_force, Pa_moment, Pa_at_base = layered_resultant_array(
+            layers, H_total, groundwater_depth_from_surface, surcharge_load,
+            np.where(active_side_slope_height > 0, SLOPED_BACKFILL_BETA_DEG, 0.0), c.get("unit_weight_water", UNIT_WEIGHT_WATER))
+    else:
+        Pa_force, Pa_moment, Pa_at_base = homogeneous_resultant_array(gamma_active_pressure, Ka, H_total, groundwater_depth_from_surface, surcharge_load)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        y_Pa = np.where(Pa_force != 0, Pa_moment / Pa_force, H_total / 3)
+
+    point_load_force, point_load_moment = point_load_effect_array(c.get("point_load", 0.0), c.get("point_load_distance_from_wall", 1.0), H_total)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        y_point_load = np.where(point_load_force != 0, point_load_moment / point_load_force, 0.0)
+    surcharge_loads_force, surcharge_loads_moment, _ = surcharge_resultant_array(columns.get("surcharge_loads", ()), H_total)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        y_surcharge_loads = np.where(surcharge_loads_force != 0, surcharge_loads_moment / surcharge_loads_force, 0.0)
+
+    passive_depth_for_pressure = D_f + foundation_lower_than_passive_side
+    Pp_force, Pp_moment, Pp_at_base = homogeneous_resultant_array(gamma_passive_pressure, Kp, passive_depth_for_pressure, groundwater_depth_from_surface)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        y_Pp = np.where(Pp_force != 0, Pp_moment / Pp_force, passive_depth_for_pressure / 3)
+
+    Pp_at_top_of_key = lateral_pressure_array(gamma_passive_pressure, Kp, D_f, groundwater_depth_from_surface)
+    Pp_at_bottom_of_key = lateral_pressure_array(gamma_passive_pressure, Kp, D_f + shear_key_depth, groundwater_depth_from_surface)
+    shear_key_resistance_available = np.where(shear_key_available, 0.5 * (Pp_at_top_of_key + Pp_at_bottom_of_key) * shear_key_depth, 0.0)
+    shear_key_resistance = np.where(shear_key_used, shear_key_resistance_available, 0.0)
+
+    overturning_moment = Pa_force * y_Pa + point_load_moment + surcharge_loads_moment
+
+    # --- Stability Analysis ---
+    with np.errstate(divide="ignore", invalid="ignore"):
+        FS_overturning = np.where(overturning_moment > 0, resisting_moment_about_toe / overturning_moment, np.inf)
+
+        sliding_force = Pa_force + point_load_force + surcharge_loads_force - Pp_force
+        friction_angle_base = (2/3) * phi_active
+        friction_resisting_force = total_vertical_force * np.tan(np.radians(friction_angle_base))
+        total_resisting_sliding_force = friction_resisting_force + Pp_force + shear_key_resistance
+        FS_sliding = np.where(sliding_force > 0, total_resisting_sliding_force / sliding_force, np.inf)
+
+        x_bar = (resisting_moment_about_toe - overturning_moment) / total_vertical_force
+        e = x_bar - (B_base / 2)
+
+        outside_middle_third = np.abs(e) > B_base / 6
+        q_triangular = np.where(x_bar > 0, (2 * total_vertical_force) / (3 * x_bar), np.inf)
+        q_max = np.where(outside_middle_third, q_triangular, (total_vertical_force / B_base) * (1 + (6 * e) / B_base))
+        q_min = np.where(outside_middle_third, 0.0, (total_vertical_force / B_base) * (1 - (6 * e) / B_base))
+
+        FS_bearing = np.where(q_max > 0, c["allowable_bearing_pressure"] / q_max, np.inf)
+
+    results = {
+        "total_vertical_force": total_vertical_force,
+        "resisting_moment_about_toe": resisting_moment_about_toe,
+        "Pa_at_base": Pa_at_base,
+        "Pa_force": Pa_force,
+        "y_Pa": y_Pa,
+        "point_load_force": point_load_force,
+        "y_point_load": y_point_load,
+        "surcharge_loads_force": surcharge_loads_force,
+        "y_surcharge_loads": y_surcharge_loads,
+        "Pp_at_base": Pp_at_base,
+        "Pp_force": Pp_force,
+        "y_Pp": y_Pp,
+        "shear_key_resistance": shear_key_resistance,
+        "shear_key_resistance_available": shear_key_resistance_available,
+        "overturning_moment": overturning_moment,
+        "FS_overturning": FS_overturning,
+        "sliding_force": sliding_force,
+        "friction_resisting_force": friction_resisting_force,
+        "total_resisting_sliding_force": total_resisting_sliding_force,
+        "FS_sliding": FS_sliding,
+        "x_bar": x_bar,
+        "e": e,
+        "q_max": q_max,
+        "q_min": q_min,
+        "FS_bearing": FS_bearing,
+        "weight_stem": weight_stem,
+        "weight_base_slab": weight_base_slab,
+        "weight_soil_heel": weight_soil_heel,
+        "weight_soil_toe": weight_soil_toe,
+    }
+    shape = np.broadcast_shapes(*(np.shape(value) for value in results.values()))
+    return {key: np.broadcast_to(value, shape) for key, value in results.items()}
+
+def _lateral_pressure_dual(unit_weight, K, height, groundwater_depth, surcharge_load=0.0):
+    """lateral_pressure_array for Dual or array arguments (the groundwater split via fm.where)."""
+    pressure = unit_weight * height * K + surcharge_load * K
+    depth_below_gw = height - groundwater_depth
+    submerged_pressure = ((unit_weight * groundwater_depth + surcharge_load) * K + (unit_weight - UNIT_WEIGHT_WATER) * depth_below_gw * K
+                          + UNIT_WEIGHT_WATER * depth_below_gw)
+    return fm.where(value_of(height) > value_of(groundwater_depth), submerged_pressure, pressure)
+
+def _ka_dual(phi_deg, sloped):
+    phi_rad = phi_deg * (math.pi / 180)
+    K = fm.tan(math.pi/4 - phi_rad/2)**2
+    if not np.any(sloped):
+        return K
+    cos_beta = math.cos(math.radians(SLOPED_BACKFILL_BETA_DEG))
+    root = fm.sqrt(cos_beta**2 - fm.cos(phi_rad)**2)
+    return fm.where(sloped, cos_beta * ((cos_beta - root) / (cos_beta + root)), K)
+
+def _point_load_effect_dual(point_load, distance_from_wall, H_total):
+    """point_load_effect_array with derivatives through the distance ratio m = x / H."""
+    Q = value_of(point_load)
+    if not np.any(np.asarray(Q) != 0):
+        return 0.0, 0.0
+    m = distance_from_wall / H_total
+    m_value = np.asarray(value_of(m), dtype=float)
+    if np.any((np.asarray(Q) != 0) & (m_value <= 0)):
+        raise ValueError("The point load must be at a positive distance from the wall.")
+    F, G, dF, dG = point_load_factors(np.where(m_value > 0, m_value, 1.0))
+    return point_load / H_total * fm.chain(m, F, dF), point_load * fm.chain(m, G, dG)
+
+def _surcharge_loads_dual(loads, H_total):
+    """surcharge_resultant_array with derivatives through H: dF/dH is the pressure at the bottom
+    of H and dM/dH the force."""
+    if not loads:
+        return 0.0, 0.0
+    force, moment, base_pressure = surcharge_resultant_array(loads, value_of(H_total))
+    return fm.chain(H_total, force, base_pressure), fm.chain(H_total, moment, force)
+
+def stability_factors_dual(columns):
+    """The factors of safety of perform_stability_analysis_batch with forward-mode derivatives.
+
+    `columns` are as for perform_stability_analysis_batch, except that numeric columns may be
+    forward_mode.Dual values carrying gradients with respect to some seed variables (e.g. the
+    standard normal variables of a reliability analysis). Returns FS_overturning, FS_sliding,
+    FS_bearing and Pa_force (nan where Ka is undefined), as Duals wherever they depend on a seed.
+    Keep in step with perform_stability_analysis_batch. A layered stratigraphy is not supported.
+    """
+    if columns.get("stratigraphy"):
+        raise ValueError("Derivatives are not available for a layered stratigraphy.")
+    c = {key: value if isinstance(value, fm.Dual) else np.asarray(value, dtype=float)
+         for key, value in columns.items() if key not in SHARED_COLUMNS}
+    h_wall_stem = c["h_wall_stem"]
+    D_f = c["D_f"]
+    B_toe = c["B_toe"]
+    B_heel = c["B_heel"]
+    t_top = c["t_top"]
+    t_base = c["t_base"]
+    gamma_active = c["active_unit_weight"]
+    gamma_passive = c["passive_unit_weight"]
+    gamma_active_pressure = c.get("active_pressure_unit_weight", gamma_active)
+    gamma_passive_pressure = c.get("passive_pressure_unit_weight", gamma_passive)
+    phi_active = c["active_friction_angle_deg"]
+    phi_passive = c["passive_friction_angle_deg"]
+    shear_key_used = np.asarray(columns["shear_key_used"]).astype(bool)
+    shear_key_available = np.asarray(columns.get("shear_key_available", True)).astype(bool)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        H_total = h_wall_stem + D_f
+        B_base = B_toe + t_base + B_heel
+        wall_base_offset_from_toe = c.get("wall_base_offset_from_toe", B_toe)
+
+        weight_stem = 0.5 * (t_top + t_base) * h_wall_stem * c["wall_unit_weight"]
+        x_stem = wall_base_offset_from_toe + (t_base / 3) * ((2 * t_top + t_base) / (t_top + t_base))
+        weight_base_slab = B_base * D_f * c["slab_unit_weight"]
+        weight_soil_heel = B_heel * (h_wall_stem + c["active_side_ground_elevation"]) * gamma_active
+        weight_soil_toe = B_toe * c["passive_side_ground_elevation"] * gamma_passive
+        total_vertical_force = weight_stem + weight_base_slab + weight_soil_heel + weight_soil_toe
+        resisting_moment_about_toe = (weight_stem * x_stem) + (weight_base_slab * (B_base / 2)) + \
+                                     (weight_soil_heel * (B_base - B_heel / 2)) + (weight_soil_toe * (B_toe / 2))
+
+        groundwater_depth_from_surface = D_f + c["groundwater_level_below_base"]
+        Ka = _ka_dual(phi_active, value_of(c["active_side_slope_height"]) > 0)
+        Kp = fm.tan(math.pi/4 + phi_passive * (math.pi / 180) / 2)**2
+
+        Pa_force, Pa_moment, _ = homogeneous_resultant_array(gamma_active_pressure, Ka, H_total, groundwater_depth_from_surface, c["surcharge_load"])
+        point_load_force, point_load_moment = _point_load_effect_dual(c.get("point_load", 0.0), c.get("point_load_distance_from_wall", 1.0), H_total)
+        surcharge_loads_force, surcharge_loads_moment = _surcharge_loads_dual(columns.get("surcharge_loads", ()), H_total)
+        overturning_moment = Pa_moment + point_load_moment + surcharge_loads_moment
+
+        passive_depth_for_pressure = D_f + c["foundation_lower_than_passive_side"]
+        Pp_force, _, _ = homogeneous_resultant_array(gamma_passive_pressure, Kp, passive_depth_for_pressure, groundwater_depth_from_surface)
+
+        shear_key_depth = c["shear_key_depth"]
+        Pp_at_top_of_key = _lateral_pressure_dual(gamma_passive_pressure, Kp, D_f, groundwater_depth_from_surface)
+        Pp_at_bottom_of_key = _lateral_pressure_dual(gamma_passive_pressure, Kp, D_f + shear_key_depth, groundwater_depth_from_surface)
+        shear_key_resistance = fm.where(shear_key_used & shear_key_available,
+                                        0.5 * (Pp_at_top_of_key + Pp_at_bottom_of_key) * shear_key_depth, 0.0)
+
+        FS_overturning = fm.where(value_of(overturning_moment) > 0, resisting_moment_about_toe / overturning_moment, np.inf)
+
+        sliding_force = Pa_force + point_load_force + surcharge_loads_force - Pp_force
+        friction_resisting_force = total_vertical_force * fm.tan(((2/3) * phi_active) * (math.pi / 180))
+        total_resisting_sliding_force = friction_resisting_force + Pp_force + shear_key_resistance
+        FS_sliding = fm.where(value_of(sliding_force) > 0, total_resisting_sliding_force / sliding_force, np.inf)
+
+        x_bar = (resisting_moment_about_toe - overturning_moment) / total_vertical_force
+        e = x_bar - B_base / 2
+        outside_middle_third = np.abs(value_of(e)) > value_of(B_base) / 6
+        q_triangular = fm.where(value_of(x_bar) > 0, (2 * total_vertical_force) / (3 * x_bar), np.inf)
+        q_max = fm.where(outside_middle_third, q_triangular, (total_vertical_force / B_base) * (1 + (6 * e) / B_base))
+        FS_bearing = fm.where(value_of(q_max) > 0, c["allowable_bearing_pressure"] / q_max, np.inf)
+
+    return {"FS_overturning": FS_overturning, "FS_sliding": FS_sliding, "FS_bearing": FS_bearing, "Pa_force": Pa_force}
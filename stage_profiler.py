@@ -0,0 +1,118 @@
+import json
+import time
+import tracemalloc
+
+# Profiler that stage() reports to; None means instrumentation is off
+_active_profiler = None
+
+STAT_KEYS = ("calls", "wall_s", "cpu_s", "allocated_bytes", "peak_allocated_bytes")
+
+class StageProfiler:
+    """Opt-in per-stage instrumentation.
+
+    While a StageProfiler is active (used as a context manager), every `with stage(name):` block
+    records wall-clock time, CPU time and a call count under `name`. With track_allocations,
+    tracemalloc also records the net and peak bytes allocated inside each stage (this slows the
+    instrumented code down noticeably). Stats from several profilers, e.g. one per worker process,
+    can be combined with merge().
+    """
+
+    def __init__(self, track_allocations=False):
+        self.track_allocations = track_allocations
+        self.stages = {}
+        self._previous = None
+        self._started_tracemalloc = False
+
+    def __enter__(self):
+        global _active_profiler
+        self._previous = _active_profiler
+        _active_profiler = self
+        if self.track_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _active_profiler
+        _active_profiler = self._previous
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        return False
+
+    def record(self, name, wall_s, cpu_s, allocated_bytes=0, peak_allocated_bytes=0):
+        entry = self.stages.setdefault(name, dict.fromkeys(STAT_KEYS, 0))
+        entry["calls"] += 1
+        entry["wall_s"] += wall_s
+        entry["cpu_s"] += cpu_s
+        entry["allocated_bytes"] += allocated_bytes
+        entry["peak_allocated_bytes"] = max(entry["peak_allocated_bytes"], peak_allocated_bytes)
+
+    def merge(self, stages):
+        """Adds stage stats (the `stages` dict of another profiler) into this one."""
+        for name, other in stages.items():
+            entry = self.stages.setdefault(name, dict.fromkeys(STAT_KEYS, 0))
+            for key in ("calls", "wall_s", "cpu_s", "allocated_bytes"):
+                entry[key] += other[key]
+            entry["peak_allocated_bytes"] = max(entry["peak_allocated_bytes"], other["peak_allocated_bytes"])
+
+    def report(self):
+        """Stage stats with per-call means and each stage's share of the total wall time."""
+        total_wall = sum(entry["wall_s"] for entry in self.stages.values())
+        stages = {}
+        for name, entry in sorted(self.stages.items(), key=lambda item: -item[1]["wall_s"]):
+            stages[name] = {
+                **entry,
+                "mean_wall_ms": 1000 * entry["wall_s"] / entry["calls"],
+                "mean_cpu_ms": 1000 * entry["cpu_s"] / entry["calls"],
+                "wall_share": entry["wall_s"] / total_wall if total_wall else 0.0,
+            }
+        return {"total_wall_s": total_wall, "track_allocations": self.track_allocations, "stages": stages}
+
+    def to_json(self, indent=2):
+        return json.dumps(self.report(), indent=indent)
+
+    def write(self, path):
+        with open(path, "w") as f:
+            f.write(self.to_json())
+
+class _Stage:
+    __slots__ = ("profiler", "name", "wall", "cpu", "memory")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        if self.profiler.track_allocations:
+            tracemalloc.reset_peak()
+            self.memory = tracemalloc.get_traced_memory()[0]
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        allocated = peak = 0
+        if self.profiler.track_allocations:
+            current, peak_memory = tracemalloc.get_traced_memory()
+            allocated, peak = current - self.memory, peak_memory - self.memory
+        self.profiler.record(self.name, wall, cpu, allocated, peak)
+        return False
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+def stage(name):
+    """Context manager timing one stage on the active StageProfiler; a no-op when none is active."""
+    if _active_profiler is None:
+        return _NULL_STAGE
+    return _Stage(_active_profiler, name)
@@ -0,0 +1,149 @@
+from functools import lru_cache
+import numpy as np
+from earth_pressure import pressure_coefficient_array, UNIT_WEIGHT_WATER
+from pressure_diagram import PressureDiagram
+from unit_conversion import M_TO_FT, KN_M3_TO_PCF, KPA_TO_PSF
+
+# --- Layered Stratigraphy ---
+# Horizontal soil layers on the active side, listed from the ground surface down. Each layer is
+# (thickness, gamma, gamma_sat, phi, c); the last layer continues below the bottom of the table.
+# Within a layer and on one side of the groundwater table the effective vertical stress is linear
+# in depth, so the profile is split there into segments whose top stresses are prefix sums of
+# gamma_eff * thickness. A query then only has to find its segment (binary search) and add the
+# linear part: sigma_v' = S[i] + gamma_eff[i] * (z - top[i]) and
+#   active:  p = max(Ka sigma_v' - 2 c sqrt(Ka), 0) + u     (no tension in the soil)
+#   passive: p = Kp sigma_v' + 2 c sqrt(Kp) + u
+# with the pore pressure u = gamma_w * (z - z_w) below the water table z_w.
+
+def normalize_layers(specs, units="metric"):
+    """Hashable layer table from a list of layer dicts in metric units: thickness_m,
+    unit_weight_kn_m3, saturated_unit_weight_kn_m3 (defaults to unit_weight_kn_m3),
+    friction_angle_deg and cohesion_kpa (defaults to 0), converted to the analysis units."""
+    imperial = units == "imperial"
+    length = M_TO_FT if imperial else 1.0
+    unit_weight = KN_M3_TO_PCF if imperial else 1.0
+    pressure = KPA_TO_PSF if imperial else 1.0
+    layers = []
+    for spec in specs or ():
+        thickness = float(spec["thickness_m"])
+        if thickness <= 0:
+            raise ValueError("Every layer needs a positive thickness_m.")
+        gamma = float(spec["unit_weight_kn_m3"])
+        gamma_sat = float(spec.get("saturated_unit_weight_kn_m3", gamma))
+        layers.append((thickness * length, gamma * unit_weight, gamma_sat * unit_weight,
+                       float(spec["friction_angle_deg"]), float(spec.get("cohesion_kpa", 0.0)) * pressure))
+    return tuple(layers)
+
+def layers_from_params(params):
+    """The layer table of params["stratigraphy"] (optional, none by default) in the analysis units."""
+    return normalize_layers(params.get("stratigraphy"), params["units"])
+
+def unit_weight_water(units):
+    """Unit weight of water in the analysis units."""
+    return UNIT_WEIGHT_WATER * (KN_M3_TO_PCF if units == "imperial" else 1.0)
+
+class PressureProfile:
+    """Lateral earth pressure against depth below the surface for a layer table.
+
+    groundwater_depth is the depth of the water table below the surface (None for none) and
+    surcharge_load a uniform surcharge on the surface, which adds to the effective vertical stress
+    at every depth, including below the water table. beta_deg is the backfill slope used for Ka.
+    """
+
+    def __init__(self, layers, groundwater_depth=None, surcharge_load=0.0, is_active=True, beta_deg=0.0,
+                 unit_weight_water=UNIT_WEIGHT_WATER):
+        if not layers:
+            raise ValueError("A pressure profile needs at least one layer.")
+        table = np.array(layers, dtype=float)
+        layer_tops = np.concatenate([[0.0], np.cumsum(table[:-1, 0])])
+        self.is_active = is_active
+        self.groundwater_depth = np.inf if groundwater_depth is None else max(float(groundwater_depth), 0.0)
+        self.unit_weight_water = unit_weight_water
+
+        # Segments: layer tops plus the water table
+        tops = layer_tops
+        if np.isfinite(self.groundwater_depth):
+            tops = np.union1d(layer_tops, [self.groundwater_depth])
+        self.tops = tops
+        layer = np.searchsorted(layer_tops, tops, side="right") - 1
+        submerged = tops >= self.groundwater_depth
+        self.gamma_effective = np.where(submerged, table[layer, 2] - unit_weight_water, table[layer, 1])
+        self.sigma_top = float(surcharge_load) + np.concatenate([[0.0], np.cumsum(self.gamma_effective[:-1] * np.diff(tops))])
+        K = pressure_coefficient_array(table[:, 3], beta_deg, is_active)[layer]
+        self.K = K
+        self.cohesion_term = (-2.0 if is_active else 2.0) * table[layer, 4] * np.sqrt(K)
+
+    def _segment(self, depths):
+        return np.maximum(np.searchsorted(self.tops, depths, side="right") - 1, 0)
+
+    def _parts(self, segment, depths):
+        """Effective (before the tension cut-off) and pore-water pressure at depths in given segments."""
+        sigma = self.sigma_top[segment] + self.gamma_effective[segment] * (depths - self.tops[segment])
+        effective = self.K[segment] * sigma + self.cohesion_term[segment]
+        water = self.unit_weight_water * np.maximum(depths - self.groundwater_depth, 0.0)
+        return effective, water
+
+    def pressure(self, depths):
+        """Lateral pressure at an array of depths below the surface."""
+        depths = np.asarray(depths, dtype=float)
+        effective, water = self._parts(self._segment(depths), depths)
+        if self.is_active:
+            effective = np.maximum(effective, 0.0)
+        return effective + water
+
+    def diagram(self, height):
+        """The PressureDiagram over [0, height], with pressures at segment ends taken from inside
+        each segment so the jumps at layer boundaries are kept. Active segments are split where the
+        tension cut-off starts."""
+        inside = self.tops < height
+        z_top = self.tops[inside]
+        z_bottom = np.append(z_top[1:], height)
+        segment = np.flatnonzero(inside)
+        e_top, u_top = self._parts(segment, z_top)
+        e_bottom, u_bottom = self._parts(segment, z_bottom)
+        if not self.is_active:
+            return PressureDiagram(z_top, z_bottom, e_top + u_top, e_bottom + u_bottom)
+        # Split segments at the depth where the effective pressure changes sign
+        crossing = (e_top < 0) != (e_bottom < 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = np.where(crossing, e_top / (e_top - e_bottom), 1.0)
+        z_cross = z_top + t * (z_bottom - z_top)
+        u_cross = u_top + t * (u_bottom - u_top)
+        p_top, p_bottom = np.maximum(e_top, 0) + u_top, np.maximum(e_bottom, 0) + u_bottom
+        z_top, z_bottom, p_top, p_bottom = (np.concatenate([z_top, z_cross[crossing]]),
+                                            np.concatenate([z_cross, z_bottom[crossing]]),
+                                            np.concatenate([p_top, u_cross[crossing]]),
+                                            np.concatenate([np.where(crossing, u_cross, p_bottom), p_bottom[crossing]]))
+        order = np.argsort(z_top, kind="stable")
+        return PressureDiagram(z_top[order], z_bottom[order], p_top[order], p_bottom[order])
+
+    def resultant(self, height):
+        """Force per unit length of wall over [0, height] and its moment about the depth `height`."""
+        diagram = self.diagram(height)
+        return diagram.force(), diagram.moment()
+
+@lru_cache(maxsize=1024)
+def pressure_profile(layers, groundwater_depth=None, surcharge_load=0.0, is_active=True, beta_deg=0.0,
+                     unit_weight_water=UNIT_WEIGHT_WATER):
+    """Cached PressureProfile, so designs sharing a stratigraphy and loading share the prefix sums."""
+    return PressureProfile(layers, groundwater_depth, surcharge_load, is_active, beta_deg, unit_weight_water)
+
+def layered_resultant_array(layers, height, groundwater_depth, surcharge_load, beta_deg, unit_weight_water=UNIT_WEIGHT_WATER,
+                            is_active=True):
+    """Force, moment about the bottom and base pressure of layered earth pressure over arrays of
+    retained heights (the other arguments broadcast against them). Designs are grouped by loading
+    (groundwater, surcharge and slope); each group's heights are resolved at once on the diagram of
+    its profile down to the greatest height (see PressureDiagram.resultants)."""
+    columns = np.broadcast_arrays(*(np.asarray(value, dtype=float) for value in (height, groundwater_depth, surcharge_load, beta_deg)))
+    shape = columns[0].shape
+    heights = columns[0].ravel()
+    loadings, group = np.unique(np.stack([column.ravel() for column in columns[1:]], axis=1), axis=0, return_inverse=True)
+    group = group.ravel()
+    values = np.empty((3, heights.size))
+    for i, (groundwater, surcharge, beta) in enumerate(loadings.tolist()):
+        members = np.flatnonzero(group == i)
+        profile = pressure_profile(layers, groundwater, surcharge, is_active, beta, float(unit_weight_water))
+        # The diagram needs a positive height to have a segment
+        diagram = profile.diagram(max(heights[members].max(), np.finfo(float).tiny))
+        values[:, members] = diagram.resultants(heights[members])
+    return tuple(value.reshape(shape) for value in values)
@@ -0,0 +1,195 @@
+import math
+from functools import lru_cache
+import numpy as np
+from quadrature import adaptive_simpson
+from unit_conversion import M_TO_FT, KPA_TO_PSF, KN_TO_LB
+
+# --- Line and Strip Surcharge Loads ---
+# Loads on the active-side surface, parallel to the wall, at an offset x behind the wall face:
+#   line:  q per unit length of wall (kN/m) at offset x
+#   strip: q per unit area (kPa) from offset a to a + b, optionally varying linearly to q_end across the width
+# The lateral pressure on the wall is the elastic (Boussinesq/Flamant) solution doubled for a rigid,
+# unyielding wall. For a line load, with depth z below the surface,
+#   sigma_h = 4 q / pi * x^2 z / (x^2 + z^2)^2
+# and a strip is the integral of line loads over its width. Line loads and uniform strips have
+# closed-form pressures, resultants and moments; strips of varying intensity are integrated over
+# the width with adaptive_simpson.
+LOAD_TYPES = ("line", "strip")
+
+# Depth points of a cached pressure diagram, in addition to the pressure peaks of every load
+DIAGRAM_POINTS = 65
+MAX_CACHED_LOAD_CASES = 4096
+QUADRATURE_TOLERANCE = 1e-8
+
+def normalize_loads(specs, units="metric"):
+    """Hashable load set from a list of load dicts given in metric units, converted to the
+    analysis units: line loads {"type": "line", "load_kn_m", "offset_m"}, strip loads
+    {"type": "strip", "load_kpa", "offset_m", "width_m"} with an optional "load_end_kpa" at the
+    far edge. Each entry becomes (type, q, offset, width, q_end)."""
+    imperial = units == "imperial"
+    length = M_TO_FT if imperial else 1.0
+    loads = []
+    for spec in specs or ():
+        kind = spec.get("type")
+        if kind not in LOAD_TYPES:
+            raise ValueError(f"Unknown surcharge load type '{kind}'. Expected one of: {', '.join(LOAD_TYPES)}.")
+        offset = float(spec["offset_m"])
+        if offset < 0:
+            raise ValueError("Surcharge loads must be behind the wall (offset_m >= 0).")
+        if kind == "line":
+            if offset == 0:
+                # The Boussinesq line-load solution is singular at the wall face
+                raise ValueError("Line loads need a positive offset_m.")
+            q = float(spec["load_kn_m"]) * (KN_TO_LB / M_TO_FT if imperial else 1.0)
+            loads.append(("line", q, offset * length, 0.0, q))
+        else:
+            width = float(spec["width_m"])
+            if width <= 0:
+                raise ValueError("Strip loads need a positive width_m.")
+            pressure = KPA_TO_PSF if imperial else 1.0
+            q = float(spec["load_kpa"]) * pressure
+            q_end = float(spec.get("load_end_kpa", spec["load_kpa"])) * pressure
+            loads.append(("strip", q, offset * length, width * length, q_end))
+    return tuple(loads)
+
+def load_set_from_params(params):
+    """The load set of params["surcharge_loads"] (optional, empty by default) in the analysis units."""
+    return normalize_loads(params.get("surcharge_loads"), params["units"])
+
+def _line_pressure(q, x, z):
+    """Lateral pressure of line loads q at offsets x, at depths z (broadcast)."""
+    r2 = x * x + z * z
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(r2 > 0, 4 * q / np.pi * x * x * z / (r2 * r2), 0.0)
+
+def _line_resultant(q, x, H):
+    """Force and moment about the bottom of the retained height H of line loads, closed form."""
+    return 2 * q / np.pi * H * H / (x * x + H * H), 2 * q / np.pi * (H - x * np.arctan2(H, x))
+
+def _strip_antiderivatives(x, z, H):
+    """Antiderivatives over the offset x of the line-load pressure at depth z, force and moment."""
+    r2 = x * x + z * z
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pressure = 2 / np.pi * (np.arctan2(x, z) - np.where(r2 > 0, x * z / r2, 0.0))
+    force = 2 * H / np.pi * np.arctan2(x, H)
+    moment = (H * x - x * x * np.arctan2(H, x) + H * H * np.arctan2(x, H)) / np.pi
+    return pressure, force, moment
+
+def _varying_strips(load, depths, H):
+    """Pressures at `depths`, force and moment of a strip of linearly varying intensity, by
+    integrating the line-load solution over the width. The resultants are zero when H is None."""
+    _, q, a, b, q_end = load
+    depths = np.asarray(depths, dtype=float)
+
+    def integrand(owner, x):
+        intensity = q + (q_end - q) * (x - a) / b
+        z = depths[owner]
+        force, moment = _line_resultant(intensity, x, H) if H is not None else (np.zeros_like(x), np.zeros_like(x))
+        return np.stack([_line_pressure(intensity, x, z), force, moment], axis=1)
+
+    # One integral per depth; the resultants are taken from the first
+    integrals, _, _ = adaptive_simpson(integrand, np.full(len(depths), a), np.full(len(depths), a + b), QUADRATURE_TOLERANCE)
+    return integrals[:, 0], integrals[0, 1], integrals[0, 2]
+
+def surcharge_pressure(loads, depths, H=None):
+    """Lateral pressure of a load set at an array of depths below the surface. Also returns the
+    force and moment about the bottom of the retained height H when it is given."""
+    depths = np.atleast_1d(np.asarray(depths, dtype=float))
+    height = float(H) if H is not None else None
+    pressure = np.zeros(depths.shape)
+    force = moment = 0.0
+    for load in loads:
+        kind, q, offset, width, q_end = load
+        F = M = 0.0
+        if kind == "line":
+            pressure += _line_pressure(q, offset, depths)
+            if height is not None:
+                F, M = _line_resultant(q, offset, height)
+        elif q == q_end:
+            p0, F0, M0 = _strip_antiderivatives(offset, depths, height or 0.0)
+            p1, F1, M1 = _strip_antiderivatives(offset + width, depths, height or 0.0)
+            pressure += q * (p1 - p0)
+            if height is not None:
+                F, M = q * (F1 - F0), q * (M1 - M0)
+        else:
+            p, F, M = _varying_strips(load, depths if depths.size else np.zeros(1), height)
+            pressure += p[:depths.size]
+        force += float(F)
+        moment += float(M)
+    if H is None:
+        return pressure
+    return pressure, force, moment
+
+def _diagram_depths(loads, H):
+    """Uniform depth points over [0, H] plus the pressure peaks (z = x / sqrt(3) for a line load at x)."""
+    peaks = [offset / math.sqrt(3) for _, _, offset, width, _ in loads] + \
+            [(offset + width) / math.sqrt(3) for _, _, offset, width, _ in loads if width > 0]
+    depths = np.concatenate([np.linspace(0.0, H, DIAGRAM_POINTS), [z for z in peaks if 0 < z < H]])
+    return np.unique(depths)
+
+@lru_cache(maxsize=MAX_CACHED_LOAD_CASES)
+def pressure_diagram(loads, H):
+    """Cached lateral pressure diagram of a load set (see normalize_loads) on a retained height H:
+    (depths, pressures, force, moment about the bottom of H). The arrays are read-only."""
+    depths = _diagram_depths(loads, H)
+    pressures, force, moment = surcharge_pressure(loads, depths, H)
+    depths.flags.writeable = False
+    pressures.flags.writeable = False
+    return depths, pressures, force, moment
+
+def surcharge_resultant(loads, H):
+    """Lateral force per unit length of wall, its moment about the bottom of the retained height
+    and the pressure there. The pressure and the force are the derivatives of the force and the
+    moment with respect to H."""
+    if not loads:
+        return 0.0, 0.0, 0.0
+    _, pressures, force, moment = pressure_diagram(loads, float(H))
+    return force, moment, float(pressures[-1])
+
+def _varying_strip_resultants(load, H):
+    """Force, moment and bottom pressure of a strip of linearly varying intensity for an array of
+    retained heights, integrating the line-load resultants over the width (one integral per height)."""
+    _, q, a, b, q_end = load
+
+    def integrand(owner, x):
+        intensity = q + (q_end - q) * (x - a) / b
+        height = H[owner]
+        force, moment = _line_resultant(intensity, x, height)
+        return np.stack([force, moment, _line_pressure(intensity, x, height)], axis=1)
+
+    integrals, _, _ = adaptive_simpson(integrand, np.full(len(H), a), np.full(len(H), a + b), QUADRATURE_TOLERANCE)
+    return integrals.T
+
+def surcharge_resultant_array(loads, H):
+    """surcharge_resultant for an array of retained heights, evaluated on the whole array: closed
+    forms for line loads and uniform strips, and one adaptive_simpson call over the distinct heights
+    for strips of varying intensity. The diagram cache is left to the scalar path."""
+    H = np.asarray(H, dtype=float)
+    force, moment, base_pressure = np.zeros(H.shape), np.zeros(H.shape), np.zeros(H.shape)
+    for load in loads:
+        kind, q, offset, width, q_end = load
+        if kind == "line":
+            F, M = _line_resultant(q, offset, H)
+            p = _line_pressure(q, offset, H)
+        elif q == q_end:
+            p0, F0, M0 = _strip_antiderivatives(offset, H, H)
+            p1, F1, M1 = _strip_antiderivatives(offset + width, H, H)
+            F, M, p = q * (F1 - F0), q * (M1 - M0), q * (p1 - p0)
+        else:
+            distinct, inverse = np.unique(H, return_inverse=True)
+            F, M, p = (value[inverse.ravel()].reshape(H.shape) for value in _varying_strip_resultants(load, distinct))
+        force += F
+        moment += M
+        base_pressure += p
+    return force, moment, base_pressure
+
+def clear_diagram_cache():
+    """Drops all cached pressure diagrams."""
+    pressure_diagram.cache_clear()
+
+def diagram_cache_stats():
+    """Hit/miss counters and size of the pressure diagram cache."""
+    info = pressure_diagram.cache_info()
+    lookups = info.hits + info.misses
+    return {"hits": info.hits, "misses": info.misses, "entries": info.currsize,
+            "hit_rate": info.hits / lookups if lookups else 0.0}
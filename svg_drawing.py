@@ -1,6 +1,14 @@
 import math
 
-def generate_svg_drawing(params, geometry, stability_results):
+def _pressure_polygon(diagram, x, y_surface, scale, direction):
+    """SVG points outlining a PressureDiagram drawn from a vertical line at x, with its top at
+    y_surface and pressures plotted in direction +1 (right) or -1 (left)."""
+    points = [(x, y_surface)]
+    points += [(x + direction * pressure * scale / 10, y_surface + depth * scale) for depth, pressure in diagram.polygon()]
+    points.append((x, y_surface + diagram.height * scale))
+    return " ".join(f"{px},{py}" for px, py in points)
+
+def generate_svg_drawing(params, geometry, stability_results=None, context=None):
     width = 800
     height = 600
     scale = 50 # pixels per meter
@@ -46,6 +54,29 @@ def generate_svg_drawing(params, geometry, stability_results):
     base_slab_svg_points = " ".join([f"{p[0]},{p[1]}" for p in base_slab_points])
     wall_stem_svg_points = " ".join([f"{p[0]},{p[1]}" for p in wall_stem_points])
 
+    # Earth pressure diagrams are only drawn when stability results are available; the shapes come
+    # from the pressure diagrams of the design's AnalysisContext when given, otherwise triangles to the base pressures
+    force_diagrams_svg = ""
+    if stability_results is not None:
+        if context is not None:
+            active, passive = context.pressure_diagrams["active"], context.pressure_diagrams["passive"]
+            active_points = _pressure_polygon(active, ox + geometry["B_base"] * scale, oy - geometry["H_total"] * scale, scale, 1)
+            passive_points = _pressure_polygon(passive, ox, oy - passive.height * scale, scale, -1)
+        else:
+            active_points = f'{ox + geometry["B_base"] * scale},{oy - geometry["D_f"] * scale} {ox + geometry["B_base"] * scale},{oy - geometry["H_total"] * scale} {ox + geometry["B_base"] * scale + stability_results["Pa_at_base"] * scale / 10},{oy - geometry["D_f"] * scale}'
+            passive_points = f'{ox},{oy - geometry["D_f"] * scale} {ox},{oy} {ox - stability_results["Pp_at_base"] * scale / 10},{oy - geometry["D_f"] * scale}'
+        force_diagrams_svg = f"""
+  <!-- Active Force Diagram -->
+  <line x1="{ox + geometry["B_base"] * scale}" y1="{oy - geometry["D_f"] * scale}" x2="{ox + geometry["B_base"] * scale}" y2="{oy - geometry["H_total"] * scale}" stroke="red" stroke-width="2" marker-end="url(#arrowhead)"/>
+  <polygon points="{active_points}" fill="red" fill-opacity="0.3"/>
+  <text x="{ox + geometry["B_base"] * scale + 20}" y="{oy - geometry["H_total"] * scale / 2}" font-size="12" fill="red">Pa: {stability_results["Pa_force"]:.1f}{force_unit}</text>
+
+  <!-- Passive Force Diagram -->
+  <line x1="{ox}" y1="{oy - geometry["D_f"] * scale}" x2="{ox}" y2="{oy}" stroke="blue" stroke-width="2" marker-end="url(#arrowhead)"/>
+  <polygon points="{passive_points}" fill="blue" fill-opacity="0.3"/>
+  <text x="{ox - 30}" y="{oy - geometry["D_f"] * scale / 2}" font-size="12" fill="blue">Pp: {stability_results["Pp_force"]:.1f}{force_unit}</text>
+"""
+
     svg_content = f"""
 <svg width="{width}" height="{height}" viewBox="0 0 {width} {height}" xmlns="http://www.w3.org/2000/svg">
   <rect x="0" y="0" width="{width}" height="{height}" fill="#f0f0f0"/>
@@ -81,17 +112,7 @@ def generate_svg_drawing(params, geometry, stability_results):
   <line x1="{ox + geometry["B_toe"] * scale + geometry["t_base"] * scale}" y1="{oy - geometry["D_f"] * scale}" x2="{ox + geometry["B_base"] * scale}" y2="{oy - geometry["D_f"] * scale}" stroke="green" stroke-width="1" stroke-dasharray="2,2"/>
   <text x="{ox + geometry["B_toe"] * scale + geometry["t_base"] * scale + geometry["B_heel"] * scale / 2}" y="{oy - geometry["D_f"] * scale - 10}" font-size="10" fill="green">Heel: {geometry["B_heel"]:.1f}{length_unit}</text>
 
-  <!-- Active Force Diagram -->
-  <line x1="{ox + geometry["B_base"] * scale}" y1="{oy - geometry["D_f"] * scale}" x2="{ox + geometry["B_base"] * scale}" y2="{oy - geometry["H_total"] * scale}" stroke="red" stroke-width="2" marker-end="url(#arrowhead)"/>
-  <polygon points="{ox + geometry["B_base"] * scale},{oy - geometry["D_f"] * scale} {ox + geometry["B_base"] * scale},{oy - geometry["H_total"] * scale} {ox + geometry["B_base"] * scale + stability_results["Pa_at_base"] * scale / 10},{oy - geometry["D_f"] * scale}" fill="red" fill-opacity="0.3"/>
-  <text x="{ox + geometry["B_base"] * scale + 20}" y="{oy - geometry["H_total"] * scale / 2}" font-size="12" fill="red">Pa: {stability_results["Pa_force"]:.1f}{force_unit}</text>
-
-  <!-- Passive Force Diagram -->
-  <line x1="{ox}" y1="{oy - geometry["D_f"] * scale}" x2="{ox}" y2="{oy}" stroke="blue" stroke-width="2" marker-end="url(#arrowhead)"/>
-  <polygon points="{ox},{oy - geometry["D_f"] * scale} {ox},{oy} {ox - stability_results["Pp_at_base"] * scale / 10},{oy - geometry["D_f"] * scale}" fill="blue" fill-opacity="0.3"/>
-  <text x="{ox - 30}" y="{oy - geometry["D_f"] * scale / 2}" font-size="12" fill="blue">Pp: {stability_results["Pp_force"]:.1f}{force_unit}</text>
-
-  <defs>
+{force_diagrams_svg}  <defs>
     <marker id="arrowhead" markerWidth="10" markerHeight="7" refX="0" refY="3.5" orient="auto">
       <polygon points="0 0, 10 3.5, 0 7" fill="#555" />
     </marker>
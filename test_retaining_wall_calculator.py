@@ -1,13 +1,48 @@
 import unittest
 import re
 import json
+import csv
+import io
+import itertools
+import math
+import os
+import tempfile
+from statistics import NormalDist
+import numpy as np
 from parameters import default_params, soil_properties, material_properties
 from unit_conversion import convert_units
 from geometry import calculate_geometry
-from earth_pressure import calculate_earth_pressure
-from stability_analysis import perform_stability_analysis
-from rebar_calculation import calculate_rebar_area, calculate_rebar_info
+from earth_pressure import (calculate_earth_pressure, calculate_earth_pressure_array, calculate_ka, calculate_kp, calculate_ka_array,
+                            calculate_kp_array, calculate_point_load_effect, point_load_factors, clear_coefficient_cache,
+                            coefficient_cache_stats, get_pressure_coefficient, pressure_coefficient_array, MAX_CACHED_COEFFICIENTS,
+                            SLOPED_BACKFILL_BETA_DEG)
+from stability_analysis import perform_stability_analysis, apply_shear_key
+from rebar_calculation import calculate_rebar_area, calculate_rebar_info, calculate_stem_moment_array
 from svg_drawing import generate_svg_drawing
+from pressure_diagram import PressureDiagram, homogeneous_resultant_array
+from analysis_context import AnalysisContext
+from stratigraphy import PressureProfile, normalize_layers, layered_resultant_array
+from surcharge_loads import normalize_loads, surcharge_pressure, surcharge_resultant, surcharge_resultant_array, pressure_diagram, diagram_cache_stats
+from batch_analysis import columns_from_params, analyze_batch
+from design_sweep import parse_sweep_values, iter_sweep_chunks
+from batch_runner import collect_input_files, run_batch, _output_names
+from ndjson_stream import run_stream
+from result_cache import ResultCache, result_cache_key
+from section_optimizer import optimize_section, section_quantities
+from stage_profiler import StageProfiler
+from retaining_wall_calculator import calculate_retaining_wall
+from benchmark_suite import BENCHMARKS, generate_corpus, run_benchmarks
+from benchmark_compare import compare_entry, compare_reports
+from scaling_benchmark import worker_counts, run_configuration
+from normal_distribution import norm_cdf, norm_ppf
+from reliability import ReliabilityModel, monte_carlo
+from rare_event_sampling import design_point, importance_sampling, subset_simulation
+from form_analysis import form, form_analysis
+from sensitivity_analysis import SensitivityModel, sobol_estimates, sobol_indices
+from qmc_sampler import SobolSampler, HaltonSampler
+from design_exploration import parse_explore_axis, run_exploration
+from feasibility_boundary import refine_boundary, safety_margins
+from dimension_solver import solve_minimum_dimension
 
 # Re-implement the main calculation function for testing purposes
 def calculate_retaining_wall_for_test(user_params=None):
@@ -33,11 +68,14 @@ def calculate_retaining_wall_for_test(user_params=None):
     # Calculate geometry
     geometry = calculate_geometry(params)
 
+    # Loads shared by the stages
+    context = AnalysisContext(params, geometry, active_soil, passive_soil)
+
     # Perform stability analysis
-    stability_results = perform_stability_analysis(params, geometry, active_soil, passive_soil, wall_material_props, slab_material_props)
+    stability_results = perform_stability_analysis(params, geometry, active_soil, passive_soil, wall_material_props, slab_material_props, context)
 
     # Rebar Calculation (ACI-318)
-    rebar_info = calculate_rebar_info(params, geometry, wall_material_props, active_soil, geometry["groundwater_level_below_base"])
+    rebar_info = calculate_rebar_info(params, geometry, wall_material_props, context)
 
     # Generate SVG Drawing
     svg_drawing = generate_svg_drawing(params, geometry)
@@ -228,5 +266,825 @@ class TestRetainingWallCalculator(unittest.TestCase):
         self.assertGreater(pa_with_gw, pa_no_gw)
 
 
+def scalar_stability_for_test(user_params):
+    params = default_params.copy()
+    params.update(user_params)
+    params, soil_props_conv, mat_props_conv = convert_units(params, soil_properties.copy(), material_properties.copy())
+    slab_material_props = (mat_props_conv[params["slab_material"]]
+                           if params["slab_material"] != "none"
+                           else {"unit_weight_kn_m3": 0.0, "unit_weight_pcf": 0.0})
+    geometry = calculate_geometry(params)
+    return perform_stability_analysis(params, geometry, soil_props_conv[params["active_soil_type"]],
+                                      soil_props_conv[params["passive_soil_type"]],
+                                      mat_props_conv[params["wall_material"]], slab_material_props)
+
+
+BATCH_DESIGNS = [
+    {},
+    {"wall_height_m": 7.0, "active_soil_type": "boulder_compacted_to_cbr_40_percent", "shear_key_used": True, "shear_key_position": "toe"},
+    {"wall_height_m": 6.0, "active_soil_type": "loose_backfill_soil", "passive_soil_type": "compacted_to_cbr_6_percent_soil", "groundwater_level_m_below_base": -2.0},
+    {"surcharge_load_kpa": 12.0, "active_side_ground_elevation_m": 6.5, "face_wall_position": "heel_side"},
+    {"shear_key_used": True, "shear_key_position": "heel", "slab_material": "none", "passive_side_ground_elevation_m": 0.8},
+    {"shear_key_used": True, "slab_material": "cement_treated_base", "wall_material": "stone_masonry", "foundation_lower_than_passive_side_m": 0.4},
+    {"toe_length_m": 0.2, "heel_length_m": 0.5, "wall_height_m": 8.0},
+]
+
+
+class TestBatchStability(unittest.TestCase):
+
+    def assert_batch_matches_scalar(self, designs):
+        batch = analyze_batch(columns_from_params(designs))
+        for i, design in enumerate(designs):
+            scalar = scalar_stability_for_test(design)
+            for key, value in scalar.items():
+                self.assertTrue(np.isclose(batch[key][i], value, rtol=1e-12, atol=1e-12),
+                                f"{key} mismatch for design {i}: {batch[key][i]} != {value}")
+
+    def test_metric_batch_matches_scalar(self):
+        self.assert_batch_matches_scalar(BATCH_DESIGNS)
+
+    def test_imperial_batch_matches_scalar(self):
+        self.assert_batch_matches_scalar([{**design, "units": "imperial"} for design in BATCH_DESIGNS])
+
+    def test_apply_shear_key_matches_full_rerun(self):
+        for design in ({"wall_height_m": 6.0, "active_soil_type": "loose_backfill_soil"},
+                       {"shear_key_position": "heel"}, {"slab_material": "none"}):
+            without_key = scalar_stability_for_test({**design, "shear_key_used": False})
+            rerun = scalar_stability_for_test({**design, "shear_key_used": True})
+            self.assertEqual(apply_shear_key(without_key), rerun)
+
+    def test_mixed_units_rejected(self):
+        with self.assertRaises(ValueError):
+            analyze_batch(columns_from_params([{}, {"units": "imperial"}]))
+
+
+class TestEarthPressureArrays(unittest.TestCase):
+
+    def test_coefficients_match_scalar(self):
+        phi = np.array([25.0, 30.0, 32.0, 38.0])
+        beta = np.array([0.0, 26.565, 0.0, 26.565])
+        np.testing.assert_allclose(calculate_ka_array(phi, beta), [calculate_ka(p, b) for p, b in zip(phi, beta)], rtol=1e-12)
+        np.testing.assert_allclose(calculate_kp_array(phi), [calculate_kp(p) for p in phi], rtol=1e-12)
+
+    def test_pressure_matches_scalar_across_groundwater_split(self):
+        soil = soil_properties["compacted_to_cbr_6_percent_soil"]
+        heights = np.array([0.5, 2.0, 4.0, 6.0])
+        gw_depths = np.array([1.0, 1.0, 5.0, 3.0])
+        for is_active in (True, False):
+            pressures = calculate_earth_pressure_array(soil["unit_weight_kn_m3"], soil["friction_angle_deg"], heights, gw_depths,
+                                                       is_active=is_active, surcharge_load=10.0)
+            expected = [calculate_earth_pressure(soil, h, gw, is_active=is_active, surcharge_load=10.0) for h, gw in zip(heights, gw_depths)]
+            np.testing.assert_allclose(pressures, expected, rtol=1e-12)
+
+    def test_coefficient_cache_is_shared_and_clearable(self):
+        clear_coefficient_cache()
+        soil = soil_properties["ordinary_soil"]
+        calculate_earth_pressure(soil, 3.0)
+        calculate_earth_pressure(soil, 5.0)
+        self.assertEqual(coefficient_cache_stats()["misses"], 1)
+        self.assertEqual(coefficient_cache_stats()["hits"], 1)
+        # The array path computes directly, without cache lookups
+        K = pressure_coefficient_array(np.full(10, soil["friction_angle_deg"]))
+        self.assertEqual(coefficient_cache_stats()["hits"], 1)
+        np.testing.assert_allclose(K, calculate_ka(soil["friction_angle_deg"]), rtol=1e-12)
+        np.testing.assert_array_equal(pressure_coefficient_array([20.0, 30.0], SLOPED_BACKFILL_BETA_DEG), calculate_ka_array([20.0, 30.0], SLOPED_BACKFILL_BETA_DEG))
+        clear_coefficient_cache()
+        self.assertEqual(coefficient_cache_stats()["entries"], 0)
+
+    def test_coefficient_cache_evicts_least_recently_used(self):
+        clear_coefficient_cache()
+        for i in range(MAX_CACHED_COEFFICIENTS):
+            get_pressure_coefficient(10.0 + i * 0.005)
+        get_pressure_coefficient(10.0)  # refresh the oldest key
+        get_pressure_coefficient(45.0)  # full: evicts 10.005, now the least recently used
+        self.assertEqual(coefficient_cache_stats()["entries"], MAX_CACHED_COEFFICIENTS)
+        get_pressure_coefficient(45.0)
+        get_pressure_coefficient(10.0)
+        self.assertEqual(coefficient_cache_stats()["hits"], 3)
+        get_pressure_coefficient(10.005)
+        self.assertEqual(coefficient_cache_stats()["misses"], MAX_CACHED_COEFFICIENTS + 2)
+        clear_coefficient_cache()
+
+
+class TestDesignSweep(unittest.TestCase):
+
+    def test_parse_range_is_inclusive(self):
+        values = parse_sweep_values("wall_base_width_m", "0.4:1.2:0.05")
+        self.assertEqual(len(values), 17)
+        self.assertEqual(values[-1], 1.2)
+        self.assertEqual(len(parse_sweep_values("active_soil_type", "all")), len(soil_properties))
+
+    def test_chunks_cover_cartesian_product_in_order(self):
+        axes = {
+            "heel_length_m": parse_sweep_values("heel_length_m", "1.5,2.5,3.5"),
+            "active_soil_type": parse_sweep_values("active_soil_type", "all"),
+            "shear_key_used": parse_sweep_values("shear_key_used", "true,false"),
+        }
+        rows = []
+        for chunk in iter_sweep_chunks(axes, chunk_size=5):
+            self.assertLessEqual(len(chunk["heel_length_m"]), 5)
+            rows.extend(zip(*(chunk[key].tolist() for key in axes)))
+        self.assertEqual(rows, list(itertools.product(*(axes[key].tolist() for key in axes))))
+
+    def test_auto_shear_key_matches_scalar_rerun(self):
+        design = {"wall_height_m": 6.0, "active_soil_type": "loose_backfill_soil"}
+        results = analyze_batch(columns_from_params([design]), auto_shear_key=True)
+        self.assertTrue(results["shear_key_used"][0])
+        expected = scalar_stability_for_test({**design, "shear_key_used": True})
+        self.assertAlmostEqual(results["FS_sliding"][0], expected["FS_sliding"], places=12)
+
+
+class TestSectionOptimizer(unittest.TestCase):
+
+    def test_optimum_is_feasible_and_cheaper_than_default(self):
+        search_space = {"toe_length_m": (0.5, 2.0, 0.1), "heel_length_m": (1.0, 4.0, 0.1), "wall_base_width_m": (0.4, 0.8, 0.05),
+                        "shear_key_depth_m": (0.0, 1.0, 0.1)}
+        best = optimize_section({"wall_height_m": 5.0}, search_space)
+        scalar = scalar_stability_for_test({"wall_height_m": 5.0, **best["params"]})
+        self.assertGreaterEqual(scalar["FS_overturning"], 1.5)
+        self.assertGreaterEqual(scalar["FS_sliding"], 1.5)
+        self.assertGreaterEqual(scalar["FS_bearing"], 2.0)
+        default_volume, _, _ = section_quantities({"wall_height_m": 5.0})
+        self.assertLessEqual(best["concrete_volume_m3"], float(default_volume) + 1e-9)
+
+
+class TestBatchRunner(unittest.TestCase):
+
+    def test_batch_writes_named_outputs_per_design(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for sub in ("a", "b"):
+                os.makedirs(os.path.join(tmp, sub))
+                with open(os.path.join(tmp, sub, "wall.json"), "w") as f:
+                    json.dump({"wall_height_m": 4.0 if sub == "a" else 6.0}, f)
+            paths = collect_input_files([os.path.join(tmp, "*", "*.json")])
+            self.assertEqual(len(paths), 2)
+            out_dir = os.path.join(tmp, "out")
+            records = run_batch(paths, out_dir, workers=2)
+            self.assertEqual([r["status"] for r in records], ["ok", "ok"])
+            for name in ("wall", "wall_2"):
+                self.assertTrue(os.path.exists(os.path.join(out_dir, f"{name}_report.md")))
+                self.assertTrue(os.path.exists(os.path.join(out_dir, f"{name}_drawing.svg")))
+            self.assertTrue(os.path.exists(os.path.join(out_dir, "batch_summary.csv")))
+
+    def test_suffixed_names_do_not_collide(self):
+        self.assertEqual(_output_names(["a/wall.json", "b/wall.json", "c/wall_2.json"]), ["wall", "wall_2", "wall_2_2"])
+        self.assertEqual(_output_names(["a/wall_2.json", "b/wall.json", "c/wall.json"]), ["wall_2", "wall", "wall_3"])
+
+
+class TestNdjsonStream(unittest.TestCase):
+
+    def test_one_compact_result_per_line(self):
+        lines = ['{"id": "w1", "wall_height_m": 4.0}', '', '{"params": {"wall_height_m": 7.0}}', 'not json']
+        output = io.StringIO()
+        run_stream(io.StringIO("\n".join(lines) + "\n"), output)
+        results = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual([r["id"] for r in results], ["w1", 3, 4])
+        self.assertIn("FS_sliding", results[0]["stability"])
+        self.assertTrue(results[1]["shear_key_used"])
+        self.assertIn("error", results[2])
+        self.assertNotIn("Retaining Wall Calculator", output.getvalue())
+
+
+class TestResultCache(unittest.TestCase):
+
+    def test_key_is_canonical_and_versioned(self):
+        self.assertEqual(result_cache_key({"wall_height_m": 5}), result_cache_key({"wall_height_m": 5.0}))
+        self.assertEqual(result_cache_key({}), result_cache_key({"wall_height_m": default_params["wall_height_m"]}))
+        self.assertNotEqual(result_cache_key({}), result_cache_key({"wall_height_m": 6.0}))
+        self.assertNotEqual(result_cache_key({}, version="0.0.1"), result_cache_key({}))
+
+    def test_hits_return_identical_results_and_lru_evicts(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ResultCache(os.path.join(tmp, "cache.db"))
+            first, hit = cache.get_or_calculate({"wall_height_m": 6.0})
+            self.assertFalse(hit)
+            second, hit = cache.get_or_calculate({"wall_height_m": 6.0})
+            self.assertTrue(hit)
+            self.assertEqual(first["stability"], second["stability"])
+            self.assertEqual(cache.stats()["hits"], 1)
+
+            cache.max_bytes = int(cache.stats()["bytes"] * 1.5)
+            cache.get_or_calculate({"wall_height_m": 4.0})
+            self.assertEqual(cache.stats()["entries"], 1)
+            self.assertEqual(cache.stats()["evictions"], 1)
+            self.assertIsNone(cache.get(result_cache_key({"wall_height_m": 6.0})))
+            cache.close()
+
+    def test_running_size_total(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache.db")
+            cache = ResultCache(path, max_bytes=600)
+            for i in range(200):
+                # Replacing an entry counts only its new size
+                cache.put(f"key{i % 50}", {"value": "x" * (i % 7) * 40, "i": i})
+                self.assertEqual(cache._stored_bytes(), cache.stats()["bytes"])
+                self.assertLessEqual(cache._stored_bytes(), 600)
+            self.assertGreater(cache.stats()["evictions"], 0)
+            cache.close()
+            reopened = ResultCache(path, max_bytes=600)
+            self.assertEqual(reopened._stored_bytes(), reopened.stats()["bytes"])
+            reopened.clear()
+            self.assertEqual(reopened._stored_bytes(), 0)
+            reopened.close()
+
+    def test_size_bound_holds_across_connections(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache.db")
+            caches = [ResultCache(path, max_bytes=2000) for _ in range(2)]
+            for i in range(300):
+                caches[i % 2].put(f"key{i}", {"i": i, "value": str(i) * 30})
+                self.assertLessEqual(caches[0].stats()["bytes"], 2000)
+            self.assertEqual(caches[1]._stored_bytes(), caches[0].stats()["bytes"])
+            for cache in caches:
+                cache.close()
+
+
+class TestStageProfiler(unittest.TestCase):
+
+    def test_records_stages_only_while_active(self):
+        with StageProfiler(track_allocations=True) as profiler:
+            calculate_retaining_wall({}, verbose=False)
+        stages = profiler.report()["stages"]
+        for name in ("convert_units", "calculate_geometry", "perform_stability_analysis",
+                     "calculate_rebar_info", "generate_svg_drawing", "report"):
+            self.assertEqual(stages[name]["calls"], 1)
+            self.assertGreaterEqual(stages[name]["wall_s"], 0.0)
+        self.assertGreater(stages["generate_svg_drawing"]["peak_allocated_bytes"], 0)
+        self.assertAlmostEqual(sum(entry["wall_share"] for entry in stages.values()), 1.0)
+
+        calculate_retaining_wall({}, verbose=False)
+        self.assertEqual(profiler.stages["report"]["calls"], 1)
+
+    def test_batch_merges_worker_stages(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for i, height in enumerate((4.0, 5.0, 6.0)):
+                path = os.path.join(tmp, f"wall{i}.json")
+                with open(path, "w") as f:
+                    json.dump({"wall_height_m": height}, f)
+                paths.append(path)
+            profiler = StageProfiler()
+            records = run_batch(paths, os.path.join(tmp, "out"), workers=1, profiler=profiler)
+        self.assertTrue(all("stage_profile" not in record for record in records))
+        self.assertEqual(profiler.stages["calculate_geometry"]["calls"], 3)
+        self.assertEqual(profiler.stages["file_io"]["calls"], 6)
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+
+    def test_corpus_is_seeded_and_mixes_units(self):
+        corpus = generate_corpus(20, seed=7)
+        self.assertEqual(corpus, generate_corpus(20, seed=7))
+        self.assertNotEqual(corpus, generate_corpus(20, seed=8))
+        self.assertEqual({params["units"] for params in corpus}, {"metric", "imperial"})
+
+    def test_report_has_percentiles_for_every_stage(self):
+        report = run_benchmarks(corpus_size=4, repeats=1, min_sample_s=0.0)
+        self.assertEqual(list(report["benchmarks"]), list(BENCHMARKS))
+        self.assertEqual(report["metadata"]["corpus_size"], 4)
+        for entry in report["benchmarks"].values():
+            self.assertEqual(entry["samples"], 4)
+            self.assertEqual(len(entry["repeat_medians_us"]), 1)
+            self.assertLessEqual(entry["p50_us"], entry["p90_us"])
+            self.assertLessEqual(entry["p90_us"], entry["p99_us"])
+            self.assertGreater(entry["designs_per_s"], 0)
+        json.dumps(report)
+        with self.assertRaises(ValueError):
+            run_benchmarks(["no_such_stage"], corpus_size=1)
+
+
+class TestBenchmarkCompare(unittest.TestCase):
+
+    def test_slowdown_must_exceed_threshold_and_noise(self):
+        baseline = {"p50_us": 10.0, "repeat_medians_us": [10.0, 10.1, 9.9, 10.0, 10.2]}
+        self.assertEqual(compare_entry(baseline, {"p50_us": 12.0, "repeat_medians_us": [12.0, 12.1, 11.9]})["status"], "regression")
+        self.assertEqual(compare_entry(baseline, {"p50_us": 10.5, "repeat_medians_us": [10.5, 10.4, 10.6]})["status"], "unchanged")
+        self.assertEqual(compare_entry(baseline, {"p50_us": 8.0, "repeat_medians_us": [8.0, 8.1, 7.9]})["status"], "improvement")
+        noisy = {"p50_us": 12.0, "repeat_medians_us": [9.0, 12.0, 15.0, 12.0, 8.0]}
+        self.assertEqual(compare_entry(baseline, noisy)["status"], "unchanged")
+
+    def test_per_stage_thresholds(self):
+        baseline = {"benchmarks": {"perform_stability_analysis": {"p50_us": 10.0}, "calculate_ka": {"p50_us": 1.0}}}
+        current = {"benchmarks": {"perform_stability_analysis": {"p50_us": 10.6}, "calculate_ka": {"p50_us": 1.06}}}
+        comparison = compare_reports(baseline, current, stage_thresholds={"perform_stability_analysis": 0.05})
+        self.assertEqual(comparison["perform_stability_analysis"]["status"], "regression")
+        self.assertEqual(comparison["calculate_ka"]["status"], "unchanged")
+
+
+class TestScalingBenchmark(unittest.TestCase):
+
+    def test_worker_counts_double_up_to_max(self):
+        self.assertEqual(worker_counts(1), [1])
+        self.assertEqual(worker_counts(4), [1, 2, 4])
+        self.assertEqual(worker_counts(6), [1, 2, 4, 6])
+
+    def test_configurations_report_throughput_and_rss(self):
+        for mode, workers in (("serial", 1), ("thread", 2), ("vectorized", 1)):
+            run = run_configuration(mode, workers, 10, seed=3)
+            self.assertEqual(run["designs"], 10)
+            self.assertGreater(run["designs_per_s"], 0)
+            self.assertGreater(run["peak_rss_mb"], 0)
+        with self.assertRaises(ValueError):
+            run_configuration("gpu", 1, 1, seed=3)
+
+
+class TestReliability(unittest.TestCase):
+
+    SPEC = {
+        "design": {"wall_height_m": 5.0, "surcharge_load_kpa": 10.0},
+        "variables": {
+            "active_friction_angle_deg": {"distribution": "lognormal", "cov": 0.1},
+            "active_unit_weight_kn_m3": {"cov": 0.05},
+            "passive_friction_angle_deg": {"distribution": "truncated_normal", "std": 3.0, "lower": 20.0, "upper": 40.0},
+        },
+        "correlations": [["active_friction_angle_deg", "active_unit_weight_kn_m3", 0.5]],
+    }
+
+    def test_normal_distribution_helpers(self):
+        x = np.linspace(-8, 8, 161)
+        expected = [0.5 * math.erfc(-value / math.sqrt(2)) for value in x]
+        np.testing.assert_allclose(norm_cdf(x), expected, rtol=1e-8, atol=1e-15)
+        p = np.array([1e-12, 1e-6, 0.01, 0.3, 0.5, 0.9, 1 - 1e-9])
+        np.testing.assert_allclose(norm_ppf(p), [NormalDist().inv_cdf(value) for value in p], atol=1e-8)
+
+    def test_marginals_and_correlation(self):
+        model = ReliabilityModel.from_spec(self.SPEC)
+        u = np.random.default_rng(1).standard_normal((200000, model.dimension))
+        values = model.to_physical(u)
+        phi = values["active_friction_angle_deg"]
+        self.assertAlmostEqual(phi.mean(), 30.0, delta=0.05)
+        self.assertAlmostEqual(phi.std() / phi.mean(), 0.1, delta=0.002)
+        self.assertAlmostEqual(np.corrcoef(phi, values["active_unit_weight_kn_m3"])[0, 1], 0.5, delta=0.02)
+        passive = values["passive_friction_angle_deg"]
+        self.assertGreaterEqual(passive.min(), 20.0)
+        self.assertLessEqual(passive.max(), 40.0)
+
+    def test_monte_carlo_is_seeded_and_matches_nominal_design(self):
+        model = ReliabilityModel.from_spec(self.SPEC)
+        first = monte_carlo(model, 20000, seed=5)
+        self.assertEqual(first, monte_carlo(model, 20000, seed=5))
+        self.assertNotEqual(first["modes"]["sliding"]["failures"], monte_carlo(model, 20000, seed=6)["modes"]["sliding"]["failures"])
+        self.assertGreaterEqual(first["modes"]["system"]["pf"], first["modes"]["sliding"]["pf"])
+
+        # A nearly deterministic soil reproduces the nominal outcome of calculate_retaining_wall
+        nominal = calculate_retaining_wall(self.SPEC["design"], verbose=False)["stability"]
+        tight = ReliabilityModel(self.SPEC["design"], {"active_unit_weight_kn_m3": {"std": 1e-9}})
+        pf = monte_carlo(tight, 1000, seed=0)["modes"]["bearing"]["pf"]
+        self.assertEqual(pf, 1.0 if nominal["FS_bearing"] < 1 else 0.0)
+
+    def test_invalid_specs(self):
+        with self.assertRaises(ValueError):
+            ReliabilityModel(None, {"active_cohesion_kpa": {"std": 1.0}})
+        with self.assertRaises(ValueError):
+            ReliabilityModel(None, {"active_friction_angle_deg": {"distribution": "weibull", "std": 1.0}})
+        with self.assertRaises(ValueError):
+            ReliabilityModel(None, {"active_friction_angle_deg": {"std": 1.0}, "active_unit_weight_kn_m3": {"std": 1.0}},
+                             [["active_friction_angle_deg", "active_unit_weight_kn_m3", 1.0]])
+
+    def test_stratigraphy_limits(self):
+        design = {"stratigraphy": TestStratigraphy.LAYERS, "wall_height_m": 5.0}
+        with self.assertRaisesRegex(ValueError, "stratigraphy"):
+            ReliabilityModel(design, {"active_friction_angle_deg": {"cov": 0.1}})
+        model = ReliabilityModel(design, {"groundwater_level_m_below_base": {"std": 0.5}, "surcharge_load_kpa": {"std": 3.0}})
+        self.assertEqual(monte_carlo(model, 2000, seed=0)["samples"], 2000)
+        with self.assertRaisesRegex(ValueError, "Monte Carlo"):
+            form(model, "sliding")
+        with self.assertRaisesRegex(ValueError, "Monte Carlo"):
+            importance_sampling(model, "sliding")
+
+class TestRareEventSampling(unittest.TestCase):
+
+    def setUp(self):
+        self.model = ReliabilityModel.from_spec(TestReliability.SPEC)
+
+    def test_design_point_lies_on_the_limit_state(self):
+        point = design_point(self.model, "sliding")
+        self.assertTrue(point["converged"])
+        self.assertAlmostEqual(self.model.limit_states(point["u"][None])["sliding"][0], 0.0, places=6)
+        self.assertGreater(point["beta"], 2.0)
+
+    def test_estimators_agree_with_monte_carlo_using_fewer_evaluations(self):
+        reference = monte_carlo(self.model, 400000, seed=1)["modes"]["sliding"]["pf"]
+        sampled = importance_sampling(self.model, "sliding", target_cov=0.05, seed=1)
+        self.assertLessEqual(sampled["cov"], 0.05)
+        self.assertLess(sampled["evaluations"], 50000)
+        self.assertAlmostEqual(sampled["pf"] / reference, 1.0, delta=0.25)
+        subset = subset_simulation(self.model, "sliding", target_cov=0.1, seed=1)
+        self.assertLessEqual(subset["cov"], 0.1)
+        self.assertLess(subset["evaluations"], 100000)
+        self.assertAlmostEqual(subset["pf"] / reference, 1.0, delta=0.3)
+        self.assertEqual(subset, subset_simulation(self.model, "sliding", target_cov=0.1, seed=1))
+
+
+class TestFormAnalysis(unittest.TestCase):
+
+    def setUp(self):
+        spec = dict(TestReliability.SPEC)
+        spec["variables"] = {**spec["variables"], "groundwater_level_m_below_base": {"std": 0.5},
+                             "heel_length_m": {"cov": 0.05}, "surcharge_load_kpa": {"distribution": "lognormal", "cov": 0.3}}
+        self.model = ReliabilityModel.from_spec(spec)
+
+    def test_forward_mode_matches_limit_states_and_finite_differences(self):
+        u = np.random.default_rng(2).standard_normal((40, self.model.dimension))
+        values = self.model.limit_states(u)
+        duals = self.model.limit_states_with_gradients(u)
+        step = 1e-6
+        for mode, g in values.items():
+            np.testing.assert_allclose(duals[mode].value, g, rtol=1e-12)
+            finite_differences = np.stack([(self.model.limit_states(u + step * e)[mode] - self.model.limit_states(u - step * e)[mode]) / (2 * step)
+                                           for e in np.eye(self.model.dimension)], axis=1)
+            np.testing.assert_allclose(duals[mode].grad, finite_differences, rtol=1e-5, atol=1e-6)
+
+    def test_form_converges_quickly_and_agrees_with_importance_sampling(self):
+        result = form(self.model, "sliding")
+        self.assertTrue(result["converged"])
+        self.assertLessEqual(result["iterations"], 15)
+        self.assertAlmostEqual(sum(value**2 for value in result["alpha"].values()), 1.0)
+        self.assertAlmostEqual(self.model.limit_states(np.array([result["design_point_u"]]))["sliding"][0], 0.0, places=6)
+        sampled = importance_sampling(self.model, "sliding", target_cov=0.05, seed=0)
+        self.assertAlmostEqual(result["beta"], sampled["beta"], delta=0.15)
+
+        analysis = form_analysis(self.model)
+        system = analysis["modes"]["system"]
+        self.assertLessEqual(system["pf_lower"], system["pf_upper"])
+        self.assertEqual(system["pf_lower"], max(analysis["modes"][mode]["pf"] for mode in ("overturning", "sliding", "bearing")))
+
+class TestSensitivityAnalysis(unittest.TestCase):
+    def test_estimators_recover_analytic_indices(self):
+        # Y = 2 X1 + X2 with independent uniforms: S1 = ST = (4/5, 1/5), and nothing for X3
+        rng = np.random.default_rng(0)
+        a, b = rng.random((2, 100_000, 3))
+        weights = np.array([2.0, 1.0, 0.0])
+        ab = np.stack([np.where(np.arange(3) == i, b, a) for i in range(3)])
+        first, total = sobol_estimates(a @ weights, b @ weights, ab @ weights)
+        np.testing.assert_allclose(first, [0.8, 0.2, 0.0], atol=0.02)
+        np.testing.assert_allclose(total, [0.8, 0.2, 0.0], atol=0.02)
+
+    def test_wall_indices(self):
+        model = SensitivityModel(inputs={"heel_length_m": [2.0, 3.0], "active_friction_angle_deg": [27, 33],
+                                         "shear_key_width_m": None, "surcharge_load_kpa": [0, 20]})
+        result = sobol_indices(model, samples=4096, seed=1, bootstrap=20)
+        self.assertEqual(result["evaluations"], 4096 * 6)
+        for key, entry in result["outputs"].items():
+            indices = entry["indices"]
+            # The key width does not enter the stability equations
+            self.assertEqual(indices["shear_key_width_m"]["ST"], 0.0)
+            self.assertTrue(all(index["ST"] >= 0 and math.isfinite(index["ST_conf"]) for index in indices.values()))
+        sliding = result["outputs"]["FS_sliding"]["indices"]
+        self.assertGreater(sliding["active_friction_angle_deg"]["ST"], sliding["heel_length_m"]["ST"])
+        with self.assertRaises(ValueError):
+            SensitivityModel(inputs={"surcharge_load_kpa": None})
+        with self.assertRaises(ValueError):
+            SensitivityModel(inputs={"active_cohesion_kpa": [0, 5]})
+
+class TestQmcSampler(unittest.TestCase):
+    def test_unscrambled_sobol_matches_reference_points(self):
+        points = SobolSampler(3, scramble=False).random(4)
+        np.testing.assert_array_equal(points, [[0, 0, 0], [0.5, 0.5, 0.5], [0.75, 0.25, 0.25], [0.25, 0.75, 0.75]])
+
+    def test_scrambled_sobol_is_stratified_and_resumable(self):
+        points = SobolSampler(12, seed=4).random(1024)
+        for column in points.T:
+            self.assertEqual(len(np.unique(np.floor(column * 1024))), 1024)
+        resumed = SobolSampler(12, seed=4, start_index=700)
+        np.testing.assert_array_equal(resumed.random(324), points[700:])
+        self.assertEqual(resumed.index, 1024)
+
+    def test_halton_radical_inverse_with_skip_and_leap(self):
+        np.testing.assert_allclose(HaltonSampler(2, scramble=False).random(4), [[0, 0], [1 / 2, 1 / 3], [1 / 4, 2 / 3], [3 / 4, 1 / 9]])
+        np.testing.assert_allclose(HaltonSampler(1, scramble=False, skip=1, leap=2).random(3)[:, 0], [1 / 2, 3 / 4, 5 / 8])
+        points = HaltonSampler(4, seed=2, skip=5, leap=7).random(300)
+        np.testing.assert_array_equal(HaltonSampler(4, seed=2, skip=5, leap=7, start_index=120).random(180), points[120:])
+        self.assertTrue(np.all((points >= 0) & (points < 1)))
+
+    def test_exploration_stops_early_and_resumes(self):
+        axes = {"heel_length_m": parse_explore_axis("heel_length_m", "1.5:4"),
+                "wall_height_m": parse_explore_axis("wall_height_m", "3:6"),
+                "active_soil_type": parse_explore_axis("active_soil_type", "all")}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "explore.csv")
+            summary = run_exploration(axes, {}, path, SobolSampler(3, seed=0), samples=2**16, chunk_size=1024, tolerance=0.01)
+            self.assertTrue(summary["converged"])
+            self.assertLess(summary["designs"], 2**16)
+            resumed = run_exploration(axes, {}, path, SobolSampler(3, seed=0, start_index=summary["next_index"]),
+                                      samples=10, chunk_size=1024, append=True)
+            with open(path) as f:
+                indices = [int(row["sample_index"]) for row in csv.DictReader(f)]
+        self.assertEqual(indices, list(range(summary["designs"] + resumed["designs"])))
+        self.assertGreaterEqual(summary["pass_rates"]["FS_sliding"], summary["pass_rates"]["all"])
+
+class TestFeasibilityBoundary(unittest.TestCase):
+    def test_refinement_resolves_boundary_with_few_evaluations(self):
+        axes = {"heel_length_m": (0.5, 6.0), "wall_height_m": (2.0, 8.0)}
+        result = refine_boundary(axes, initial_divisions=4, tolerance=0.02)
+        self.assertLess(result["evaluations"], 0.1 * result["uniform_grid_evaluations"])
+        self.assertTrue(all(size <= 0.02 for size in result["cell_size"]))
+        self.assertGreater(len(result["boundary_points"]), 0)
+
+        # Within one cell of every boundary point there are feasible and infeasible designs
+        boundary = result["boundary_points"]
+        signs = []
+        for offset in itertools.product((-0.02, 0.0, 0.02), repeat=2):
+            shifted = boundary + np.array(offset)
+            margins = safety_margins(analyze_batch(dict(zip(axes, shifted.T)), auto_shear_key=True))
+            signs.append(margins.min(axis=1) >= 0)
+        signs = np.array(signs)
+        self.assertTrue(np.all(signs.any(axis=0) & ~signs.all(axis=0)))
+
+        # The classification agrees with a direct evaluation
+        points = result["points"]
+        direct = safety_margins(analyze_batch(dict(zip(axes, points.T)), auto_shear_key=True))
+        np.testing.assert_array_equal(result["points_feasible"], np.all(direct >= 0, axis=1))
+
+class TestDimensionSolver(unittest.TestCase):
+    def test_minimum_heel_length_for_sliding_target(self):
+        heights = np.arange(3.0, 7.01, 0.5)
+        designs = {"wall_height_m": heights, "active_side_ground_elevation_m": heights}
+        result = solve_minimum_dimension(designs, "heel_length_m", {"FS_sliding": 1.5}, tolerance=1e-6, auto_shear_key=False)
+        self.assertTrue(np.all(result["converged"]))
+        self.assertLess(result["iterations"].max(), 30)
+        # Short walls already pass at the lower bound of the bracket; above it the heel grows with the height
+        self.assertTrue(np.all(np.diff(result["value"]) >= 0))
+        self.assertTrue(np.all(np.diff(result["value"][result["value"] > 0.5]) > 0))
+        for height, heel in zip(heights, result["value"]):
+            if heel > 0.5:
+                self.assertGreaterEqual(scalar_stability_for_test({"wall_height_m": height, "active_side_ground_elevation_m": height,
+                                                                   "heel_length_m": heel})["FS_sliding"], 1.5)
+                self.assertLess(scalar_stability_for_test({"wall_height_m": height, "active_side_ground_elevation_m": height,
+                                                           "heel_length_m": heel - 1e-5})["FS_sliding"], 1.5)
+
+    def test_infeasible_designs_and_shear_key_depth(self):
+        result = solve_minimum_dimension({"wall_height_m": np.array([4.0, 20.0])}, "shear_key_depth_m", {"FS_sliding": 1.5})
+        self.assertTrue(result["feasible"][0])
+        self.assertFalse(result["feasible"][1])
+        self.assertTrue(np.isnan(result["value"][1]))
+        with self.assertRaises(ValueError):
+            solve_minimum_dimension({}, "wall_height_m")
+
+
+class TestPointLoad(unittest.TestCase):
+    def test_force_factor_matches_closed_form(self):
+        m = np.array([0.05, 0.3, 1.0, 2.5])
+        F, G, dF, dG = point_load_factors(m, poisson_ratio=0.5)
+        np.testing.assert_allclose(F, (1 / m - m**2 / (1 + m**2) ** 1.5) / np.pi, rtol=1e-6)
+        h = 1e-6
+        F_plus, G_plus, _, _ = point_load_factors(m + h, poisson_ratio=0.5)
+        F_minus, G_minus, _, _ = point_load_factors(m - h, poisson_ratio=0.5)
+        np.testing.assert_allclose(dF, (F_plus - F_minus) / (2 * h), rtol=1e-4)
+        np.testing.assert_allclose(dG, (G_plus - G_minus) / (2 * h), rtol=1e-4)
+
+    def test_effect_and_validation(self):
+        effect = calculate_point_load_effect(50.0, 1.5, 4.0)
+        self.assertGreater(effect["force"], 0)
+        self.assertTrue(0 < effect["line_of_action"] < 4.0)
+        self.assertAlmostEqual(effect["moment"], effect["force"] * effect["line_of_action"])
+        self.assertEqual(calculate_point_load_effect(0.0, 1.5, 4.0)["force"], 0.0)
+        with self.assertRaises(ValueError):
+            calculate_point_load_effect(50.0, 0.0, 4.0)
+
+    def test_batch_matches_scalar_and_lowers_factors_of_safety(self):
+        loaded = {"point_load_kn": 80.0, "point_load_distance_from_wall_m": 1.2}
+        scalar = scalar_stability_for_test(loaded)
+        unloaded = scalar_stability_for_test({})
+        batch = analyze_batch({**default_params, **loaded})
+        for key in ("point_load_force", "y_point_load", "FS_overturning", "FS_sliding", "FS_bearing"):
+            self.assertAlmostEqual(float(batch[key]), scalar[key], places=6)
+        self.assertLess(scalar["FS_overturning"], unloaded["FS_overturning"])
+        self.assertLess(scalar["FS_sliding"], unloaded["FS_sliding"])
+
+        imperial = scalar_stability_for_test({**loaded, "units": "imperial"})
+        batch_imperial = analyze_batch({**default_params, **loaded, "units": "imperial"})
+        self.assertAlmostEqual(float(batch_imperial["FS_sliding"]), imperial["FS_sliding"], places=6)
+
+    def test_rebar_moment_includes_point_load(self):
+        _, steel, _ = section_quantities({})
+        _, loaded_steel, _ = section_quantities({"point_load_kn": 80.0})
+        self.assertGreater(float(loaded_steel), float(steel))
+
+
+class TestSurchargeLoads(unittest.TestCase):
+    LOADS = [{"type": "line", "load_kn_m": 20.0, "offset_m": 1.5},
+             {"type": "strip", "load_kpa": 10.0, "offset_m": 0.5, "width_m": 3.0}]
+
+    def test_resultants_match_integrated_pressure(self):
+        H = 6.0
+        depths = np.linspace(0.0, H, 4001)
+        for loads in (self.LOADS, [{"type": "strip", "load_kpa": 10.0, "load_end_kpa": 30.0, "offset_m": 0.5, "width_m": 3.0}]):
+            pressure, force, moment = surcharge_pressure(normalize_loads(loads), depths, H)
+            self.assertAlmostEqual(force, np.trapezoid(pressure, depths), places=4)
+            self.assertAlmostEqual(moment, np.trapezoid(pressure * (H - depths), depths), places=3)
+        # The numerical path agrees with the closed form of a uniform strip
+        uniform = normalize_loads(self.LOADS[1:])
+        nearly_uniform = normalize_loads([{**self.LOADS[1], "load_end_kpa": 10.0 + 1e-9}])
+        np.testing.assert_allclose(surcharge_pressure(nearly_uniform, depths[::20], H)[0],
+                                   surcharge_pressure(uniform, depths[::20], H)[0], rtol=1e-7, atol=1e-12)
+        with self.assertRaises(ValueError):
+            normalize_loads([{"type": "area", "load_kpa": 1.0, "offset_m": 1.0}])
+
+    def test_pressures_alone_skip_the_resultants(self):
+        with self.assertRaises(ValueError):
+            normalize_loads([{"type": "line", "load_kn_m": 20.0, "offset_m": 0.0}])
+        # Strips may start at the wall face; without H only the pressures are computed
+        for spec in ({"type": "strip", "load_kpa": 10.0, "offset_m": 0.0, "width_m": 2.0},
+                     {"type": "strip", "load_kpa": 10.0, "load_end_kpa": 30.0, "offset_m": 0.0, "width_m": 2.0}):
+            loads = normalize_loads([spec])
+            depths = np.array([0.0, 1.0, 3.0])
+            pressure = surcharge_pressure(loads, depths)
+            self.assertTrue(np.all(np.isfinite(pressure)))
+            np.testing.assert_array_equal(pressure, surcharge_pressure(loads, depths, 4.0)[0])
+
+    def test_diagrams_cached_per_height(self):
+        loads = normalize_loads(self.LOADS)
+        pressure_diagram.cache_clear()
+        for H in (4.0, 5.0, 4.0):
+            surcharge_resultant(loads, H)
+        self.assertEqual(diagram_cache_stats()["misses"], 2)
+        self.assertEqual(diagram_cache_stats()["hits"], 1)
+        # The array path uses the closed forms without the cache
+        surcharge_resultant_array(loads, np.array([4.0, 5.0, 6.0]))
+        self.assertEqual(diagram_cache_stats()["entries"], 2)
+
+    def test_resultant_array_matches_the_diagrams(self):
+        varying = [{"type": "strip", "load_kpa": 10.0, "load_end_kpa": 30.0, "offset_m": 0.5, "width_m": 3.0}]
+        heights = np.array([[0.5, 2.0, 4.0], [5.0, 6.5, 2.0]])
+        for loads in (self.LOADS, varying, self.LOADS + varying):
+            loads = normalize_loads(loads)
+            resultants = surcharge_resultant_array(loads, heights)
+            for expected, value in zip(np.vectorize(lambda H: surcharge_resultant(loads, H))(heights), resultants):
+                self.assertEqual(value.shape, heights.shape)
+                np.testing.assert_allclose(value, expected, rtol=1e-7)
+
+    def test_stability_with_surcharge_loads(self):
+        for units in ("metric", "imperial"):
+            loaded = {"surcharge_loads": self.LOADS, "units": units}
+            scalar = scalar_stability_for_test(loaded)
+            batch = analyze_batch({**default_params, **loaded})
+            for key in ("surcharge_loads_force", "y_surcharge_loads", "FS_overturning", "FS_sliding", "FS_bearing"):
+                self.assertAlmostEqual(float(batch[key]), scalar[key], places=6)
+            self.assertLess(scalar["FS_sliding"], scalar_stability_for_test({"units": units})["FS_sliding"])
+        _, steel, _ = section_quantities({})
+        _, loaded_steel, _ = section_quantities({"surcharge_loads": self.LOADS})
+        self.assertGreater(float(loaded_steel), float(steel))
+
+    def test_design_list_carries_surcharge_loads(self):
+        design = {"surcharge_loads": [{"type": "strip", "load_kpa": 30.0, "offset_m": 0.5, "width_m": 3.0}]}
+        batch = analyze_batch(columns_from_params([design, dict(design)]))
+        scalar = scalar_stability_for_test(design)
+        np.testing.assert_allclose(batch["FS_overturning"], scalar["FS_overturning"], rtol=1e-9)
+        with self.assertRaises(ValueError):
+            columns_from_params([design, {}])
+
+
+class TestStratigraphy(unittest.TestCase):
+    LAYERS = [{"thickness_m": 1.5, "unit_weight_kn_m3": 17.0, "friction_angle_deg": 28.0, "cohesion_kpa": 8.0},
+              {"thickness_m": 2.0, "unit_weight_kn_m3": 19.0, "saturated_unit_weight_kn_m3": 20.0, "friction_angle_deg": 32.0},
+              {"thickness_m": 3.0, "unit_weight_kn_m3": 18.0, "saturated_unit_weight_kn_m3": 19.5, "friction_angle_deg": 30.0}]
+
+    def test_homogeneous_profile_matches_calculate_earth_pressure(self):
+        soil = soil_properties["ordinary_soil"]
+        layers = normalize_layers([{"thickness_m": 10.0, "unit_weight_kn_m3": soil["unit_weight_kn_m3"],
+                                    "friction_angle_deg": soil["friction_angle_deg"]}])
+        profile = PressureProfile(layers, groundwater_depth=2.0, surcharge_load=0.0)
+        for depth in (1.0, 2.0, 5.0):
+            self.assertAlmostEqual(float(profile.pressure(depth)), calculate_earth_pressure(soil, depth, 2.0))
+
+    def test_resultant_integrates_the_piecewise_diagram_exactly(self):
+        H = 6.3
+        depths = np.linspace(0.0, H, 600001)
+        for is_active in (True, False):
+            profile = PressureProfile(normalize_layers(self.LAYERS), groundwater_depth=2.5, surcharge_load=10.0, is_active=is_active)
+            pressure = profile.pressure(depths)
+            force, moment = profile.resultant(H)
+            self.assertAlmostEqual(force, np.trapezoid(pressure, depths), delta=1e-5 * force)
+            self.assertAlmostEqual(moment, np.trapezoid(pressure * (H - depths), depths), delta=1e-5 * moment)
+        # The cohesive top layer is in tension near the surface
+        self.assertEqual(float(PressureProfile(normalize_layers(self.LAYERS)).pressure(0.1)), 0.0)
+
+    def test_resultant_array_matches_the_profiles(self):
+        layers = normalize_layers(self.LAYERS)
+        heights = np.concatenate([np.linspace(0.0, 8.0, 161), [1.5, 3.5, 0.3]])
+        groundwater = np.where(np.arange(heights.size) % 2, 2.5, -1.0)
+        for is_active in (True, False):
+            force, moment, base = layered_resultant_array(layers, heights, groundwater, 10.0, 0.0, is_active=is_active)
+            for i in range(heights.size):
+                profile = PressureProfile(layers, groundwater[i], 10.0, is_active)
+                expected_force, expected_moment = profile.resultant(heights[i])
+                self.assertAlmostEqual(force[i], expected_force, places=8)
+                self.assertAlmostEqual(moment[i], expected_moment, places=8)
+                self.assertAlmostEqual(base[i], float(profile.pressure(heights[i])), places=8)
+
+    def test_stability_with_stratigraphy(self):
+        # A single layer of the active soil with the water table below the base gives the triangle
+        soil = soil_properties["ordinary_soil"]
+        single = [{"thickness_m": 20.0, "unit_weight_kn_m3": soil["unit_weight_kn_m3"], "friction_angle_deg": soil["friction_angle_deg"]}]
+        reference = scalar_stability_for_test({"groundwater_level_m_below_base": 10.0})
+        layered = scalar_stability_for_test({"stratigraphy": single, "groundwater_level_m_below_base": 10.0})
+        for key in ("Pa_force", "y_Pa", "FS_overturning", "FS_sliding"):
+            self.assertAlmostEqual(layered[key], reference[key])
+        for units in ("metric", "imperial"):
+            params = {"stratigraphy": self.LAYERS, "groundwater_level_m_below_base": -3.0, "units": units}
+            scalar = scalar_stability_for_test(params)
+            batch = analyze_batch({**default_params, **params})
+            for key in ("Pa_force", "y_Pa", "FS_overturning", "FS_sliding", "FS_bearing"):
+                self.assertAlmostEqual(float(batch[key]), scalar[key], places=6)
+
+    def test_design_list_carries_stratigraphy(self):
+        design = {"stratigraphy": self.LAYERS, "groundwater_level_m_below_base": -1.0}
+        columns = columns_from_params([design, {**design, "wall_height_m": 6.0}])
+        batch = analyze_batch(columns)
+        for i, height in enumerate((default_params["wall_height_m"], 6.0)):
+            scalar = scalar_stability_for_test({**design, "wall_height_m": height})
+            self.assertAlmostEqual(float(batch["Pa_force"][i]), scalar["Pa_force"], places=6)
+        with self.assertRaises(ValueError):
+            columns_from_params([design, {**design, "stratigraphy": self.LAYERS[:2]}])
+
+class TestPressureDiagram(unittest.TestCase):
+    def test_homogeneous_diagram_is_exact(self):
+        H = 5.5
+        depths = np.linspace(0.0, H, 200001)
+        for groundwater_depth in (None, -1.0, 0.0, 2.0, 8.0):
+            diagram = PressureDiagram.homogeneous(18.0, 0.33, H, groundwater_depth, surcharge_load=10.0)
+            pressure = diagram.pressure(depths)
+            self.assertAlmostEqual(diagram.force(), np.trapezoid(pressure, depths), delta=1e-8 * diagram.force())
+            self.assertAlmostEqual(diagram.moment(), np.trapezoid(pressure * (H - depths), depths), delta=1e-8 * diagram.moment())
+            # The array form agrees with the diagram
+            force, moment, base = homogeneous_resultant_array(18.0, 0.33, H, np.inf if groundwater_depth is None else groundwater_depth, 10.0)
+            self.assertAlmostEqual(float(force), diagram.force())
+            self.assertAlmostEqual(float(moment), diagram.moment())
+            self.assertAlmostEqual(float(base), diagram.base_pressure())
+        # Without water or surcharge the diagram is the triangle
+        dry = PressureDiagram.homogeneous(18.0, 0.33, H)
+        self.assertAlmostEqual(dry.force(), 0.5 * 0.33 * 18.0 * H * H)
+        self.assertAlmostEqual(dry.line_of_action(), H / 3)
+        self.assertAlmostEqual(dry.base_pressure(), 0.33 * 18.0 * H)
+
+    def test_truncated(self):
+        diagram = PressureDiagram.homogeneous(18.0, 0.33, 6.0, 2.0, surcharge_load=5.0)
+        part = diagram.truncated(4.0)
+        depths = np.linspace(0.0, 4.0, 100001)
+        self.assertAlmostEqual(part.height, 4.0)
+        self.assertAlmostEqual(part.base_pressure(), float(diagram.pressure(4.0)))
+        self.assertAlmostEqual(part.moment(), np.trapezoid(diagram.pressure(depths) * (4.0 - depths), depths), places=6)
+
+    def test_stability_uses_exact_resultants(self):
+        # With the water table in the retained height the resultant is no longer the triangle to the base pressure
+        stability = scalar_stability_for_test({"surcharge_load_kpa": 10.0})
+        self.assertNotAlmostEqual(stability["Pa_force"], 0.5 * stability["Pa_at_base"] * (default_params["wall_height_m"] + default_params["foundation_depth_m"]))
+        # A single layer stratigraphy of the same soil gives the same diagram
+        soil = soil_properties["ordinary_soil"]
+        single = [{"thickness_m": 20.0, "unit_weight_kn_m3": soil["unit_weight_kn_m3"], "friction_angle_deg": soil["friction_angle_deg"]}]
+        layered = scalar_stability_for_test({"surcharge_load_kpa": 10.0, "stratigraphy": single})
+        for key in ("Pa_at_base", "Pa_force", "y_Pa"):
+            self.assertAlmostEqual(layered[key], stability[key])
+        for units in ("metric", "imperial"):
+            params = {"surcharge_load_kpa": 10.0, "groundwater_level_m_below_base": -1.5, "units": units}
+            scalar = scalar_stability_for_test(params)
+            batch = analyze_batch({**default_params, **params})
+            for key in ("Pa_at_base", "Pa_force", "y_Pa", "Pp_force", "y_Pp", "FS_overturning", "FS_sliding", "FS_bearing"):
+                self.assertAlmostEqual(float(batch[key]), scalar[key], places=6)
+
+    def test_pipeline_shares_the_diagrams(self):
+        with StageProfiler() as profiler:
+            results = calculate_retaining_wall({"surcharge_load_kpa": 10.0}, verbose=False)
+        self.assertEqual(profiler.stages["build_analysis_context"]["calls"], 1)
+        self.assertRegex(results["svg_drawing"], r'<polygon points="[^"]+" fill="red"')
+
+def analysis_context_for_test(user_params):
+    params, soils, _ = convert_units({**default_params, **user_params}, soil_properties.copy(), material_properties.copy())
+    geometry = calculate_geometry(params)
+    context = AnalysisContext(params, geometry, soils[params["active_soil_type"]], soils[params["passive_soil_type"]])
+    return context, params, geometry
+
+class TestAnalysisContext(unittest.TestCase):
+    def test_stem_moment_uses_the_stability_loads(self):
+        soil = soil_properties["ordinary_soil"]
+        layers = [{"thickness_m": 1.0, "unit_weight_kn_m3": 17.0, "friction_angle_deg": 28.0},
+                  {"thickness_m": 10.0, "unit_weight_kn_m3": 19.0, "saturated_unit_weight_kn_m3": 20.0, "friction_angle_deg": 33.0}]
+        cases = [{"groundwater_level_m_below_base": -2.0, "surcharge_load_kpa": 10.0},
+                 {"groundwater_level_m_below_base": -2.0, "active_side_ground_elevation_m": 5.0, "point_load_kn": 50.0},
+                 {"groundwater_level_m_below_base": -2.0, "stratigraphy": layers}]
+        for user_params in cases:
+            context, params, geometry = analysis_context_for_test(user_params)
+            # The stem sees the same diagram as the stability analysis, water table included
+            h = geometry["h_wall_stem"]
+            depths = np.linspace(0.0, h, 100001)
+            pressure = context.pressure_diagrams["active"].pressure(depths)
+            self.assertAlmostEqual(context.stem_diagram.moment(), np.trapezoid(pressure * (h - depths), depths), places=4)
+            # The array form used by the section optimizer agrees
+            array_moment = calculate_stem_moment_array(soil["unit_weight_kn_m3"], soil["friction_angle_deg"], h, context.groundwater_depth_from_surface,
+                                                       geometry["surcharge_load"], geometry["point_load"], geometry["point_load_distance_from_wall"],
+                                                       (), context.beta_deg, normalize_layers(params.get("stratigraphy")))
+            self.assertAlmostEqual(float(array_moment), 1.2 * context.stem_moment())
+
+    def test_stages_share_the_context(self):
+        user_params = {"groundwater_level_m_below_base": -2.0, "surcharge_load_kpa": 10.0}
+        context, params, geometry = analysis_context_for_test(user_params)
+        reference = calculate_retaining_wall(user_params, verbose=False)
+        self.assertEqual(reference["rebar"], calculate_rebar_info(params, geometry, material_properties["concrete"], context))
+        stability = scalar_stability_for_test(user_params)
+        for key in ("Pa_force", "y_Pa", "Pp_force", "overturning_moment", "FS_overturning", "FS_bearing"):
+            self.assertAlmostEqual(reference["stability"][key], stability[key])
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
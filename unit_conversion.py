@@ -1,13 +1,19 @@
 
+# --- Conversion Factors (metric to imperial) ---
+M_TO_FT = 3.28084
+KN_M3_TO_PCF = 6.366 # 1 kN/m^3 = 6.366 pcf (approx)
+KPA_TO_PSF = 20.885 # 1 kPa = 20.885 psf (approx)
+MPA_TO_PSI = 145.038 # 1 MPa = 145.038 psi (approx)
+KN_TO_LB = 224.809 # 1 kN = 224.809 lb (approx)
+
 # --- Unit Conversion Function ---
 def convert_units(params, soil_properties, material_properties):
     if params["units"] == "imperial":
-        # Conversion factors
-        m_to_ft = 3.28084
-        kn_m3_to_pcf = 6.366 # 1 kN/m^3 = 6.366 pcf (approx)
-        kpa_to_psf = 20.885 # 1 kPa = 20.885 psf (approx)
-        mpa_to_psi = 145.038 # 1 MPa = 145.038 psi (approx)
-        kn_to_lb = 224.809 # 1 kN = 224.809 lb (approx)
+        m_to_ft = M_TO_FT
+        kn_m3_to_pcf = KN_M3_TO_PCF
+        kpa_to_psf = KPA_TO_PSF
+        mpa_to_psi = MPA_TO_PSI
+        kn_to_lb = KN_TO_LB
 
         # Convert linear dimensions from meters to feet
         params["wall_height_ft"] = params["wall_height_m"] * m_to_ft